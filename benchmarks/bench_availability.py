@@ -0,0 +1,122 @@
+"""
+比較舊的字串 slot 計算（strptime + iterrows）與 tools.availability 的陣列版本
+
+    python -m benchmarks.bench_availability --days 365 --rooms 30
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from tools.availability import SlotGrid
+
+
+# ---- 舊版實作（原 tools/mcp_search.py、tools/rag_csv_tool.py），僅供比較 ----
+
+def legacy_generate_all_slots(start="08:00", end="18:00", step=30):
+    fmt = "%H:%M"
+    start_time = datetime.strptime(start, fmt)
+    end_time = datetime.strptime(end, fmt)
+    result = []
+    while start_time < end_time:
+        next_time = start_time + timedelta(minutes=step)
+        result.append((start_time.strftime(fmt), next_time.strftime(fmt)))
+        start_time = next_time
+    return result
+
+def legacy_convert_to_slots(start, end, all_slots):
+    fmt = "%H:%M"
+    reserve_start = datetime.strptime(start, fmt)
+    reserve_end = datetime.strptime(end, fmt)
+    result = []
+    for s_start, s_end in all_slots:
+        slot_start = datetime.strptime(s_start, fmt)
+        slot_end = datetime.strptime(s_end, fmt)
+        if slot_start < reserve_end and reserve_start < slot_end:
+            result.append((s_start, s_end))
+    return result
+
+def legacy_availability(df):
+    all_slots = legacy_generate_all_slots()
+    occupied = {}
+    for _, row in df.iterrows():
+        key = (row["date"], row["room"])
+        occupied.setdefault(key, []).extend(legacy_convert_to_slots(row["start_time"], row["end_time"], all_slots))
+    return {key: [slot for slot in all_slots if slot not in set(reserved)] for key, reserved in occupied.items()}
+
+
+# ---- 陣列版本 ----
+
+def grid_availability(df, grid):
+    group_index, keys = pd.MultiIndex.from_frame(df[["date", "room"]]).factorize()
+    starts = df["start_time"].str.slice(0, 2).astype(int).to_numpy() * 60 + df["start_time"].str.slice(3, 5).astype(int).to_numpy()
+    ends = df["end_time"].str.slice(0, 2).astype(int).to_numpy() * 60 + df["end_time"].str.slice(3, 5).astype(int).to_numpy()
+    busy = grid.occupancy(group_index, starts, ends, len(keys))
+    return {tuple(k): grid.free_slots(row) for k, row in zip(keys, busy)}, busy
+
+
+def synthetic_year(days, rooms, max_bookings, seed=0):
+    rng = random.Random(seed)
+    start_day = datetime(2025, 1, 1)
+    rows = []
+    for d in range(days):
+        date = (start_day + timedelta(days=d)).strftime("%Y%m%d")
+        for r in range(rooms):
+            cursor = 7 * 60
+            for _ in range(rng.randint(0, max_bookings)):
+                cursor += rng.choice([0, 30, 60, 90])
+                length = rng.choice([30, 60, 90, 120, 180])
+                if cursor + length > 19 * 60:
+                    break
+                rows.append({"building": "仁愛大樓", "room": f"第{r + 1}會議室", "date": date,
+                             "start_time": f"{cursor // 60:02d}:{cursor % 60:02d}",
+                             "end_time": f"{(cursor + length) // 60:02d}:{(cursor + length) % 60:02d}",
+                             "topic": "會議", "host": "國泰人壽"})
+                cursor += length
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--rooms", type=int, default=30)
+    parser.add_argument("--max-bookings", type=int, default=6)
+    parser.add_argument("--json", help="將結果寫入 JSON 檔")
+    args = parser.parse_args()
+
+    df = synthetic_year(args.days, args.rooms, args.max_bookings)
+    print(f"合成資料：{args.days} 天 × {args.rooms} 間會議室，共 {len(df)} 筆預約")
+
+    grid = SlotGrid("08:00", "18:00", 30)
+    t0 = time.perf_counter()
+    new, busy = grid_availability(df, grid)
+    t_grid = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    intervals = [grid.free_intervals(row) for row in busy]
+    t_intervals = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    old = legacy_availability(df)
+    t_legacy = time.perf_counter() - t0
+
+    # 兩種實作的結果必須一致
+    mismatches = sum(1 for key in old if old[key] != new[key])
+    print(f"舊版 strptime + iterrows : {t_legacy:8.3f} s")
+    print(f"陣列版 occupancy + slots  : {t_grid:8.3f} s  ({t_legacy / t_grid:.0f}x)")
+    print(f"合併空閒區間（{len(intervals)} 列）: {t_intervals:8.3f} s")
+    print(f"結果不一致的 (日期, 會議室) 數：{mismatches}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"bookings": len(df), "legacy_s": t_legacy, "grid_s": t_grid,
+                       "intervals_s": t_intervals, "mismatches": mismatches}, f, indent=2)
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+比較各 HTML parser 後端解析預約頁面的速度（結果必須與 html.parser 相同）
+
+    python -m benchmarks.bench_booking_parser --bookings 100 500 1000 --repeat 5
+"""
+import argparse
+import json
+import time
+
+from tools.booking_parser import BACKENDS, available_backends
+from benchmarks.booking_pages import synthetic_page
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bookings", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--rooms", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="將結果寫入 JSON 檔")
+    args = parser.parse_args()
+
+    backends = available_backends()
+    report = []
+    mismatches = 0
+    for bookings in args.bookings:
+        page = synthetic_page(bookings, rooms=args.rooms)
+        print(f"📄 {bookings} 筆預約、{args.rooms} 間會議室（{len(page.encode('utf-8')) / 1024:.0f} KB）")
+        baseline = None
+        for backend in backends:
+            seconds, records = best_of(lambda: BACKENDS[backend](page, "20250808"), args.repeat)
+            if baseline is None:
+                baseline = (seconds, records)
+            same = records == baseline[1]
+            mismatches += not same
+            print(f"   {backend:<12} {seconds * 1000:8.1f} ms  ({baseline[0] / seconds:4.1f}x)  "
+                  f"{len(records)} 筆{'' if same else '  ❌ 與 html.parser 不一致'}")
+            report.append({"bookings": bookings, "backend": backend, "ms": round(seconds * 1000, 2),
+                           "records": len(records), "match": same})
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+離線端對端效能測試：替身預約網站 + 替身 Ollama，依不同規模跑完整流程
+爬取（driver_service → 解析 → schedule store）→ 建立索引 → 多位使用者同時提問
+結果寫成 JSON 報告，可與其他 commit 的報告比較
+
+    python -m benchmarks.bench_e2e --rooms 6 30 --bookings 20 200 --days 1 5 --users 1 4 --json e2e.json
+    python -m benchmarks.bench_e2e --compare base.json e2e.json
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from benchmarks.fake_booking_site import FakeBookingSite, install
+from benchmarks.fake_ollama import FakeOllama
+
+BUILDING = "仁愛"
+BUILDING_CODE = "4"
+START_DATE = datetime(2025, 9, 1)
+# 每位使用者依序提問；涵蓋結構化查詢、RAG 與重複問題（回答快取）
+QUESTIONS = ["第1會議室下午是誰預約的？", "第3會議室什麼時候有空", "有哪些會議的主題是面試", "第1會議室下午是誰預約的？"]
+COMPARE_METRICS = [("crawl_ms", "p50"), ("index_ms", "p50"), ("question_ms", "p50"), ("question_ms", "p95"), ("ttft_ms", "p50")]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def stats(values):
+    from tools.tracing import percentile
+    values = [v for v in values if v is not None]
+    if not values:
+        return {"count": 0}
+    return {"count": len(values), "p50": round(percentile(values, 50), 1), "p95": round(percentile(values, 95), 1),
+            "max": round(max(values), 1)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def start_driver_service(site_url):
+    """driver_service 在同一行程以 uvicorn 執行，瀏覽器操作換成向替身網站取頁"""
+    import uvicorn
+    import tools.driver_service as ds
+    import tools.mcp_search as mcp_search
+    install(ds, site_url)
+    ds.pool.initialize()
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(ds.app, host="127.0.0.1", port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    mcp_search.DRIVER_SERVICE_URL = f"http://127.0.0.1:{port}"
+    return server
+
+
+def ask(assistant, session, query):
+    """送出一則訊息；回傳 (總耗時 ms, 首字延遲 ms, 回答路徑)"""
+    t0 = time.perf_counter()
+    ttft = None
+    timings = None
+    for event in assistant.reply(session, query):
+        if event["type"] == "token" and ttft is None:
+            ttft = (time.perf_counter() - t0) * 1000
+        elif event["type"] == "end":
+            timings = event.get("timings") or {}
+    if timings is None:
+        path = "status"
+    elif "cache" in timings:
+        path = "cache"
+    elif "retrieve" in timings:
+        path = "rag"
+    elif timings:
+        path = "basic"
+    else:
+        path = "engine"
+    return (time.perf_counter() - t0) * 1000, ttft, path
+
+
+def run_scenario(rooms, bookings, days, users, site, ollama, ollama_url, workdir, trace, warmup=False):
+    import tools.rag_csv_tool as rag
+    import tools.schedule_store as schedule_store
+    from tools import tracing
+    from tools.assistant import Assistant
+    from tools.batched_embeddings import BatchedOllamaEmbeddings
+    from tools.embedding_cache import CachedEmbeddings
+    from tools.mcp_search import search_meeting_rooms
+    from tools import model_warmup
+    from langchain_community.chat_models import ChatOllama
+
+    # 每個情境使用全新的 schedule store、向量資料庫與 embedding 快取，量到的是冷啟動
+    scenario_dir = tempfile.mkdtemp(dir=workdir)
+    schedule_store._default_store = schedule_store.ScheduleStore(os.path.join(scenario_dir, "schedule.sqlite3"))
+    rag.CHROMA_DIR = os.path.join(scenario_dir, "chroma")
+    rag._collections = None
+    rag._embeddings = CachedEmbeddings(BatchedOllamaEmbeddings(rag.EMBEDDING_MODEL, base_url=ollama_url),
+                                       rag.EMBEDDER_ID, path=os.path.join(scenario_dir, "embeddings.sqlite3"))
+    trace_file = os.path.join(scenario_dir, "traces.jsonl")
+    tracing.configure(enabled=trace, path=trace_file)
+    site.configure(rooms=rooms, bookings=bookings)
+    site_before = (site.requests, site.bytes_served)
+    ollama_before = (ollama.requests, ollama.items, ollama.chat_requests, ollama.generated_tokens, ollama.model_loads)
+    # 每個情境從模型都不在記憶體開始
+    ollama.unload_all()
+
+    assistant = Assistant()
+    assistant.llm = ChatOllama(model=assistant.model_name, base_url=ollama_url, keep_alive=model_warmup.keep_alive_value())
+    dates = [(START_DATE + timedelta(days=i)).strftime("%Y%m%d") for i in range(days)]
+
+    warmup_ms = None
+    if warmup:
+        # REPL 與 chat service 在使用者輸入大樓與日期時於背景進行；這裡在爬取前先做完
+        t0 = time.perf_counter()
+        assistant.warm_up()
+        warmup_ms = (time.perf_counter() - t0) * 1000
+
+    crawl_ms, index_ms = [], []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for date in dates:
+            t0 = time.perf_counter()
+            search_meeting_rooms(start_date=f"{date[:4]}/{date[4:6]}/{date[6:]}", building_code=BUILDING_CODE)
+            crawl_ms.append((time.perf_counter() - t0) * 1000)
+        for date in dates:
+            t0 = time.perf_counter()
+            loaded, _ = assistant.load_schedule(BUILDING, date)
+            index_ms.append((time.perf_counter() - t0) * 1000)
+            assert loaded is not None and loaded.rag_ready, f"load failed for {date}"
+
+    def user(index):
+        session = assistant.create_session()
+        date = dates[index % len(dates)]
+        for message in (f"{date[:4]}/{date[4:6]}/{date[6:]} {BUILDING}", "y"):
+            for _ in assistant.reply(session, message):
+                pass
+        assert session.loaded is not None, f"session did not load {date}"
+        return [ask(assistant, session, q) for q in QUESTIONS]
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        answers = [a for result in executor.map(user, range(users)) for a in result]
+    question_wall = time.perf_counter() - t0
+
+    by_path = {}
+    for latency, _, path in answers:
+        by_path.setdefault(path, []).append(latency)
+    result = {
+        "rooms": rooms, "bookings": bookings, "days": days, "users": users,
+        "crawl_ms": stats(crawl_ms),
+        "index_ms": stats(index_ms),
+        "question_ms": stats([a[0] for a in answers]),
+        "ttft_ms": stats([a[1] for a in answers if a[2] in ("rag", "basic")]),
+        "ttft_by_state": assistant.ttft_stats(),
+        "warmup_ms": round(warmup_ms, 1) if warmup_ms is not None else None,
+        "paths": {path: stats(values) for path, values in sorted(by_path.items())},
+        "questions_per_s": round(len(answers) / question_wall, 2),
+        "meetings": sum(len(site.records(BUILDING_CODE, d)) for d in dates),
+        "documents": rag.get_collections().stats()["documents"],
+        "site": {"requests": site.requests - site_before[0], "bytes": site.bytes_served - site_before[1]},
+        "ollama": {"embed_requests": ollama.requests - ollama_before[0], "embedded_texts": ollama.items - ollama_before[1],
+                   "chat_requests": ollama.chat_requests - ollama_before[2],
+                   "generated_tokens": ollama.generated_tokens - ollama_before[3],
+                   "model_loads": ollama.model_loads - ollama_before[4]},
+    }
+    if trace and os.path.exists(trace_file):
+        result["stages"] = {name: {k: row[k] for k in ("count", "p50_ms", "p95_ms")}
+                            for name, row in tracing.summarize(tracing.load_spans(trace_file)).items()}
+    tracing.configure(enabled=False)
+    return result
+
+
+def compare(base_path, new_path):
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    key = lambda s: (s["rooms"], s["bookings"], s["days"], s["users"])
+    base_by_key = {key(s): s for s in base["scenarios"]}
+    print(f"base {base['meta'].get('commit')} → new {new['meta'].get('commit')}")
+    for scenario in new["scenarios"]:
+        old = base_by_key.get(key(scenario))
+        if old is None:
+            continue
+        print(f"rooms={scenario['rooms']} bookings={scenario['bookings']} days={scenario['days']} users={scenario['users']}")
+        for metric, stat in COMPARE_METRICS:
+            before, after = old[metric].get(stat), scenario[metric].get(stat)
+            if before is None or after is None:
+                continue
+            ratio = after / before if before else float("inf")
+            print(f"  {metric + ' ' + stat:<18}{before:>10.1f} →{after:>10.1f} ms  ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, nargs="+", default=[6, 30], help="每棟大樓的會議室數")
+    parser.add_argument("--bookings", type=int, nargs="+", default=[20, 200], help="每天的預約筆數")
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 5], help="爬取並建立索引的天數")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4], help="同時提問的使用者數")
+    parser.add_argument("--site-latency", type=float, default=0.2, help="替身網站每頁延遲（秒）")
+    parser.add_argument("--embed-latency", type=float, default=0.02, help="embedding 每個請求的延遲（秒）")
+    parser.add_argument("--embed-per-item", type=float, default=0.002, help="每筆 embedding 的延遲（秒）")
+    parser.add_argument("--first-token", type=float, default=0.3, help="對話首字延遲（秒）")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="每個生成 token 的延遲（秒）")
+    parser.add_argument("--output-tokens", type=int, default=40)
+    parser.add_argument("--ollama-parallel", type=int, default=2, help="替身 Ollama 同時處理的請求數")
+    parser.add_argument("--model-load", type=float, default=0.0, help="模型不在記憶體時的載入時間（秒）")
+    parser.add_argument("--warmup", action="store_true", help="爬取前先以 Assistant.warm_up() 載入模型")
+    parser.add_argument("--no-trace", action="store_true", help="不記錄各階段 span")
+    parser.add_argument("--json", help="將報告寫入 JSON 檔")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="比較兩份報告")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    site = FakeBookingSite(latency=args.site_latency)
+    ollama = FakeOllama(latency=args.embed_latency, per_item_latency=args.embed_per_item, parallel=args.ollama_parallel,
+                        first_token_latency=args.first_token, token_latency=args.token_latency,
+                        output_tokens=args.output_tokens, load_latency=args.model_load)
+    site_url, ollama_url = site.start(), ollama.start()
+    workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+    server = start_driver_service(site_url)
+
+    scenarios = []
+    try:
+        for rooms, bookings, days, users in itertools.product(args.rooms, args.bookings, args.days, args.users):
+            result = run_scenario(rooms, bookings, days, users, site, ollama, ollama_url, workdir, not args.no_trace,
+                                  warmup=args.warmup)
+            scenarios.append(result)
+            print(f"🏁 rooms={rooms:<3} bookings={bookings:<4} days={days:<3} users={users:<3} "
+                  f"爬取 p50 {result['crawl_ms']['p50']:7.1f} ms，索引 p50 {result['index_ms']['p50']:7.1f} ms，"
+                  f"提問 p50 {result['question_ms']['p50']:7.1f} / p95 {result['question_ms']['p95']:7.1f} ms，"
+                  f"首字 p50 {result['ttft_ms'].get('p50', 0):7.1f} ms / 最大 {result['ttft_ms'].get('max', 0):7.1f} ms，"
+                  f"模型載入 {result['ollama']['model_loads']} 次")
+    finally:
+        server.should_exit = True
+        site.stop()
+        ollama.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {"commit": git_commit(), "created_at": datetime.now().isoformat(timespec="seconds"),
+                 "python": platform.python_version(), "platform": platform.platform(), "args": vars(args)},
+        "scenarios": scenarios,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
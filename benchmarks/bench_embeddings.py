@@ -0,0 +1,54 @@
+"""
+比較不同批次大小與 worker 數的 embedding 吞吐量（docs/s），使用本機替身 Ollama
+
+    python -m benchmarks.bench_embeddings --docs 512 --batch-sizes 1,8,32 --workers 1,2,4
+"""
+import argparse
+import json
+import time
+
+from benchmarks.fake_ollama import FakeOllama
+from tools.batched_embeddings import BatchedOllamaEmbeddings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=512)
+    parser.add_argument("--batch-sizes", default="1,8,32,64")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--latency", type=float, default=0.02, help="每個請求的固定延遲（秒）")
+    parser.add_argument("--per-item", type=float, default=0.002, help="每筆文件的延遲（秒）")
+    parser.add_argument("--parallel", type=int, default=2, help="替身伺服器同時處理的請求數")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--json", help="將結果寫入 JSON 檔")
+    args = parser.parse_args()
+
+    fake = FakeOllama(latency=args.latency, per_item_latency=args.per_item,
+                      parallel=args.parallel, fail_rate=args.fail_rate)
+    url = fake.start()
+    texts = [f"會議室: 仁愛大樓 第{i % 8 + 1}會議室\n日期: 20250808\n時段 {i}" for i in range(args.docs)]
+
+    results = []
+    print(f"{'batch':>6} {'workers':>8} {'seconds':>9} {'docs/s':>9}")
+    try:
+        for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+            for workers in [int(w) for w in args.workers.split(",")]:
+                embedder = BatchedOllamaEmbeddings("fake-embed", base_url=url, batch_size=batch_size, workers=workers)
+                t0 = time.perf_counter()
+                vectors = embedder.embed_documents(texts)
+                elapsed = time.perf_counter() - t0
+                assert len(vectors) == len(texts)
+                rate = len(texts) / elapsed
+                results.append({"batch_size": batch_size, "workers": workers,
+                                "seconds": round(elapsed, 3), "docs_per_s": round(rate, 1)})
+                print(f"{batch_size:>6} {workers:>8} {elapsed:>9.3f} {rate:>9.1f}")
+    finally:
+        fake.stop()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"docs": args.docs, "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+量測向量資料庫累積越來越多天的資料時，檢索延遲的變化：
+分區前的單一 collection（全庫 / metadata 過濾）與依大樓、日期分區的 collection
+使用本機的雜湊 embedding，不需要 Ollama
+
+    python -m benchmarks.bench_retrieval --days 10 50 100 --queries 20
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+import tools.rag_csv_tool as rag
+from tools.availability import derive_schedule
+from benchmarks.bench_availability import synthetic_year
+
+
+class HashEmbeddings(Embeddings):
+    """以字元 bigram 雜湊成固定維度的向量；相同文字永遠得到相同向量"""
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for a, b in zip(text, text[1:]):
+            vector[int(hashlib.md5((a + b).encode("utf-8")).hexdigest()[:8], 16) % self.dim] += 1
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+QUESTIONS = ["第1會議室下午是誰預約的？", "有哪些會議的主題是面試", "第3會議室什麼時候有空", "60人的會議室可以用嗎"]
+
+
+def timed_queries(fn, dates, n):
+    # 先跑一輪不計時，量測的是已載入索引後的延遲（實際使用時同一天會被反覆查詢）
+    for i in range(n):
+        fn(QUESTIONS[i % len(QUESTIONS)], dates[i % len(dates)])
+    samples = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(QUESTIONS[i % len(QUESTIONS)], dates[i % len(dates)])
+        samples.append((time.perf_counter() - t0) * 1000)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--json", help="將結果寫入 JSON 檔")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_retrieval_")
+    rag.CHROMA_DIR = workdir
+    rag._embeddings = HashEmbeddings()
+    rag._collections = None
+    collections = rag.get_collections()
+    # 合成資料的日期可能早於保留期限，量測時不刪除分區
+    collections.retention_days = 100 * 365
+    legacy = collections.legacy()
+    partition = collections.get
+
+    df = synthetic_year(max(args.days), rooms=6, max_bookings=5)
+    all_dates = sorted(df["date"].unique())
+    loaded = 0
+    report = []
+    try:
+        for days in sorted(args.days):
+            # 逐日寫入，與實際使用時一天一份快照相同
+            for date in all_dates[loaded:days]:
+                schedule = derive_schedule(df[df["date"] == date], building_code="4", date=date,
+                                           rooms_catalog=rag.meeting_rooms["4"], building_name="仁愛大樓")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    rag.build_vectorstore_from_csv(schedule, building_code="4", date=date)
+                    # 同樣的文件也寫入單一 collection 作為分區前的基準
+                    collections.get = lambda building, day, create=True: legacy
+                    try:
+                        rag.build_vectorstore_from_csv(schedule, building_code="4", date=date)
+                    finally:
+                        collections.get = partition
+            loaded = days
+            dates = all_dates[:days]
+
+            unfiltered = timed_queries(lambda q, d: legacy.similarity_search(q, k=rag.RAG_TOP_K), dates, args.queries)
+            filtered = timed_queries(lambda q, d: legacy.similarity_search(
+                q, k=rag.RAG_TOP_K, filter=rag.retrieval_filter("4", d, rag.infer_doc_type(q))), dates, args.queries)
+            partitioned = timed_queries(lambda q, d: rag.retrieve(q, building_code="4", date=d), dates, args.queries)
+            # 分區的結果只能來自查詢的大樓與日期
+            for doc in rag.retrieve(QUESTIONS[0], building_code="4", date=dates[-1]):
+                assert doc.metadata["building"] == "4" and doc.metadata["date"] == dates[-1], doc.metadata
+            documents = len(legacy.get(include=[])["ids"])
+            stats = collections.stats()
+            assert stats["documents"] == documents, (stats, documents)
+            print(f"📚 {days:4d} 天 / {documents:6d} 筆文件 / {stats['partitions']:4d} 個分區："
+                  f"全庫 {unfiltered:6.1f} ms，單一 collection 過濾 {filtered:6.1f} ms，分區 {partitioned:6.1f} ms")
+            report.append({"days": days, "documents": documents, "partitions": stats["partitions"],
+                           "unfiltered_ms": unfiltered, "filtered_ms": filtered, "partitioned_ms": partitioned})
+    finally:
+        rag._collections = None
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
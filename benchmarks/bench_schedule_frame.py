@@ -0,0 +1,79 @@
+"""
+比較舊的 iterrows 文件 / 空閒時段產生流程與 tools.availability.derive_schedule 的向量化版本
+
+    python -m benchmarks.bench_schedule_frame --days 90 --rooms 6
+"""
+import argparse
+import json
+import time
+
+from tools.availability import derive_schedule
+from benchmarks.bench_availability import legacy_generate_all_slots, legacy_convert_to_slots, synthetic_year
+
+# 與 tools/rag_csv_tool.py 相同的仁愛大樓目錄
+CATALOG = {"15F": {f"第{i}會議室": 12 + i for i in range(1, 9)}}
+BUILDING_NAME = "仁愛大樓"
+
+
+# ---- 舊版實作（原 tools/rag_csv_tool.py 的 build_vectorstore_from_csv，逐日呼叫），僅供比較 ----
+
+def legacy_documents(df):
+    all_slots = legacy_generate_all_slots()
+    documents = set()
+    for date, day in df.groupby("date"):
+        for _, row in day.iterrows():
+            documents.add(("reserved", f"會議室: {row['building']} {row['room']}\n日期: {date}\n時間: {row['start_time']}-{row['end_time']}\n主題: {row['topic']}\n主辦: {row['host']}\n狀態: 已預約"))
+        room_availability = {}
+        for _, row in day.iterrows():
+            room_availability.setdefault(row["room"], []).extend(
+                legacy_convert_to_slots(row["start_time"], row["end_time"], all_slots))
+        for floor, rooms in CATALOG.items():
+            for room_name, capacity in rooms.items():
+                reserved = set(room_availability.get(room_name, []))
+                available = [f"{s}-{e}" for s, e in all_slots if (s, e) not in reserved]
+                documents.add(("availability", f"會議室: {BUILDING_NAME} {room_name}\n樓層: {floor}\n容納人數: {capacity}人\n日期: {date}\n可用時段: {', '.join(available) if available else '無'}\n狀態: {'部分可用' if available else '全日預約'}"))
+    return documents
+
+
+def vectorized_documents(df):
+    schedule = derive_schedule(df, building_code="4", rooms_catalog=CATALOG, building_name=BUILDING_NAME)
+    documents = {("reserved", text) for text in schedule.reserved_texts()}
+    documents |= {("availability", text) for _, text in schedule.availability_texts()}
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--rooms", type=int, default=6)
+    parser.add_argument("--max-bookings", type=int, default=6)
+    parser.add_argument("--json", help="將結果寫入 JSON 檔")
+    args = parser.parse_args()
+
+    df = synthetic_year(args.days, args.rooms, args.max_bookings)
+    print(f"合成資料：{args.days} 天 × {args.rooms} 間會議室，共 {len(df)} 筆預約")
+
+    t0 = time.perf_counter()
+    new = vectorized_documents(df)
+    t_new = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    old = legacy_documents(df)
+    t_legacy = time.perf_counter() - t0
+
+    # 兩種實作產生的文件必須完全相同
+    mismatches = len(old ^ new)
+    print(f"舊版 iterrows     : {t_legacy:8.3f} s")
+    print(f"向量化 derive     : {t_new:8.3f} s  ({t_legacy / t_new:.0f}x)")
+    print(f"文件數：{len(new)}，不一致：{mismatches}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"bookings": len(df), "documents": len(new), "legacy_s": t_legacy,
+                       "vectorized_s": t_new, "mismatches": mismatches}, f, indent=2)
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+產生與預約網站查詢結果頁相同結構的 HTML（大樓下拉選單 + 每間會議室一個 .Booking_area）
+供 parser 黃金檔比對與效能測試使用
+
+    python -m benchmarks.booking_pages --write-fixtures
+"""
+import argparse
+import html
+import os
+import random
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(SCRIPT_DIR, "fixtures")
+RAG_FILE_DIR = os.path.join(SCRIPT_DIR, "..", "rag-file")
+
+BUILDINGS = [("4", "仁愛大樓"), ("6", "松仁大樓"), ("12", "瑞湖大樓"), ("15", "信義安和大樓"), ("19", "台中忠明大樓")]
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-Hant">
+<head>
+<meta charset="utf-8">
+<title>會議室預約系統</title>
+<script>var contextPath = "/meeting"; if (a < b && b > c) {{ console.log("</div>"); }}</script>
+</head>
+<body>
+<form id="searchForm" method="post">
+  <select id="searchBeanBuildingPK" name="searchBean.buildingPK" class="form-control">
+{options}
+  </select>
+  <input type="text" name="searchBean.startDate" value="{date_label}">
+  <button type="submit" name="selectedTimePeriod" value="MORNING" class="btn{morning_active}">上午</button>
+  <button type="submit" name="selectedTimePeriod" value="AFTERNOON" class="btn{afternoon_active}">下午</button>
+</form>
+<div id="bookingList">
+  <div class="Booking_area legend"><span>圖例：</span><span class="booked">已預約</span></div>
+{areas}
+</div>
+<!-- <div class="Booking_area"><div class="Title"><div class="Floor">X</div><div class="Room">註解內容</div></div></div> -->
+</body>
+</html>
+"""
+
+
+def render_button(record, with_date=False, phone=None, broken=False):
+    """單筆預約按鈕；欄位順序為 主題 / 單位 / 部門 / 聯絡人"""
+    org, _, rest = record["host"].partition(" ")
+    department, _, person = rest.partition(" ")
+    attrs = f'type="button" class="btn meetingRecordBtn" data-starttime="{record["start_time"]}" data-endtime="{record["end_time"]}"'
+    if with_date:
+        date = str(record["date"])
+        attrs += f' data-date="{date[:4]}/{date[4:6]}/{date[6:]}"'
+    person_text = html.escape(person) + (f" {phone}" if phone else "")
+    fields = [
+        f"<div class=\"topic\">\n        {html.escape(record['topic'])}\n      </div>",
+        f"<div>{html.escape(org)}</div>",
+        f"<div><span>{html.escape(department)}</span></div>",
+        f"<div>&nbsp;{person_text}</div>",
+    ]
+    if broken:
+        # 網站偶爾會出現欄位不完整的紀錄，parser 應略過
+        fields = fields[:2]
+    return f"    <button {attrs}>\n      " + "\n      ".join(fields) + "\n      <span class=\"time\">" \
+        + f"{record['start_time']} ~ {record['end_time']}</span>\n    </button>"
+
+
+def render_page(building_code, rooms, records, date_label="2025/08/08", period="MORNING",
+                with_dates=False, rng=None):
+    """
+    rooms: [(樓層, 會議室)]，records: 預約紀錄 dict list（欄位同 schedule store）
+    rng 有值時會隨機加入電話號碼、不完整紀錄等網站上實際出現過的變化
+    """
+    options = "\n".join(
+        f'    <option value="{code}"{" selected=\"selected\"" if code == building_code else ""}>{name}</option>'
+        for code, name in BUILDINGS)
+    by_room = {}
+    for record in records:
+        by_room.setdefault(record["room"], []).append(record)
+
+    areas = []
+    for floor, room in rooms:
+        buttons = []
+        for record in by_room.get(room, []):
+            phone = broken = None
+            if rng is not None:
+                phone = f"02{rng.randint(10000000, 99999999)}" if rng.random() < 0.2 else None
+                broken = rng.random() < 0.03
+            buttons.append(render_button(record, with_date=with_dates, phone=phone, broken=broken))
+        areas.append(
+            f'  <div class="Booking_area clearfix" data-room="{html.escape(room)}">\n'
+            f'    <div class="Title">\n      <div class="Floor"> {floor} </div>\n'
+            f'      <div class="Room">{html.escape(room)}</div>\n    </div>\n'
+            + "\n".join(buttons) + "\n  </div>")
+    return PAGE_TEMPLATE.format(
+        options=options, date_label=date_label, areas="\n".join(areas),
+        morning_active=" active" if period == "MORNING" else "",
+        afternoon_active=" active" if period == "AFTERNOON" else "")
+
+
+def synthetic_page(bookings, rooms=30, seed=0):
+    """產生約 bookings 筆預約、rooms 間會議室的大型頁面"""
+    rng = random.Random(seed)
+    room_list = [(f"{10 + i // 8}F", f"第{i + 1}會議室") for i in range(rooms)]
+    records = []
+    for i in range(bookings):
+        floor, room = room_list[i % rooms]
+        start = 8 * 60 + rng.randrange(0, 18) * 30
+        end = start + rng.choice([30, 60, 90, 120])
+        records.append({"building": "仁愛大樓", "room": room, "date": "20250808",
+                        "start_time": f"{start // 60:02d}:{start % 60:02d}",
+                        "end_time": f"{end // 60:02d}:{end % 60:02d}",
+                        "topic": rng.choice(["財作科早會", "R&D <週會>", "專案檢討 & 規劃", "面試"]),
+                        "host": rng.choice(["國泰人壽 財務部 陳品諭#3025", "國泰金控 資訊處 王小明"])})
+    return render_page("4", room_list, records, rng=rng)
+
+
+def write_fixtures():
+    """以 rag-file 中保存的查詢結果重建頁面快照（上午 / 下午各一頁，另含一頁區間查詢）"""
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    rng = random.Random(42)
+    written = []
+    for name in sorted(os.listdir(RAG_FILE_DIR)):
+        if not name.endswith(".csv"):
+            continue
+        df = pd.read_csv(os.path.join(RAG_FILE_DIR, name), dtype=str).fillna("")
+        date = name[:8]
+        records = df.to_dict(orient="records")
+        rooms = sorted({("15F", r) for r in df["room"]}) + [("15F", "第8會議室")]
+        for period, keep in (("MORNING", lambda r: r["start_time"] < "12:00"),
+                             ("AFTERNOON", lambda r: r["end_time"] > "12:00")):
+            page = render_page("4", rooms, [r for r in records if keep(r)],
+                               date_label=f"{date[:4]}/{date[4:6]}/{date[6:]}", period=period, rng=rng)
+            written.append(_write(f"booking_{date}_{period}.html", page))
+    page = render_page("4", [("15F", "第1會議室"), ("15F", "第2會議室")],
+                       [r for r in records if r["room"] in ("第1會議室", "第2會議室")],
+                       with_dates=True, rng=rng)
+    written.append(_write("booking_range_MORNING.html", page))
+    return written
+
+
+def _write(name, page):
+    path = os.path.join(FIXTURE_DIR, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(page)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--write-fixtures", action="store_true", help="重建 benchmarks/fixtures 下的頁面快照")
+    args = parser.parse_args()
+    if args.write_fixtures:
+        for path in write_fixtures():
+            print(f"✅ {path}")
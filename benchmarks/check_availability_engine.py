@@ -0,0 +1,75 @@
+"""
+AvailabilityEngine.parse 的問句與預期條件對照；預期為 None 的問句應交給 LLM
+
+    python -m benchmarks.check_availability_engine
+"""
+import pandas as pd
+
+from tools.availability_engine import AvailabilityEngine
+from tools.mcp_search import meeting_rooms
+
+H = 60
+CASES = [
+    # 英文問句：人數與時間區間，「seat 15 from」不是 15F
+    ("which rooms seat 15+ from 14:00-15:00", {"start": 14 * H, "end": 15 * H, "require_full": True, "min_capacity": 15}),
+    ("which rooms seat 15 from 14:00-15:00", {"start": 14 * H, "end": 15 * H, "require_full": True, "min_capacity": 15}),
+    ("which rooms are free for 15 people", {"min_capacity": 15}),
+    ("any room available for 8 persons at 3pm", {"start": 15 * H, "end": 15 * H + 30, "require_full": True, "min_capacity": 8}),
+    ("who booked room 1 this afternoon", None),
+    # 樓層
+    ("15F有空的會議室", {"floor": "15F"}),
+    ("15f有空的會議室", None),
+    ("B1哪間有空", {"floor": "B1"}),
+    # 單一時間點與「以後 / 以前」
+    ("明天下午3點有空嗎", {"period": "下午", "start": 15 * H, "end": 15 * H + 30, "require_full": True}),
+    ("上午10點以後哪間有空", {"period": "上午", "start": 10 * H, "end": 12 * H}),
+    ("下午三點以前有空的會議室", {"period": "下午", "start": 12 * H, "end": 15 * H}),
+    ("下午3點半開始要用一小時哪間有空", {"period": "下午", "start": 15 * H + 30, "end": 18 * H, "min_duration": 60}),
+    # 沒有說上下午的時間區間：營業時間前的鐘點是下午，終點跟著起點
+    ("3點到4點哪間有空", {"start": 15 * H, "end": 16 * H, "require_full": True}),
+    ("1點到2點有空的會議室", {"start": 13 * H, "end": 14 * H, "require_full": True}),
+    ("2點到3點半哪間有空", {"start": 14 * H, "end": 15 * H + 30, "require_full": True}),
+    ("三點到四點哪間有空", {"start": 15 * H, "end": 16 * H, "require_full": True}),
+    ("11點到1點哪間有空", {"start": 11 * H, "end": 13 * H, "require_full": True}),
+    ("9點到10點哪間有空", {"start": 9 * H, "end": 10 * H, "require_full": True}),
+    ("上午9點到10點哪間有空", {"period": "上午", "start": 9 * H, "end": 10 * H, "require_full": True}),
+    # 原本就支援的說法
+    ("14:00-15:00 哪間有空", {"start": 14 * H, "end": 15 * H, "require_full": True}),
+    ("下午2點到3點哪間有空", {"period": "下午", "start": 14 * H, "end": 15 * H, "require_full": True}),
+    ("12人以上下午哪間有空", {"period": "下午", "start": 12 * H, "end": 18 * H, "min_capacity": 12}),
+    ("哪間會議室可以用兩個小時", {"min_duration": 120}),
+    ("第3會議室什麼時候有空", {"room": "第3會議室"}),
+    # 有解析不了的條件時交給 LLM，而不是以較寬鬆的條件回答
+    ("第1會議室9/1有空嗎", None),
+    ("哪些會議室有空 after lunch", None),
+    ("有哪些會議的主題是面試", None),
+    ("第1會議室下午是誰預約的？", None),
+]
+
+
+def main():
+    engine = AvailabilityEngine(pd.DataFrame({"room": [], "start_time": [], "end_time": []}), "4")
+    failures = 0
+    for question, expected in CASES:
+        actual = engine.parse(question)
+        if actual == expected:
+            print(f"✅ {question}")
+            continue
+        failures += 1
+        print(f"❌ {question}\n   預期：{expected}\n   實際：{actual}")
+    # 時間欄位空白或格式錯誤的紀錄略過，不影響整天的排程
+    room = next(iter(next(iter(meeting_rooms["4"].values()))))
+    bad_rows = pd.DataFrame({"room": [room, room, room], "start_time": ["", None, "14:00"],
+                             "end_time": ["10:00", "11:00", "15:00"]})
+    busy = next(r["busy"] for r in AvailabilityEngine(bad_rows, "4").rooms if r["room"] == room)
+    if busy == [(14 * H, 15 * H)]:
+        print(f"✅ 略過時間不完整的預約：{room} 佔用 {busy}")
+    else:
+        failures += 1
+        print(f"❌ 時間不完整的預約\n   預期：{[(14 * H, 15 * H)]}\n   實際：{busy}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
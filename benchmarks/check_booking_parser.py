@@ -0,0 +1,64 @@
+"""
+以保存的預約頁面快照（benchmarks/fixtures/*.html）比對各 parser 後端與黃金檔的輸出
+
+    python -m benchmarks.check_booking_parser            # 比對所有可用的後端
+    python -m benchmarks.check_booking_parser --update   # 以 html.parser 重新產生黃金檔
+"""
+import argparse
+import glob
+import json
+import os
+
+from tools.booking_parser import BACKENDS, available_backends
+from benchmarks.booking_pages import FIXTURE_DIR
+
+
+def fixture_pages():
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        name = os.path.basename(path)[:-len(".html")]
+        # 檔名 booking_{日期}_{時段}；區間查詢頁面沒有查詢日期
+        date = name.split("_")[1]
+        yield path, (date if date.isdigit() else None)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--update", action="store_true", help="以 html.parser 的輸出覆寫黃金檔")
+    args = parser.parse_args()
+
+    failures = 0
+    for path, query_date in fixture_pages():
+        with open(path, encoding="utf-8") as f:
+            page = f.read()
+        golden_path = path[:-len(".html")] + ".json"
+
+        if args.update:
+            records = BACKENDS["html.parser"](page, query_date)
+            with open(golden_path, "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+            print(f"✅ {os.path.basename(golden_path)}：{len(records)} 筆")
+            continue
+
+        with open(golden_path, encoding="utf-8") as f:
+            golden = json.load(f)
+        for backend in available_backends():
+            records = BACKENDS[backend](page, query_date)
+            if records == golden:
+                print(f"✅ {os.path.basename(path)} [{backend}] {len(records)} 筆一致")
+                continue
+            failures += 1
+            print(f"❌ {os.path.basename(path)} [{backend}] 與黃金檔不一致（{len(records)} / {len(golden)} 筆）")
+            for expected, actual in zip(golden, records):
+                if expected != actual:
+                    print(f"   預期：{expected}\n   實際：{actual}")
+                    break
+
+    missing = sorted(set(BACKENDS) - set(available_backends()))
+    if missing:
+        print(f"⚠️ 未安裝、略過的後端：{', '.join(missing)}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
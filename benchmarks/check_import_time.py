@@ -0,0 +1,80 @@
+"""
+REPL 啟動（顯示第一個提示前）的匯入時間預算檢查：以 python -X importtime 量測，
+超過預算，或啟動時就匯入了應延後載入的重量級套件時以非 0 結束
+
+    python -m benchmarks.check_import_time                  # 預設預算 400 ms
+    python -m benchmarks.check_import_time --budget-ms 250 --runs 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# 與 main_rag_v2 的 LocalSession 相同：匯入並建立 Assistant 與 session（不含背景 preload）
+STARTUP = "import main_rag_v2; from tools.assistant import Assistant; Assistant().create_session()"
+# 收集大樓與日期時不需要的套件；出現在啟動路徑上就代表延遲載入失效
+DEFERRED = ["pandas", "numpy", "langchain", "langchain_core", "langchain_community", "chromadb",
+            "mcp", "selenium", "fastapi", "bs4", "lxml", "requests"]
+
+
+def parse_importtime(stderr):
+    """回傳 ({頂層模組: 累計 µs}, 所有匯入的模組名稱)"""
+    top_level = {}
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # 標題列
+        modules.add(name.strip())
+        # 巢狀匯入以縮排表示；只加總頂層，避免重複計算
+        if not name[1:].startswith(" "):
+            top_level[name.strip()] = int(cumulative)
+    return top_level, modules
+
+
+def measure():
+    env = dict(os.environ)
+    # 不要在 rag-file 下建立 schedule store
+    env["SCHEDULE_DB"] = os.path.join(tempfile.mkdtemp(prefix="import_time_"), "schedule.sqlite3")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", STARTUP], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise SystemExit(f"❌ 啟動程式碼執行失敗（exit {result.returncode}）")
+    return parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "400")))
+    parser.add_argument("--runs", type=int, default=3, help="取最快的一次，降低磁碟快取等雜訊")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(max(1, args.runs))]
+    top_level, modules = min(runs, key=lambda run: sum(run[0].values()))
+    total_ms = sum(top_level.values()) / 1000
+
+    print(f"{'module':<40}{'cumulative ms':>15}")
+    for name, us in sorted(top_level.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{name:<40}{us / 1000:>15.1f}")
+
+    failures = 0
+    deferred = sorted(m for m in DEFERRED if m in modules)
+    if deferred:
+        failures += 1
+        print(f"❌ 啟動時匯入了應延後載入的套件：{', '.join(deferred)}")
+    if total_ms > args.budget_ms:
+        failures += 1
+        print(f"❌ 匯入時間 {total_ms:.1f} ms 超過預算 {args.budget_ms:.0f} ms")
+    if failures:
+        raise SystemExit(1)
+    print(f"✅ 匯入時間 {total_ms:.1f} ms（預算 {args.budget_ms:.0f} ms），未匯入延後載入的套件")
+
+
+if __name__ == "__main__":
+    main()
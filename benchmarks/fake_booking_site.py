@@ -0,0 +1,140 @@
+"""
+本機替身預約網站：依 (大樓, 日期, 時段) 產生固定內容的查詢結果頁（結構與 booking_pages 相同）
+搭配 SiteDriver 取代 driver_service 的 Selenium 瀏覽器，爬取流程不需要連到正式網站
+"""
+import random
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import requests
+
+from benchmarks.booking_pages import render_page
+
+TOPICS = ["財作科早會", "R&D <週會>", "專案檢討 & 規劃", "面試", "客戶簡報", "教育訓練"]
+HOSTS = ["國泰人壽 財務部 陳品諭#3025", "國泰金控 資訊處 王小明", "國泰產險 企劃部 林怡君"]
+
+
+class FakeBookingSite:
+    """
+    rooms: 每棟大樓的會議室數；bookings: 每天的預約筆數
+    latency: 每個頁面請求的延遲（秒），模擬網站回應與瀏覽器渲染時間
+    """
+
+    def __init__(self, rooms=6, bookings=20, latency=0.05, seed=0):
+        self.latency = latency
+        self.seed = seed
+        self.requests = 0
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+        self.server = None
+        self.configure(rooms, bookings)
+
+    def configure(self, rooms=None, bookings=None, latency=None):
+        """換一組規模；同一組參數產生的頁面永遠相同"""
+        if rooms is not None:
+            self.rooms = rooms
+        if bookings is not None:
+            self.bookings = bookings
+        if latency is not None:
+            self.latency = latency
+        self._records = lru_cache(maxsize=256)(self._generate)
+
+    def room_list(self):
+        return [(f"{10 + i // 8}F", f"第{i + 1}會議室") for i in range(self.rooms)]
+
+    def _generate(self, building_code, date):
+        rng = random.Random(f"{self.seed}|{building_code}|{date}")
+        rooms = self.room_list()
+        records = []
+        for i in range(self.bookings):
+            _, room = rooms[rng.randrange(len(rooms))]
+            start = 8 * 60 + rng.randrange(0, 18) * 30
+            end = min(start + rng.choice([30, 60, 90, 120]), 18 * 60)
+            records.append({"building": "仁愛大樓", "room": room, "date": date,
+                            "start_time": f"{start // 60:02d}:{start % 60:02d}",
+                            "end_time": f"{end // 60:02d}:{end % 60:02d}",
+                            "topic": rng.choice(TOPICS), "host": rng.choice(HOSTS)})
+        return records
+
+    def records(self, building_code, date):
+        """某大樓某天的所有預約（date 為 YYYYMMDD）"""
+        return self._records(building_code, date)
+
+    def page(self, building_code, date, period):
+        # 與正式網站相同：跨中午的會議在上午、下午兩頁都會出現
+        if period == "MORNING":
+            keep = [r for r in self.records(building_code, date) if r["start_time"] < "12:00"]
+        else:
+            keep = [r for r in self.records(building_code, date) if r["end_time"] > "12:00"]
+        return render_page(building_code, self.room_list(), keep,
+                           date_label=f"{date[:4]}/{date[4:6]}/{date[6:]}", period=period)
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                time.sleep(site.latency)
+                body = site.page(query.get("building", "4"), query.get("date", "").replace("/", ""),
+                                 query.get("period", "MORNING")).encode("utf-8")
+                with site._lock:
+                    site.requests += 1
+                    site.bytes_served += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+class SiteDriver:
+    """Selenium WebDriver 的替身：load() 以 HTTP 向替身網站取頁，page_source 為最後載入的頁面"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.page_source = ""
+        self.current_url = base_url
+
+    def load(self, building_code, date, period):
+        self.current_url = f"{self.base_url}/frontend/mrm101w/index?" + urlencode(
+            {"building": building_code, "date": date, "period": period})
+        response = self.session.get(self.current_url, timeout=30)
+        response.raise_for_status()
+        self.page_source = response.text
+
+    def quit(self):
+        self.session.close()
+
+
+def install(driver_service, base_url):
+    """把 driver_service 的瀏覽器建立、登入、登入狀態檢查與查詢操作換成向替身網站取頁（pool、解析等其餘流程不變）"""
+    def apply_query(driver, start_date, end_date, building_code, period):
+        t0 = time.perf_counter()
+        driver.load(building_code, start_date, period)
+        return {"total_ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+    driver_service.create_driver = lambda: SiteDriver(base_url)
+    driver_service.login_driver = lambda driver, username, password: None
+    driver_service.is_logged_in = lambda driver: True
+    driver_service.apply_query = apply_query
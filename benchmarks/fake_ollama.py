@@ -0,0 +1,203 @@
+"""本機替身 Ollama 伺服器，讓 embedding / 對話效能測試不需要真正的模型"""
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+ANSWER_TEXT = "根據檢索到的資料，這間會議室在該時段已有預約，其他時段目前可以使用。"
+DEFAULT_KEEP_ALIVE = 300
+UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def keep_alive_seconds(value):
+    """Ollama 的 keep_alive：秒數或 "30m" 這類字串；負數代表永久保留"""
+    if value is None:
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        return value
+    match = re.fullmatch(r"(-?[\d.]+)(ms|s|m|h)?", str(value).strip())
+    if not match:
+        return DEFAULT_KEEP_ALIVE
+    return float(match.group(1)) * UNITS[match.group(2) or "s"]
+
+
+def fake_vector(text, dim):
+    # 依文字雜湊產生固定的單位向量，相同文字得到相同向量
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    vector = [rng.uniform(-1, 1) for _ in range(dim)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeOllama:
+    """
+    latency: 每個請求的固定延遲（秒）
+    per_item_latency: 每筆 embedding 額外的延遲（秒）
+    parallel: 同時處理的請求數，模擬 OLLAMA_NUM_PARALLEL
+    fail_rate: 回傳 503 的機率，用來驗證重試
+    first_token_latency / token_latency / output_tokens: /api/chat、/api/generate 的首字延遲、每個 token 的延遲與回答長度
+    load_latency: 模型不在記憶體時先載入的時間（秒）；依各請求的 keep_alive 決定何時卸載
+    """
+
+    def __init__(self, latency=0.02, per_item_latency=0.002, parallel=1, dim=768, fail_rate=0.0,
+                 first_token_latency=0.2, token_latency=0.01, output_tokens=40, load_latency=0.0):
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+        self.dim = dim
+        self.fail_rate = fail_rate
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.output_tokens = output_tokens
+        self.load_latency = load_latency
+        self.model_loads = 0
+        # 模型名稱 → 卸載時間
+        self._loaded = {}
+        self._load_lock = threading.Lock()
+        self.requests = 0
+        self.items = 0
+        self.chat_requests = 0
+        self.generated_tokens = 0
+        self._slots = threading.Semaphore(parallel)
+        self._lock = threading.Lock()
+        self.server = None
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/api/ps":
+                    return self._send(200, {"models": [{"name": name, "model": name} for name in fake.loaded()]})
+                self._send(404, {"error": f"unknown endpoint {self.path}"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if random.random() < fake.fail_rate:
+                    return self._send(503, {"error": "server busy"})
+
+                if self.path == "/api/embed":
+                    inputs = payload.get("input", [])
+                    inputs = [inputs] if isinstance(inputs, str) else inputs
+                    load = fake._ensure_loaded(payload)
+                    fake._work(len(inputs))
+                    fake._release(payload)
+                    return self._send(200, {"model": payload.get("model"), "load_duration": load,
+                                            "embeddings": [fake_vector(t, fake.dim) for t in inputs]})
+                if self.path == "/api/embeddings":
+                    load = fake._ensure_loaded(payload)
+                    fake._work(1)
+                    fake._release(payload)
+                    return self._send(200, {"embedding": fake_vector(payload.get("prompt", ""), fake.dim),
+                                            "load_duration": load})
+                if self.path in ("/api/chat", "/api/generate"):
+                    return self._generate(payload, chat=self.path == "/api/chat")
+                self._send(404, {"error": f"unknown endpoint {self.path}"})
+
+            def _generate(self, payload, chat):
+                if chat:
+                    prompt = "".join(str(m.get("content", "")) for m in payload.get("messages", []))
+                else:
+                    prompt = str(payload.get("prompt", ""))
+
+                def piece(text, done, **extra):
+                    body = {"model": payload.get("model"), "done": done, **extra}
+                    if chat:
+                        body["message"] = {"role": "assistant", "content": text}
+                    else:
+                        body["response"] = text
+                    return body
+
+                load = fake._ensure_loaded(payload)
+                if not prompt and not payload.get("messages"):
+                    # 與 Ollama 相同：沒有 prompt 時只載入模型
+                    fake._release(payload)
+                    return self._send(200, piece("", True, done_reason="load", load_duration=load))
+
+                # 與 Ollama 相同：預設逐 token 串流 NDJSON，最後一行帶 done 與 token 統計
+                stream = payload.get("stream", True)
+                tokens = [ANSWER_TEXT[i % len(ANSWER_TEXT)] for i in range(fake.output_tokens)]
+                stats = {"prompt_eval_count": len(prompt), "eval_count": len(tokens), "done_reason": "stop",
+                         "load_duration": load}
+                with fake._slots:
+                    time.sleep(fake.first_token_latency)
+                    if not stream:
+                        time.sleep(fake.token_latency * len(tokens))
+                        self._send(200, piece("".join(tokens), True, **stats))
+                    else:
+                        self.send_response(200)
+                        self.send_header("Content-Type", "application/x-ndjson")
+                        self.end_headers()
+                        for i, token in enumerate(tokens):
+                            if i:
+                                time.sleep(fake.token_latency)
+                            self.wfile.write((json.dumps(piece(token, False), ensure_ascii=False) + "\n").encode("utf-8"))
+                            self.wfile.flush()
+                        self.wfile.write((json.dumps(piece("", True, **stats)) + "\n").encode("utf-8"))
+                fake._release(payload)
+                with fake._lock:
+                    fake.chat_requests += 1
+                    fake.generated_tokens += len(tokens)
+
+        return Handler
+
+    def loaded(self):
+        now = time.monotonic()
+        with self._load_lock:
+            return [name for name, expires in self._loaded.items() if expires > now]
+
+    def unload_all(self):
+        with self._load_lock:
+            self._loaded.clear()
+
+    def _ensure_loaded(self, payload):
+        """模型不在記憶體時先花 load_latency 載入；回傳 load_duration（ns），與 Ollama 的回應相同"""
+        model = payload.get("model")
+        t0 = time.perf_counter()
+        with self._load_lock:
+            if self._loaded.get(model, 0) <= time.monotonic():
+                time.sleep(self.load_latency)
+                self.model_loads += 1
+            # 請求進行中不會被卸載；結束時再依 keep_alive 設定卸載時間
+            self._loaded[model] = float("inf")
+        return int((time.perf_counter() - t0) * 1e9)
+
+    def _release(self, payload):
+        keep_alive = keep_alive_seconds(payload.get("keep_alive"))
+        with self._load_lock:
+            self._loaded[payload.get("model")] = float("inf") if keep_alive < 0 else time.monotonic() + keep_alive
+
+    def _work(self, items):
+        with self._slots:
+            time.sleep(self.latency + self.per_item_latency * items)
+        with self._lock:
+            self.requests += 1
+            self.items += items
+
+    def start(self, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
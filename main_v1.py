@@ -1,7 +1,7 @@
 import os
-import time
 from datetime import datetime, timedelta
 from tools.mcp_search import search_meeting_rooms
+from tools.schedule_store import get_store
 from tools.memory import SimpleMemory
 from langchain_community.chat_models import ChatOllama
 from dotenv import load_dotenv
@@ -21,14 +21,9 @@ building_map = {
     "台中忠明": "19"
 }
 
-# 找出最新的某天 CSV
-def find_latest_csv(date_str: str) -> str:
-    pattern = f"{date_str}_query_"
-    candidates = [f for f in os.listdir(RAG_DIR) if f.startswith(pattern) and f.endswith(".csv")]
-    if not candidates:
-        return None
-    candidates.sort(reverse=True)
-    return os.path.join(RAG_DIR, candidates[0])
+# 找出某大樓某天最新的快照（爬取結果存在 schedule store，不再寫 CSV）
+def find_latest_snapshot(building: str, date_str: str):
+    return get_store().latest_snapshot(building_map[building], date_str)
 
 # 建立所有可能時段（30 分鐘間隔）
 def generate_all_slots(start="07:00", end="18:00", step=30):
@@ -50,10 +45,9 @@ def get_available_slots(reserved_slots, all_slots):
 def convert_to_slots(start, end, all_slots):
     return [slot for slot in all_slots if slot[0] >= start and slot[1] <= end]
 
-# 根據 CSV 判斷空閒時段（room → available slot list）
-def calculate_room_availability(csv_path: str):
-    import pandas as pd
-    df = pd.read_csv(csv_path)
+# 根據快照判斷空閒時段（room → available slot list）
+def calculate_room_availability(snapshot_id: int):
+    df = get_store().load_frame(snapshot_id)
     all_slots = generate_all_slots()
 
     room_reserved = {}
@@ -77,7 +71,7 @@ user_state = {
     "availability": None
 }
 
-last_loaded_csv = None
+last_loaded_snapshot = None
 memory = SimpleMemory()
 llm = ChatOllama(model=MODEL_NAME)
 
@@ -124,27 +118,26 @@ while True:
 
     # 已確認查詢條件，進行資料載入與處理
     if user_state["confirmed"] and user_state["schedule_df"] is None:
-        found_csv = find_latest_csv(user_state["date"])
+        snapshot = find_latest_snapshot(user_state["building"], user_state["date"])
 
-        if not found_csv:
+        if not snapshot:
             print(f"⚠️ 找不到 {user_state['date']} 的會議室資料，啟動 MCP 爬蟲工具查詢...")
             try:
                 formatted_date = f"{user_state['date'][:4]}/{user_state['date'][4:6]}/{user_state['date'][6:]}"
                 search_meeting_rooms(start_date=formatted_date, building_code=building_map[user_state["building"]])
-                time.sleep(3)
-                found_csv = find_latest_csv(user_state["date"])
+                snapshot = find_latest_snapshot(user_state["building"], user_state["date"])
             except Exception as e:
                 print("❌ MCP 工具執行失敗：", e)
 
-        if not found_csv:
+        if not snapshot:
             print(f"❌ 無法獲取 {user_state['date']} 的資料，請稍後再試。")
             continue
 
         print("📥 資料處理中...")
-        df, availability = calculate_room_availability(found_csv)
+        df, availability = calculate_room_availability(snapshot["id"])
         user_state["schedule_df"] = df
         user_state["availability"] = availability
-        last_loaded_csv = found_csv
+        last_loaded_snapshot = snapshot
 
         # 將預約與空閒時段寫入記憶
         schedule_text = df.to_csv(index=False)
@@ -0,0 +1,150 @@
+import os
+import re
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+from dotenv import load_dotenv
+
+# 載入環境變數
+load_dotenv()
+
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "1") == "1"
+# 是否以 embedding 相似度比對措辭不同的問題，以及判定為同一問題的 cosine 門檻
+ANSWER_CACHE_SEMANTIC = os.getenv("ANSWER_CACHE_SEMANTIC", "1") == "1"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+
+# 空白與中英文標點；語尾助詞不影響問題意思
+PUNCTUATION = re.compile(r"[\s\W_]+")
+TRAILING_PARTICLES = re.compile(r"[嗎呢吧啊呀]+$")
+
+
+# 上午 / 下午等時段用語：數字相同但時段不同的問題不是同一個問題
+TIME_OF_DAY = {"上午": "am", "早上": "am", "morning": "am", "中午": "noon", "noon": "noon",
+               "下午": "pm", "afternoon": "pm", "晚上": "evening", "傍晚": "evening", "evening": "evening"}
+SIGNATURE_TOKENS = re.compile(r"(\d+)(am|pm)?|" + "|".join(TIME_OF_DAY))
+
+
+def number_signature(normalized):
+    """問題中的數字與時段用語（依出現順序）；兩個問題的簽章不同就不能共用回答"""
+    signature = []
+    for match in SIGNATURE_TOKENS.finditer(normalized):
+        digits, meridiem = match.groups()
+        if digits:
+            signature.append(digits)
+            if meridiem:
+                signature.append(meridiem)
+        else:
+            signature.append(TIME_OF_DAY[match.group(0)])
+    return tuple(signature)
+
+
+def context_key(messages):
+    """回答所依據的對話歷史；「那下午呢」這類追問的意思取決於前文，前文不同不能共用回答"""
+    if not messages:
+        return ""
+    text = "\x00".join(f"{m['role']}\x01{normalize_question(m['content'])}" for m in messages)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_question(question):
+    text = PUNCTUATION.sub("", unicodedata.normalize("NFKC", question).lower())
+    return TRAILING_PARTICLES.sub("", text)
+
+
+class AnswerCache:
+    """
+    以 (排程快照 ID, 對話歷史, 正規化後的問題) 為鍵的回答快取，各 session 共用
+    embed_fn 有值時，完全相同的問題沒有命中會再以 embedding 相似度比對同一快照、同一段歷史下的問題
+    """
+
+    def __init__(self, embed_fn=None, threshold=ANSWER_CACHE_THRESHOLD, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # 快照 ID → {問題鍵: 單位向量}
+        self._vectors = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    def _embed(self, question):
+        vector = np.asarray(self.embed_fn(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, snapshot_id, question, context=""):
+        """
+        context 為 context_key(對話歷史)；沒有歷史（第一個問題）時為空字串
+        回傳 (回答 dict, 命中方式 exact / semantic)，沒有命中時回傳 (None, None)
+        """
+        key = (snapshot_id, context, normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry, "exact"
+            candidates = dict(self._vectors.get(snapshot_id, {}))
+
+        # 數字或時段不同（第1 / 第2會議室、14:00 / 15:00、上午 / 下午）的問題即使相似度很高也不能共用回答
+        signature = number_signature(key[2])
+        candidates = {k: v for k, v in candidates.items() if k[1] == context and number_signature(k[2]) == signature}
+        if self.embed_fn and candidates:
+            vector = self._embed(question)
+            keys = list(candidates)
+            scores = np.stack([candidates[k] for k in keys]) @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                with self._lock:
+                    entry = self._entries.get(keys[best])
+                    if entry is not None:
+                        self._entries.move_to_end(keys[best])
+                        self.semantic_hits += 1
+                        return {**entry, "similarity": round(float(scores[best]), 4)}, "semantic"
+
+        with self._lock:
+            self.misses += 1
+        return None, None
+
+    def put(self, snapshot_id, question, answer, sources=None, context=""):
+        key = (snapshot_id, context, normalize_question(question))
+        vector = self._embed(question) if self.embed_fn else None
+        with self._lock:
+            self._entries[key] = {"answer": answer, "sources": sources or []}
+            self._entries.move_to_end(key)
+            if vector is not None:
+                self._vectors.setdefault(snapshot_id, {})[key] = vector
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._vectors.get(old_key[0], {}).pop(old_key, None)
+
+    def invalidate(self, snapshot_id):
+        """快照被新的爬取結果取代時，清除該快照的所有回答"""
+        with self._lock:
+            keys = [k for k in self._entries if k[0] == snapshot_id]
+            for key in keys:
+                del self._entries[key]
+            self._vectors.pop(snapshot_id, None)
+            self.invalidated += len(keys)
+            return len(keys)
+
+    def stats(self):
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            total = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 3) if total else 0.0,
+                "invalidated": self.invalidated,
+                "semantic": self.embed_fn is not None,
+                "threshold": self.threshold,
+            }
@@ -0,0 +1,523 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+from dotenv import load_dotenv
+
+try:
+    from tools.memory import SimpleMemory, make_llm_summarizer, estimate_tokens
+    from tools.schedule_store import get_store
+    from tools.lazy_import import LazyModule
+    from tools import tracing
+except ImportError:
+    from memory import SimpleMemory, make_llm_summarizer, estimate_tokens
+    from schedule_store import get_store
+    from lazy_import import LazyModule
+    import tracing
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas、langchain、Chroma 與 MCP 工具載入要好幾秒，收集大樓與日期時用不到：第一次使用或 preload() 時才匯入
+mcp_search = LazyModule("mcp_search", __package__)
+availability = LazyModule("availability", __package__)
+availability_engine = LazyModule("availability_engine", __package__)
+rag = LazyModule("rag_csv_tool", __package__)
+answer_cache_module = LazyModule("answer_cache", __package__)
+chat_models = LazyModule("langchain_community.chat_models")
+model_warmup = LazyModule("model_warmup", __package__)
+PIPELINE_MODULES = [mcp_search, availability, availability_engine, rag, answer_cache_module, chat_models, model_warmup]
+
+# 載入環境變數
+load_dotenv()
+
+MODEL_NAME = os.getenv("MODEL_NAME", "gemma3:12b")
+# direct：檢索後與對話紀錄組成單一 prompt，只生成一次；chain：保留 RetrievalQA 先生成再改寫的流程
+RAG_MODE = os.getenv("RAG_MODE", "direct")
+# 各 session 共用的已載入排程數量上限（以快照為單位）
+SCHEDULE_CACHE_SIZE = int(os.getenv("SCHEDULE_CACHE_SIZE", "32"))
+# 淘汰的對話是否以 LLM 併入滾動摘要（會多一次生成，預設關閉）
+MEMORY_SUMMARIZE = os.getenv("MEMORY_SUMMARIZE", "0") == "1"
+
+# 建築對應表
+building_map = {
+    "仁愛": "4",
+    "松仁": "6",
+    "瑞湖": "12",
+    "信義安和": "15",
+    "台中忠明": "19"
+}
+
+# 日期解析函數
+def parse_relative_date(query: str) -> str:
+    """解析相對日期表達"""
+    today = datetime.now()
+
+    if "今天" in query or "今日" in query:
+        return today.strftime("%Y%m%d")
+    elif "明天" in query or "明日" in query:
+        return (today + timedelta(days=1)).strftime("%Y%m%d")
+    elif "後天" in query:
+        return (today + timedelta(days=2)).strftime("%Y%m%d")
+    elif "大後天" in query:
+        return (today + timedelta(days=3)).strftime("%Y%m%d")
+    elif "下週" in query or "下周" in query:
+        return (today + timedelta(days=7)).strftime("%Y%m%d")
+
+    return None
+
+def parse_absolute_date(query: str) -> str:
+    for fmt in ["%Y/%m/%d", "%Y-%m-%d", "%Y%m%d"]:
+        try:
+            return datetime.strptime(query[:10], fmt).strftime("%Y%m%d")
+        except ValueError:
+            continue
+    return None
+
+# 根據排程資料判斷空閒時段（room → available slot list）
+# 一次向量化計算，結果同時提供給空閒查詢引擎與向量資料庫使用
+def calculate_room_availability(df: "pd.DataFrame", building: str = None, date_str: str = None):
+    building_code = building_map.get(building)
+    with tracing.span("calculate_room_availability", building=building_code, date=date_str, meetings=len(df)) as span:
+        schedule = availability.derive_schedule(df, building_code=building_code, date=date_str,
+                                                rooms_catalog=rag.meeting_rooms.get(building_code),
+                                                building_name=f"{building}大樓" if building else None)
+        free_slots = schedule.availability()
+        span.set(rooms=len(schedule.rooms))
+    return schedule, free_slots
+
+
+def status(text):
+    return {"type": "status", "text": text}
+
+
+class LoadedSchedule:
+    """某大樓某天的快照，載入後由所有 session 共用"""
+
+    def __init__(self, snapshot, schedule, availability, engine, rag_ready):
+        self.snapshot = snapshot
+        self.schedule = schedule
+        self.df = schedule.df
+        self.availability = availability
+        self.engine = engine
+        self.rag_ready = rag_ready
+
+
+class ChatSession:
+    """單一使用者的對話狀態"""
+
+    def __init__(self, session_id=None, memory=None):
+        self.id = session_id or uuid.uuid4().hex
+        self.building = None
+        self.date = None
+        self.confirmed = False
+        self.awaiting_confirmation = False
+        self.loaded = None
+        self.memory = memory if memory is not None else SimpleMemory()
+        # 同一個 session 一次只處理一則訊息
+        self.lock = threading.Lock()
+        self.last_active = time.time()
+
+    def to_dict(self):
+        return {
+            "session_id": self.id,
+            "building": self.building,
+            "date": self.date,
+            "confirmed": self.confirmed,
+            "awaiting_confirmation": self.awaiting_confirmation,
+            "snapshot_id": self.loaded.snapshot["id"] if self.loaded else None,
+            "messages": len(self.memory),
+            "last_active": self.last_active,
+        }
+
+
+class Assistant:
+    """
+    會議室助理的對話流程；LLM client、向量資料庫與已載入的排程由所有 session 共用
+    reply() 以事件串流回傳：status（狀態訊息）、start / token / end（回答的開始、片段與結束）
+    """
+
+    def __init__(self, model_name=MODEL_NAME, rag_mode=RAG_MODE, cache_size=SCHEDULE_CACHE_SIZE):
+        self.model_name = model_name
+        self.rag_mode = rag_mode
+        self._llm = None
+        self._answer_cache = None
+        self._answer_cache_ready = False
+        self._init_lock = threading.Lock()
+        self._warmup_lock = threading.Lock()
+        self.warmup_results = None
+        # 最近的首字延遲，依模型是否需要先從磁碟載入分成 cold / warm
+        self._ttft = {"cold": deque(maxlen=200), "warm": deque(maxlen=200)}
+        self.store = get_store()
+        self.cache_size = cache_size
+        self.documents_chain = None
+        self._rag_lock = threading.Lock()
+        self._schedules = OrderedDict()
+        self._schedules_lock = threading.Lock()
+        # 同一 (大樓, 日期) 同時只有一個 session 在爬取 / 載入
+        self._load_locks = {}
+
+    @property
+    def llm(self):
+        """ChatOllama client 在第一次使用時才建立"""
+        if self._llm is None:
+            with self._init_lock:
+                if self._llm is None:
+                    self._llm = chat_models.ChatOllama(model=self.model_name, base_url=model_warmup.OLLAMA_HOST,
+                                                       keep_alive=model_warmup.keep_alive_value())
+        return self._llm
+
+    @llm.setter
+    def llm(self, value):
+        self._llm = value
+
+    @property
+    def answer_cache(self):
+        """各 session 共用的回答快取；ANSWER_CACHE=0 時為 None"""
+        if not self._answer_cache_ready:
+            with self._init_lock:
+                if not self._answer_cache_ready:
+                    if answer_cache_module.ANSWER_CACHE:
+                        embed_fn = (lambda q: rag.get_embeddings().embed_query(q)) if answer_cache_module.ANSWER_CACHE_SEMANTIC else None
+                        self._answer_cache = answer_cache_module.AnswerCache(embed_fn=embed_fn)
+                    self._answer_cache_ready = True
+        return self._answer_cache
+
+    @answer_cache.setter
+    def answer_cache(self, value):
+        self._answer_cache = value
+        self._answer_cache_ready = True
+
+    def preload(self):
+        """匯入排程 / RAG 相關模組並建立 LLM client 與向量資料庫連線；REPL 在收集參數時於背景執行"""
+        for module in PIPELINE_MODULES:
+            module.load()
+        # 屬性第一次存取時建立
+        _ = self.llm, self.answer_cache
+        rag.get_collections()
+        self.warm_up()
+
+    def warm_up(self, background=False):
+        """
+        預先把對話與 embedding 模型載入 Ollama（OLLAMA_WARMUP=0 時不做），已在記憶體中的模型會跳過
+        同時只有一個 warm-up 在執行；background=True 時在背景執行緒進行
+        """
+        if background:
+            threading.Thread(target=self.warm_up, daemon=True).start()
+            return None
+        if not self._warmup_lock.acquire(blocking=False):
+            return None
+        try:
+            if not model_warmup.OLLAMA_WARMUP:
+                return None
+            self.warmup_results = model_warmup.warm_up(
+                self.model_name, rag.EMBEDDING_MODEL, base_url=getattr(self.llm, "base_url", model_warmup.OLLAMA_HOST))
+            return self.warmup_results
+        finally:
+            self._warmup_lock.release()
+
+    def ttft_stats(self):
+        """冷啟動（需要先載入模型）與模型已在記憶體時的首字延遲"""
+        stats = {}
+        for state, values in self._ttft.items():
+            values = list(values)
+            stats[state] = {"count": len(values),
+                            "p50_ms": round(tracing.percentile(values, 50), 1) if values else None,
+                            "p95_ms": round(tracing.percentile(values, 95), 1) if values else None}
+        return stats
+
+    def create_session(self, session_id=None):
+        summarizer = make_llm_summarizer(self.llm) if MEMORY_SUMMARIZE else None
+        return ChatSession(session_id, memory=SimpleMemory(summarizer=summarizer))
+
+    def find_latest_snapshot(self, building, date_str):
+        # schedule store 以索引查詢，不再掃描 rag-file 目錄
+        return self.store.latest_snapshot(building_map[building], date_str)
+
+    def _load_lock(self, key):
+        with self._schedules_lock:
+            return self._load_locks.setdefault(key, threading.Lock())
+
+    def _cached(self, snapshot_id):
+        with self._schedules_lock:
+            loaded = self._schedules.get(snapshot_id)
+            if loaded is not None:
+                self._schedules.move_to_end(snapshot_id)
+            return loaded
+
+    def _remember(self, loaded):
+        with self._schedules_lock:
+            self._schedules[loaded.snapshot["id"]] = loaded
+            while len(self._schedules) > self.cache_size:
+                self._schedules.popitem(last=False)
+
+    def _forget(self, snapshot_id):
+        with self._schedules_lock:
+            self._schedules.pop(snapshot_id, None)
+
+    def _refresh_if_replaced(self, session):
+        """
+        背景預抓或其他 session 重新爬取後，session 仍持有舊快照；
+        偵測到較新的快照就重新載入，並讓舊快照的快取回答失效
+        """
+        latest = self.find_latest_snapshot(session.building, session.date)
+        old_id = session.loaded.snapshot["id"]
+        if not latest or latest["id"] == old_id:
+            return []
+        loaded, events = self.load_schedule(session.building, session.date)
+        if loaded is None:
+            return events
+        session.loaded = loaded
+        self._forget(old_id)
+        if self.answer_cache:
+            self.answer_cache.invalidate(old_id)
+        return [status(f"🔄 偵測到較新的排程資料（{latest['crawled_at']}），已重新載入")] + events
+
+    def cached_schedules(self):
+        with self._schedules_lock:
+            return [{"snapshot_id": sid, "building_code": l.snapshot["building_code"], "date": l.snapshot["date"]}
+                    for sid, l in self._schedules.items()]
+
+    def _ensure_rag(self):
+        with self._rag_lock:
+            rag.get_collections()
+            # chain 模式只使用 RetrievalQA 的文件組合鏈，檢索一律依 session 的大樓 / 日期過濾
+            if self.rag_mode == "chain" and self.documents_chain is None:
+                self.documents_chain = rag.load_combine_documents_chain()
+
+    def load_schedule(self, building, date_str):
+        """取得快照（沒有時啟動爬蟲）並載入；回傳 (LoadedSchedule 或 None, 狀態事件 list)"""
+        events = []
+        with tracing.span("load_schedule", building=building_map.get(building), date=date_str) as span, \
+                self._load_lock((building, date_str)):
+            snapshot = self.find_latest_snapshot(building, date_str)
+            if not snapshot:
+                events.append(status(f"⚠️ 找不到 {date_str} 的會議室資料，啟動 MCP 爬蟲工具查詢..."))
+                try:
+                    formatted_date = f"{date_str[:4]}/{date_str[4:6]}/{date_str[6:]}"
+                    # search_meeting_rooms 會在資料寫入後才返回，不需要額外等待
+                    mcp_search.search_meeting_rooms(start_date=formatted_date, building_code=building_map[building])
+                    snapshot = self.find_latest_snapshot(building, date_str)
+                except Exception as e:
+                    events.append(status(f"❌ MCP 工具執行失敗：{e}"))
+            if not snapshot:
+                return None, events
+
+            loaded = self._cached(snapshot["id"])
+            span.set(snapshot_id=snapshot["id"], cached=loaded is not None)
+            if loaded is not None:
+                return loaded, events
+
+            events.append(status("📥 資料處理中..."))
+            df = self.store.load_frame(snapshot["id"])
+            schedule, availability = calculate_room_availability(df, building, date_str)
+            engine = availability_engine.AvailabilityEngine(schedule.df, building_map[building])
+
+            # 建立 RAG 向量資料庫
+            rag_ready = False
+            try:
+                events.append(status("🔄 建立向量資料庫..."))
+                rag.build_vectorstore_from_csv(schedule, building_code=building_map[building], date=date_str)
+                self._ensure_rag()
+                rag_ready = True
+                events.append(status(f"✅ RAG 系統已啟用（模式: {self.rag_mode}）"))
+            except Exception as e:
+                events.append(status(f"⚠️ RAG 初始化失敗，使用基本模式: {e}"))
+
+            loaded = LoadedSchedule(snapshot, schedule, availability, engine, rag_ready)
+            self._remember(loaded)
+            return loaded, events
+
+    def _stream(self, messages, label="AI 回答：", started=None):
+        """
+        邊生成邊送出 token 事件；產生器的回傳值為 (完整文字, 各階段耗時 ms)
+        started 為使用者送出問題的時間點，首字延遲包含檢索等前置步驟
+        """
+        yield {"type": "start", "label": label}
+        parts = []
+        ttft = None
+        t0 = time.perf_counter()
+        started = started or t0
+        with tracing.span("llm.stream", model=self.model_name, messages=len(messages)) as span:
+            usage = {}
+            load_ms = None
+            for chunk in self.llm.stream(messages):
+                # Ollama 在最後一個（沒有內容的）chunk 回報實際的 token 數與模型載入時間
+                metadata = getattr(chunk, "response_metadata", None) or {}
+                if "eval_count" in metadata:
+                    usage = {"prompt_tokens": metadata.get("prompt_eval_count"), "output_tokens": metadata["eval_count"]}
+                if metadata.get("load_duration") is not None:
+                    load_ms = metadata["load_duration"] / 1e6
+                if not chunk.content:
+                    continue
+                if ttft is None:
+                    ttft = (time.perf_counter() - started) * 1000
+                parts.append(chunk.content)
+                yield {"type": "token", "text": chunk.content}
+            if span:
+                # 模型沒有回報時以字數估算
+                span.set(prompt_tokens=usage.get("prompt_tokens") or sum(estimate_tokens(m["content"]) for m in messages),
+                         output_tokens=usage.get("output_tokens") or estimate_tokens("".join(parts)),
+                         token_source="ollama" if usage else "estimate",
+                         ttft_ms=round(ttft, 1) if ttft is not None else None)
+            cold = load_ms is not None and load_ms >= model_warmup.COLD_LOAD_MS
+            span.set(load_ms=round(load_ms, 1) if load_ms is not None else None, cold=cold)
+        total = (time.perf_counter() - t0) * 1000
+        timings = {"ttft": ttft if ttft is not None else (time.perf_counter() - started) * 1000, "generate": total}
+        self._ttft["cold" if cold else "warm"].append(timings["ttft"])
+        if cold:
+            # 首字延遲中有這段時間花在載入模型
+            timings["load"] = load_ms
+        return "".join(parts), timings
+
+    def _answer_with_rag(self, query, recent_messages, building_code, date_str):
+        """檢索 + 串流回答；產生器的回傳值為 (答案, 來源文件, 各階段耗時 ms)"""
+        timings = {}
+        t0 = started = time.perf_counter()
+        # 只檢索這個 session 的大樓與日期
+        sources = rag.retrieve(query, building_code=building_code, date=date_str)
+        if self.rag_mode == "chain":
+            # 與 RetrievalQA 內部相同的兩步（檢索 → 文件組合鏈生成），拆開以分別計時
+            t1 = time.perf_counter()
+            with tracing.span("llm.chain", model=self.model_name, documents=len(sources)):
+                rag_answer = self.documents_chain.run(input_documents=sources, question=query)
+            t2 = time.perf_counter()
+            timings["retrieve"] = (t1 - t0) * 1000
+            timings["chain"] = (t2 - t1) * 1000
+            context_prompt = f"使用者問題：{query}\n\n檢索到的相關資訊：{rag_answer}\n\n請根據以上資訊精確回答使用者的問題。"
+        else:
+            timings["retrieve"] = (time.perf_counter() - t0) * 1000
+            context_prompt = rag.build_rag_prompt(query, sources)
+
+        answer, generate_timings = yield from self._stream(
+            recent_messages + [{"role": "user", "content": context_prompt}], started=started)
+        timings.update(generate_timings)
+        return answer, sources, timings
+
+    def reply(self, session, query):
+        """處理一則使用者訊息，回傳事件的產生器"""
+        with tracing.span("reply", session=session.id, building=building_map.get(session.building), date=session.date):
+            yield from self._reply(session, query)
+
+    def _reply(self, session, query):
+        session.last_active = time.time()
+        memory = session.memory
+
+        # 簡化的 system prompt（只在初始化時設定一次）
+        if len(memory) == 0:
+            current_date = datetime.now().strftime("%Y年%m月%d日")
+            system_prompt = f"你是會議室排程助理，今天是{current_date}，根據提供的資訊精確回答會議室相關問題。"
+            memory.append("system", system_prompt)
+
+        # 還沒收集到足夠參數 → 進入收集模式
+        if not session.confirmed:
+            if session.awaiting_confirmation:
+                session.awaiting_confirmation = False
+                if query.strip().lower() == "y":
+                    session.confirmed = True
+                else:
+                    yield status("已取消，請重新提供查詢的建築名稱與日期（如 2025/07/14 仁愛 或 20250714）。")
+                    return
+            else:
+                for bname in building_map:
+                    if bname in query:
+                        session.building = bname
+                        break
+
+                # 先嘗試解析相對日期，再嘗試解析絕對日期
+                parsed_date = parse_relative_date(query) or parse_absolute_date(query)
+                if parsed_date:
+                    session.date = parsed_date
+
+                if session.building and session.date:
+                    session.awaiting_confirmation = True
+                    yield status(f"確認查詢資訊如下：\n- 大樓：{session.building}\n- 日期：{session.date}\n是否確認以上查詢？(y/n)")
+                else:
+                    yield status("請提供查詢的建築名稱與日期（如 2025/07/14 仁愛 或 20250714）。")
+                return
+
+        # 已確認查詢條件，進行資料載入與處理
+        if session.loaded is None:
+            loaded, events = self.load_schedule(session.building, session.date)
+            yield from events
+            if loaded is None:
+                # 讓使用者可以重新確認後再試一次
+                session.confirmed = False
+                yield status(f"❌ 無法獲取 {session.date} 的資料，請稍後再試。")
+                return
+            session.loaded = loaded
+
+            # 清理記憶，只保留對話上下文
+            memory.clear_context()  # 清除舊的資料上下文
+            yield status("✅ 載入完成，您現在可以詢問與會議室預約或空閒時段相關的問題。")
+            return
+
+        # 已完成載入 → 直接使用 RAG
+        yield from self._refresh_if_replaced(session)
+        memory.append("user", query)
+
+        # 空閒時段類問題直接由結構化查詢回答，解析不出意圖時才交給 LLM
+        direct_answer = session.loaded.engine.answer(query)
+        if direct_answer:
+            tracing.annotate(path="engine")
+            memory.append("assistant", direct_answer)
+            yield {"type": "start", "label": "AI 回答："}
+            yield {"type": "token", "text": direct_answer}
+            yield {"type": "end"}
+            return
+
+        # 同一份快照問過相同（或相似）的問題，直接使用之前的回答
+        snapshot_id = session.loaded.snapshot["id"]
+        # 回答會參考最近的對話，快取鍵要包含送進 prompt 的歷史（最後一則是目前的問題）
+        recent_messages = memory.get_recent_messages(3)
+        context = answer_cache_module.context_key(recent_messages[:-1]) if self.answer_cache else ""
+        if self.answer_cache and session.loaded.rag_ready:
+            t0 = time.perf_counter()
+            with tracing.span("answer_cache.get", semantic=self.answer_cache.embed_fn is not None) as span:
+                try:
+                    cached, how = self.answer_cache.get(snapshot_id, query, context)
+                except Exception:
+                    cached, how = None, None
+                span.set(hit=how)
+            if cached:
+                tracing.annotate(path=f"cache_{how}")
+                memory.append("assistant", cached["answer"])
+                yield {"type": "start", "label": "AI 回答（快取）：" if how == "exact" else "AI 回答（相似問題快取）："}
+                yield {"type": "token", "text": cached["answer"]}
+                yield {"type": "end", "timings": {"cache": (time.perf_counter() - t0) * 1000}, "sources": cached["sources"]}
+                return
+
+        # 使用簡化的上下文（只包含最近 3 輪對話）
+        if session.loaded.rag_ready:
+            yield status("🔍 RAG 檢索中...")
+            tracing.annotate(path="rag")
+            try:
+                answer, sources, timings = yield from self._answer_with_rag(
+                    query, recent_messages, building_map[session.building], session.date)
+                # 串流結束後才寫入完整回答
+                memory.append("assistant", answer)
+                source_texts = [doc.page_content for doc in sources[:2]]
+                if self.answer_cache and answer:
+                    try:
+                        self.answer_cache.put(snapshot_id, query, answer, source_texts, context)
+                    except Exception:
+                        pass
+                yield {"type": "end", "timings": timings, "sources": source_texts}
+                return
+            except Exception as e:
+                yield status(f"⚠️ RAG 檢索失敗： {e}")
+                tracing.annotate(path="basic", rag_error=str(e))
+                label = "AI 回答（基本模式）："
+        else:
+            # 沒有 RAG 時的基本模式
+            tracing.annotate(path="basic")
+            label = "AI 回答："
+
+        answer, timings = yield from self._stream(
+            memory.get_recent_messages(3) + [{"role": "user", "content": query}], label=label)
+        memory.append("assistant", answer)
+        yield {"type": "end", "timings": timings}
+
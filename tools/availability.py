@@ -0,0 +1,225 @@
+import os
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+# 載入環境變數
+load_dotenv()
+
+# 全系統共用的時段設定：營業時間與切分粒度（分鐘）
+DAY_START = os.getenv("SLOT_DAY_START", "08:00")
+DAY_END = os.getenv("SLOT_DAY_END", "18:00")
+SLOT_MINUTES = int(os.getenv("SLOT_MINUTES", "30"))
+
+
+def to_minutes(hhmm):
+    hour, minute = str(hhmm).split(":")
+    return int(hour) * 60 + int(minute)
+
+def to_hhmm(minutes):
+    minutes = int(minutes)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class SlotGrid:
+    """
+    一天固定寬度的時段陣列；每間會議室每天的佔用狀態是一列 bool（True = 已預約）
+    預約與時段只要有重疊就算佔用
+    """
+
+    def __init__(self, day_start=DAY_START, day_end=DAY_END, step=SLOT_MINUTES):
+        self.start = to_minutes(day_start)
+        self.end = to_minutes(day_end)
+        self.step = step
+        self.n = -(-(self.end - self.start) // step)
+        # 各時段的起點；最後一段不超過營業結束時間
+        self.edges = np.minimum(self.start + np.arange(self.n + 1) * step, self.end)
+
+    def slots(self):
+        return [(to_hhmm(s), to_hhmm(e)) for s, e in zip(self.edges[:-1], self.edges[1:])]
+
+    def slot_range(self, starts, ends):
+        """預約（分鐘）對應到的時段索引區間 [first, last)"""
+        starts = np.asarray(starts)
+        ends = np.asarray(ends)
+        first = np.clip((starts - self.start) // self.step, 0, self.n)
+        last = np.clip(-(-(ends - self.start) // self.step), 0, self.n)
+        return first, np.maximum(last, first)
+
+    def occupancy(self, group_index, starts, ends, n_groups):
+        """一次套用所有預約，回傳 (n_groups, n) 的佔用矩陣；group_index 為每筆預約所屬的列"""
+        first, last = self.slot_range(starts, ends)
+        diff = np.zeros((n_groups, self.n + 1), dtype=np.int32)
+        np.add.at(diff, (group_index, first), 1)
+        np.add.at(diff, (group_index, last), -1)
+        return np.cumsum(diff[:, :self.n], axis=1) > 0
+
+    def free_intervals(self, busy_row):
+        """把一列佔用狀態轉成合併後的空閒區間（分鐘）"""
+        free = np.concatenate(([0], (~busy_row).astype(np.int8), [0]))
+        changes = np.flatnonzero(np.diff(free))
+        return [(int(self.edges[s]), int(self.edges[e])) for s, e in zip(changes[::2], changes[1::2])]
+
+    def free_slots(self, busy_row):
+        """空閒的單一時段，格式同 generate_all_slots"""
+        return [(to_hhmm(self.edges[i]), to_hhmm(self.edges[i + 1])) for i in np.flatnonzero(~busy_row)]
+
+
+def merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def subtract_intervals(window, busy):
+    """從時間窗中扣除已合併排序的佔用區間（皆為分鐘），回傳空閒區間"""
+    start, end = window
+    free = []
+    cursor = start
+    for b_start, b_end in busy:
+        if b_end <= cursor:
+            continue
+        if b_start >= end:
+            break
+        if b_start > cursor:
+            free.append((cursor, b_start))
+        cursor = max(cursor, b_end)
+    if cursor < end:
+        free.append((cursor, end))
+    return free
+
+
+MEETING_COLUMNS = ["building", "room", "date", "start_time", "end_time", "topic", "host"]
+
+
+def minutes_series(series):
+    """向量化把 "HH:MM" 欄位轉成分鐘整數"""
+    parts = series.astype(str).str.extract(r"(\d{1,2}):(\d{2})").astype(float)
+    return (parts[0] * 60 + parts[1]).fillna(0).astype(np.int32).to_numpy()
+
+
+class DerivedSchedule:
+    """
+    一次讀取、一次計算的排程結果：
+    df     依 (date, room, start) 排序、含分鐘欄位的預約資料
+    rooms  每列為一個 (date, building, room)，與 busy 矩陣的列對應
+    busy   SlotGrid 佔用矩陣
+    """
+
+    def __init__(self, df, rooms, busy, grid, building_code, building_name, date):
+        self.df = df
+        self.rooms = rooms
+        self.busy = busy
+        self.grid = grid
+        self.building_code = building_code
+        self.building_name = building_name
+        self.date = date
+        self._labels = np.array([f"{s}-{e}" for s, e in grid.slots()], dtype=object)
+        self._slots = grid.slots()
+
+    def reserved_records(self):
+        return self.df[MEETING_COLUMNS].to_dict(orient="records")
+
+    def free_slots(self, row):
+        return [self._slots[i] for i in np.flatnonzero(~self.busy[row])]
+
+    def availability(self):
+        """有預約紀錄的會議室 → 空閒時段 list（與舊版 calculate_room_availability 相同格式）"""
+        booked = self.rooms.index[self.rooms["booked"]]
+        multi_day = self.rooms["date"].nunique() > 1
+        result = {}
+        for row in booked:
+            info = self.rooms.loc[row]
+            key = f"{info['building']} {info['room']}"
+            result[f"{info['date']} {key}" if multi_day else key] = self.free_slots(row)
+        return result
+
+    def available_slot_labels(self):
+        """每列會議室的空閒時段字串 list，例如 ["08:00-08:30", ...]"""
+        return [list(self._labels[~row]) for row in self.busy]
+
+    def reserved_texts(self):
+        df = self.df
+        return ("會議室: " + df["building"] + " " + df["room"] + "\n日期: " + df["date"]
+                + "\n時間: " + df["start_time"] + "-" + df["end_time"]
+                + "\n主題: " + df["topic"] + "\n主辦: " + df["host"] + "\n狀態: 已預約").tolist()
+
+    def dates(self):
+        return sorted(self.rooms["date"].unique())
+
+    def availability_texts(self):
+        """目錄內會議室的可用時段文字，回傳 (列索引, 文字)；沒有樓層 / 人數資料的會議室不產生"""
+        texts = []
+        for row, labels in zip(self.rooms.itertuples(), self.available_slot_labels()):
+            if pd.isna(row.capacity):
+                continue
+            text = (f"會議室: {self.building_name} {row.room}\n樓層: {row.floor}\n容納人數: {int(row.capacity)}人\n"
+                    f"日期: {row.date}\n可用時段: {', '.join(labels) if labels else '無'}\n"
+                    f"狀態: {'部分可用' if labels else '全日預約'}")
+            texts.append((row.Index, text))
+        return texts
+
+
+def derive_schedule(source, building_code=None, date=None, rooms_catalog=None, building_name=None, grid=None):
+    """
+    讀取 CSV 路徑或 DataFrame，向量化算出預約清單、空閒時段與 RAG 文件文字
+    rooms_catalog: meeting_rooms[building_code]，{樓層: {會議室: 人數}}；沒有預約的會議室也會納入
+    building_name: 可用時段文件上顯示的大樓名稱
+    """
+    if isinstance(source, DerivedSchedule):
+        return source
+    df = source.copy() if isinstance(source, pd.DataFrame) else pd.read_csv(source, dtype=str)
+    grid = grid or SlotGrid()
+    for column in MEETING_COLUMNS:
+        if column not in df.columns:
+            df[column] = ""
+    df[MEETING_COLUMNS] = df[MEETING_COLUMNS].fillna("").astype(str)
+    df["start_min"] = minutes_series(df["start_time"])
+    df["end_min"] = minutes_series(df["end_time"])
+    df = df.sort_values(["date", "room", "start_min"], kind="stable").reset_index(drop=True)
+
+    if date is None:
+        date = df["date"].iloc[0] if not df.empty else ""
+    if building_name is None:
+        building_name = df["building"].iloc[0] if not df.empty else ""
+
+    booked = df[["date", "building", "room"]].drop_duplicates()
+    booked = booked.assign(booked=True)
+    frames = [booked]
+    catalog = pd.DataFrame(
+        [{"room": room, "floor": floor, "capacity": capacity}
+         for floor, rooms in (rooms_catalog or {}).items() for room, capacity in rooms.items()],
+        columns=["room", "floor", "capacity"])
+    if not catalog.empty:
+        # 目錄內的會議室在每一天都要有一列，全天空閒也會出現
+        dates = sorted(df["date"].unique()) or [date]
+        listed = catalog[["room"]].merge(pd.DataFrame({"date": dates}), how="cross")
+        frames.append(listed.assign(building=building_name, booked=False))
+    rooms = (pd.concat(frames, ignore_index=True)
+             .sort_values("booked", ascending=False, kind="stable")
+             .drop_duplicates(["date", "room"])
+             .merge(catalog, on="room", how="left")
+             .sort_values(["date", "room"], kind="stable")
+             .reset_index(drop=True))
+
+    rooms["row"] = np.arange(len(rooms))
+    group_index = df[["date", "room"]].merge(rooms[["date", "room", "row"]], on=["date", "room"], how="left")["row"].to_numpy()
+    busy = grid.occupancy(group_index, df["start_min"].to_numpy(), df["end_min"].to_numpy(), len(rooms))
+    return DerivedSchedule(df, rooms.drop(columns="row"), busy, grid, building_code, building_name, date)
+
+
+# 以下為相容舊呼叫方式的 slot list 介面
+
+def generate_all_slots(start=DAY_START, end=DAY_END, step=SLOT_MINUTES):
+    return SlotGrid(start, end, step).slots()
+
+def convert_to_slots(start, end, all_slots):
+    reserve_start, reserve_end = to_minutes(start), to_minutes(end)
+    return [slot for slot in all_slots if to_minutes(slot[0]) < reserve_end and reserve_start < to_minutes(slot[1])]
+
+def get_available_slots(reserved_slots, all_slots):
+    reserved = set(reserved_slots)
+    return [slot for slot in all_slots if slot not in reserved]
@@ -0,0 +1,262 @@
+import re
+
+try:
+    from tools.mcp_search import meeting_rooms
+    from tools.availability import (DAY_START, DAY_END, to_minutes, to_hhmm, minutes_series, merge_intervals,
+                                    subtract_intervals)
+except ImportError:
+    from mcp_search import meeting_rooms
+    from availability import DAY_START, DAY_END, to_minutes, to_hhmm, minutes_series, merge_intervals, subtract_intervals
+
+# 預約時間欄位的 "HH:MM" 格式
+HHMM = r"\s*\d{1,2}:\d{2}"
+
+# 上午 / 下午對應的時間窗（與預約網站的 MORNING / AFTERNOON 一致，以中午切分）
+PERIODS = {
+    "上午": ("08:00", "12:00"),
+    "早上": ("08:00", "12:00"),
+    "中午": ("12:00", "13:30"),
+    "下午": ("12:00", "18:00"),
+    "morning": ("08:00", "12:00"),
+    "afternoon": ("12:00", "18:00"),
+}
+
+# 判斷是否為「查空閒」類問題的關鍵字
+AVAILABILITY_KEYWORDS = ["有空", "空閒", "空的", "可用", "可以用", "能用", "可預約", "沒人", "available", "free"]
+# 問預約內容（誰、主題）的問題交給 LLM
+RESERVATION_KEYWORDS = ["誰", "主題", "主辦", "預約了", "被訂", "被預約", "什麼會"]
+
+# 英文的「哪間會議室」與問預約內容的說法
+ROOM_QUESTION = re.compile(r"\b(?:which|what|any)\s+(?:meeting\s+)?rooms?\b", re.IGNORECASE)
+ENGLISH_RESERVATION = re.compile(r"\b(?:who|whom|topic|host|booked\s+by)\b", re.IGNORECASE)
+
+TIME_TOKEN = r"(\d{1,2})(?:[:：](\d{2})|點(\d{1,2})分?|(點半)|點|時)?"
+TIME_RANGE = re.compile(TIME_TOKEN + r"\s*(?:-|~|～|到|至|to)\s*" + TIME_TOKEN)
+# 單一時間點：「3點」「10點以後」「3點半前」「after 2pm」「14:00」；一定要有 點 / 時 / :mm / am pm，避免把人數當成時間
+SINGLE_TIME = re.compile(
+    r"(?:\b(after|from|since|before|until|by|at)\s+)?"
+    r"(\d{1,2})(?:[:：](\d{2})|點(\d{1,2})分?|(點半)|點|時|(?=\s*[ap]m\b))\s*([ap]m\b)?"
+    r"(?:\s*(以後|之後|後|開始|起|以前|之前|前))?", re.IGNORECASE)
+AFTER_WORDS = {"after", "from", "since", "以後", "之後", "後", "開始", "起"}
+BEFORE_WORDS = {"before", "until", "by", "以前", "之前", "前"}
+# 人數：「15人」「15 people」「for 15 persons」「15+」「seats 15」
+CAPACITY_PATTERNS = [
+    re.compile(r"(\d+)\s*(?:人|位|個人|people|persons?|pax|seats?)", re.IGNORECASE),
+    re.compile(r"(\d+)\s*\+"),
+    re.compile(r"\b(?:seats?|people|persons?)\s*(\d+)", re.IGNORECASE),
+]
+# 樓層區分大小寫，且前後不能接英數字：「seat 15 from」不是 15F
+FLOOR = re.compile(r"(?<![A-Za-z0-9])(?:(B\d)(?![0-9])\s*(?:F(?![A-Za-z])|樓)?|(\d{1,2})\s*(?:F(?![A-Za-z])|樓))")
+DURATION = re.compile(r"(\d+(?:\.\d+)?|[半一兩二三四五六])\s*(?:個)?\s*(小時|hours?|hr|分鐘|min)", re.IGNORECASE)
+# 解析完仍留下這些字代表有沒處理到的時間條件
+UNPARSED_TIME_WORDS = re.compile(r"以後|之後|以前|之前|\b(?:after|before|until|since)\b", re.IGNORECASE)
+
+CHINESE_NUMBERS = {"半": 0.5, "一": 1, "兩": 2, "二": 2, "三": 3, "四": 4, "五": 5, "六": 6}
+CHINESE_DIGITS = {"零": 0, "一": 1, "兩": 2, "二": 2, "三": 3, "四": 4, "五": 5, "六": 6, "七": 7, "八": 8, "九": 9}
+# 「三點」「十五人」「十二樓」等中文數字先轉成阿拉伯數字
+CHINESE_NUMBER_TOKEN = re.compile(r"([零一兩二三四五六七八九十]+)(?=\s*(?:點|時|人|位|個人|樓))")
+
+
+def chinese_to_int(token):
+    if "十" not in token:
+        value = 0
+        for ch in token:
+            value = value * 10 + CHINESE_DIGITS[ch]
+        return value
+    tens, _, ones = token.partition("十")
+    return (CHINESE_DIGITS[tens] if tens else 1) * 10 + (CHINESE_DIGITS[ones] if ones else 0)
+
+
+def clock_minutes(hour, minute=None, minute_zh=None, half=None):
+    return int(hour) * 60 + (30 if half else int(minute or minute_zh or 0))
+
+
+class AvailabilityEngine:
+    """以 (大樓, 會議室, 樓層, 容納人數, 空閒區間) 直接回答空閒查詢，不經過 LLM"""
+
+    def __init__(self, df, building_code, day_start=DAY_START, day_end=DAY_END):
+        self.building_code = building_code
+        self.day = (to_minutes(day_start), to_minutes(day_end))
+
+        # derive_schedule 已算好分鐘欄位；時間空白或格式錯誤的紀錄略過，不讓一筆壞資料擋掉整天的排程
+        starts = df["start_min"] if "start_min" in df else minutes_series(df["start_time"])
+        ends = df["end_min"] if "end_min" in df else minutes_series(df["end_time"])
+        valid = (df["start_time"].astype(str).str.match(HHMM) & df["end_time"].astype(str).str.match(HHMM)).to_numpy()
+        busy = {}
+        for room, start, end, ok in zip(df["room"], starts, ends, valid):
+            if ok and end > start:
+                busy.setdefault(room, []).append((int(start), int(end)))
+
+        self.rooms = []
+        for floor, rooms in meeting_rooms.get(building_code, {}).items():
+            for room_name, capacity in rooms.items():
+                room_busy = merge_intervals(busy.get(room_name, []))
+                self.rooms.append({
+                    "room": room_name,
+                    "floor": floor,
+                    "capacity": capacity,
+                    "busy": room_busy,
+                    "free": subtract_intervals(self.day, room_busy),
+                })
+
+    def query(self, start=None, end=None, min_capacity=None, floor=None, min_duration=None, room=None, require_full=False):
+        """
+        回傳符合條件的會議室與其在時間窗內的空閒區間
+        require_full: 時間窗必須整段空閒（例如「14:00-15:00 哪間有空」）
+        """
+        window = (max(self.day[0], start if start is not None else self.day[0]),
+                  min(self.day[1], end if end is not None else self.day[1]))
+        min_duration = min_duration or 30
+        results = []
+        for info in self.rooms:
+            if room and info["room"] != room:
+                continue
+            if min_capacity and info["capacity"] < min_capacity:
+                continue
+            if floor and info["floor"].upper() != floor.upper():
+                continue
+            free = [(max(s, window[0]), min(e, window[1])) for s, e in info["free"] if s < window[1] and e > window[0]]
+            if require_full:
+                free = [(s, e) for s, e in free if s <= window[0] and e >= window[1]]
+            else:
+                free = [(s, e) for s, e in free if e - s >= min_duration]
+            if free:
+                results.append({**info, "free": free})
+        return results
+
+    def _to_24h(self, minutes, meridiem=None, afternoon=False):
+        """12 小時制的說法轉成 24 小時制；沒有說上午 / 下午時，營業時間前的鐘點視為下午（「3點」= 15:00）"""
+        if meridiem:
+            if meridiem.lower() == "pm" and minutes < 12 * 60:
+                return minutes + 12 * 60
+            if meridiem.lower() == "am" and minutes >= 12 * 60:
+                return minutes - 12 * 60
+            return minutes
+        if minutes < 12 * 60 and (afternoon or minutes < self.day[0]):
+            return minutes + 12 * 60
+        return minutes
+
+    def parse(self, text):
+        """
+        解析空閒查詢的條件；不是空閒類問題，或有解析不了的時間 / 人數條件時回傳 None
+        （回答範圍比使用者問的更廣不如交給 LLM）
+        """
+        lowered = text.lower()
+        if not any(k in lowered for k in AVAILABILITY_KEYWORDS):
+            asks_room = re.search(r"哪(間|些|一間)", text) or ROOM_QUESTION.search(text)
+            if not asks_room or any(k in text for k in RESERVATION_KEYWORDS):
+                return None
+        if ENGLISH_RESERVATION.search(text):
+            return None
+
+        conditions = {}
+        # 先比對會議室名稱（長的優先），並從字串移除，避免「第2會議室」的數字被當成時間或人數
+        for info in sorted(self.rooms, key=lambda r: -len(r["room"])):
+            if info["room"] in text:
+                conditions["room"] = info["room"]
+                text = text.replace(info["room"], " ")
+                break
+        text = CHINESE_NUMBER_TOKEN.sub(lambda m: str(chinese_to_int(m.group(1))), text)
+        lowered = text.lower()
+
+        for word, (p_start, p_end) in PERIODS.items():
+            if word in lowered:
+                conditions["period"] = word
+                conditions["start"], conditions["end"] = to_minutes(p_start), to_minutes(p_end)
+                break
+        afternoon = conditions.get("period") in ("下午", "afternoon")
+        # 說了上午就不把營業時間前的鐘點當成下午
+        morning = "am" if conditions.get("period") in ("上午", "早上", "morning") else None
+
+        time_range = TIME_RANGE.search(text)
+        if time_range:
+            h1, m1, mz1, half1, h2, m2, mz2, half2 = time_range.groups()
+            # 「下午2點到3點」「3點到4點」這類 12 小時制的說法：起點依上下午與營業時間判斷，
+            # 終點跟著起點落在下午（「2點到3點半」= 14:00-15:30，「11點到1點」= 11:00-13:00）
+            start = self._to_24h(clock_minutes(h1, m1, mz1, half1), morning, afternoon)
+            end = clock_minutes(h2, m2, mz2, half2)
+            if end < 12 * 60 and (start >= 12 * 60 or end <= start):
+                end += 12 * 60
+            conditions["start"], conditions["end"] = start, end
+            conditions["require_full"] = True
+            text = text.replace(time_range.group(0), " ")
+        else:
+            single = SINGLE_TIME.search(text)
+            if single:
+                prefix, hour, minute, minute_zh, half, meridiem, suffix = single.groups()
+                at = self._to_24h(clock_minutes(hour, minute, minute_zh, half), meridiem or morning, afternoon)
+                direction = (suffix or prefix or "").lower()
+                window_start = conditions.get("start", self.day[0])
+                window_end = conditions.get("end", self.day[1])
+                if direction in AFTER_WORDS:
+                    conditions["start"], conditions["end"] = at, max(window_end, at)
+                elif direction in BEFORE_WORDS:
+                    conditions["start"], conditions["end"] = min(window_start, at), at
+                else:
+                    # 「3點有空嗎」：從該時間點起至少一個時段整段空閒
+                    conditions["start"], conditions["end"] = at, at + 30
+                    conditions["require_full"] = True
+                text = text.replace(single.group(0), " ")
+
+        duration = DURATION.search(text)
+        if duration:
+            amount, unit = duration.groups()
+            amount = CHINESE_NUMBERS.get(amount) or float(amount)
+            conditions["min_duration"] = int(amount * 60) if unit.lower() in ("小時", "hour", "hours", "hr") else int(amount)
+            text = text.replace(duration.group(0), " ")
+        elif "半小時" in text:
+            conditions["min_duration"] = 30
+            text = text.replace("半小時", " ")
+        if conditions.get("require_full") and "min_duration" in conditions and "start" in conditions:
+            # 「3點開始要用一小時」：整段空閒的時間窗依需要的長度延長
+            conditions["end"] = max(conditions["end"], conditions["start"] + conditions["min_duration"])
+
+        for pattern in CAPACITY_PATTERNS:
+            capacity = pattern.search(text)
+            if capacity:
+                conditions["min_capacity"] = int(capacity.group(1))
+                text = text.replace(capacity.group(0), " ")
+                break
+
+        floor = FLOOR.search(text)
+        if floor:
+            conditions["floor"] = floor.group(1) or f"{floor.group(2)}F"
+            text = text.replace(floor.group(0), " ")
+
+        # 還剩下數字或時間用語：有條件沒有解析到，不以較寬鬆的條件回答
+        if re.search(r"\d", text) or UNPARSED_TIME_WORDS.search(text):
+            return None
+        return conditions
+
+    def answer(self, text):
+        """能解析為空閒查詢時回傳文字答案，否則回傳 None 交給 LLM"""
+        conditions = self.parse(text)
+        if conditions is None:
+            return None
+
+        results = self.query(
+            start=conditions.get("start"), end=conditions.get("end"),
+            min_capacity=conditions.get("min_capacity"), floor=conditions.get("floor"),
+            min_duration=conditions.get("min_duration"), room=conditions.get("room"),
+            require_full=conditions.get("require_full", False))
+
+        window = ""
+        if "start" in conditions:
+            window = f"{to_hhmm(conditions['start'])}-{to_hhmm(conditions['end'])} "
+
+        if conditions.get("room"):
+            if not results:
+                return f"{conditions['room']} {window}沒有符合條件的空閒時段。"
+            info = results[0]
+            if conditions.get("require_full"):
+                return f"{info['room']}（{info['floor']}，{info['capacity']}人）{window}有空。"
+            slots = "、".join(f"{to_hhmm(s)}-{to_hhmm(e)}" for s, e in info["free"])
+            return f"{info['room']}（{info['floor']}，{info['capacity']}人）{window}可用時段：{slots}"
+
+        if not results:
+            return f"{window}沒有符合條件的會議室。"
+        lines = [f"{window}符合條件的會議室："]
+        for info in results:
+            slots = "、".join(f"{to_hhmm(s)}-{to_hhmm(e)}" for s, e in info["free"])
+            lines.append(f"- {info['room']}（{info['floor']}，{info['capacity']}人）：{slots}")
+        return "\n".join(lines)
@@ -0,0 +1,83 @@
+import os
+import time
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from langchain_core.embeddings import Embeddings
+from dotenv import load_dotenv
+
+# 載入環境變數
+load_dotenv()
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "2"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "3"))
+EMBED_TIMEOUT = float(os.getenv("EMBED_TIMEOUT", "120"))
+
+
+class BatchedOllamaEmbeddings(Embeddings):
+    """以 /api/embed 批次送出文件，並用固定大小的 worker pool 平行處理各批次"""
+
+    def __init__(self, model, base_url=OLLAMA_HOST, batch_size=EMBED_BATCH_SIZE, workers=EMBED_WORKERS,
+                 max_retries=EMBED_MAX_RETRIES, timeout=EMBED_TIMEOUT,
+                 embed_instruction="passage: ", query_instruction="query: ", keep_alive=None):
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        # 與 langchain 的 OllamaEmbeddings 使用相同的前綴指令
+        self.embed_instruction = embed_instruction
+        self.query_instruction = query_instruction
+        # 每個請求都帶上 keep_alive，Ollama 以最後一次請求的設定決定何時卸載模型
+        self.keep_alive = keep_alive
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=self.workers))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self.workers))
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="embed")
+            return self._executor
+
+    def _embed_batch(self, inputs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                payload = {"model": self.model, "input": inputs}
+                if self.keep_alive is not None:
+                    payload["keep_alive"] = self.keep_alive
+                response = self.session.post(f"{self.base_url}/api/embed", json=payload, timeout=self.timeout)
+                # 4xx 代表請求本身有問題，重試也沒有用
+                if response.status_code < 500:
+                    response.raise_for_status()
+                    embeddings = response.json()["embeddings"]
+                    if len(embeddings) != len(inputs):
+                        raise ValueError(f"Expected {len(inputs)} embeddings, got {len(embeddings)}")
+                    return embeddings
+                error = requests.HTTPError(f"{response.status_code} from embedding server: {response.text[:200]}")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt < self.max_retries:
+                time.sleep(min(0.5 * 2 ** attempt, 8))
+        raise ValueError(f"Error raised by embedding endpoint: {error}")
+
+    def embed_documents(self, texts):
+        inputs = [f"{self.embed_instruction}{text}" for text in texts]
+        batches = [inputs[i:i + self.batch_size] for i in range(0, len(inputs), self.batch_size)]
+        if len(batches) <= 1:
+            return self._embed_batch(batches[0]) if batches else []
+
+        results = []
+        for vectors in self._get_executor().map(self._embed_batch, batches):
+            results.extend(vectors)
+        return results
+
+    def embed_query(self, text):
+        return self._embed_batch([f"{self.query_instruction}{text}"])[0]
@@ -0,0 +1,177 @@
+import os
+import re
+from bs4 import BeautifulSoup
+from dotenv import load_dotenv
+
+try:
+    from tools import tracing
+except ImportError:
+    import tracing
+
+# 載入環境變數
+load_dotenv()
+
+# 解析預約頁面的後端：html.parser / lxml / selectolax / auto
+# 預設維持 BeautifulSoup 內建的 html.parser；lxml、selectolax 只在合成的測試頁面上比對過，
+# 尚未以正式網站保存的頁面做黃金檔比對前需明確指定才會使用
+# auto 在有安裝 lxml 時使用 lxml，否則退回 html.parser
+HTML_PARSER = os.getenv("HTML_PARSER", "html.parser")
+
+PHONE_SUFFIX = re.compile(r"\s*\d{7,}")
+DATE_SEPARATORS = re.compile(r"[/-]")
+
+
+def make_record(building_name, room, record_date, query_date_str, start_time, end_time, fields):
+    """各後端共用的欄位整理；fields 為按鈕下四個 div 的文字（主題 / 單位 / 部門 / 聯絡人）"""
+    topic, host_org, department, person = (f.strip() for f in fields[:4])
+    # 區間查詢時每筆紀錄可能帶有自己的日期，沒有則使用查詢日期
+    record_date = DATE_SEPARATORS.sub("", record_date or "") or query_date_str
+    person_name = PHONE_SUFFIX.sub("", person)
+    return {
+        "building": building_name,
+        "room": room,
+        "date": record_date,
+        "start_time": start_time,
+        "end_time": end_time,
+        "topic": topic,
+        "host": f"{host_org} {department} {person_name}"
+    }
+
+
+def parse_bs4(html_content, query_date_str, features="html.parser"):
+    soup = BeautifulSoup(html_content, features)
+
+    building_select = soup.find("select", {"id": "searchBeanBuildingPK"})
+    building_option = building_select.find("option", selected=True)
+    building_name = building_option.text.strip()
+
+    meeting_data = []
+    for booking_area in soup.select(".Booking_area"):
+        title = booking_area.find("div", class_="Title")
+        if not title:
+            continue
+        floor = title.find("div", class_="Floor").text.strip()
+        room = title.find("div", class_="Room").text.strip()
+
+        for button in booking_area.select("button.meetingRecordBtn"):
+            fields = button.find_all("div", recursive=False)
+            if len(fields) < 4:
+                continue
+            meeting_data.append(make_record(
+                building_name, room, button.get("data-date"), query_date_str,
+                button.get("data-starttime"), button.get("data-endtime"), [f.text for f in fields]))
+
+    return meeting_data
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+_lxml_xpaths = None
+
+def _get_lxml_xpaths():
+    """XPath 編譯一次重複使用；選擇條件與 BeautifulSoup 版本的 find / select 相同"""
+    global _lxml_xpaths
+    if _lxml_xpaths is None:
+        from lxml import etree
+        _lxml_xpaths = {
+            "building": etree.XPath("(//select[@id='searchBeanBuildingPK'])[1]//option[@selected][1]"),
+            "areas": etree.XPath(f"//*[{_has_class('Booking_area')}]"),
+            "title": etree.XPath(f"(.//div[{_has_class('Title')}])[1]"),
+            "floor": etree.XPath(f"(.//div[{_has_class('Floor')}])[1]"),
+            "room": etree.XPath(f"(.//div[{_has_class('Room')}])[1]"),
+            "buttons": etree.XPath(f".//button[{_has_class('meetingRecordBtn')}]"),
+            "fields": etree.XPath("./div"),
+        }
+    return _lxml_xpaths
+
+
+def parse_lxml(html_content, query_date_str):
+    import lxml.html
+    xp = _get_lxml_xpaths()
+    tree = lxml.html.document_fromstring(html_content)
+
+    building_name = xp["building"](tree)[0].text_content().strip()
+
+    meeting_data = []
+    for booking_area in xp["areas"](tree):
+        title = xp["title"](booking_area)
+        if not title:
+            continue
+        floor = xp["floor"](title[0])[0].text_content().strip()
+        room = xp["room"](title[0])[0].text_content().strip()
+
+        for button in xp["buttons"](booking_area):
+            fields = xp["fields"](button)
+            if len(fields) < 4:
+                continue
+            meeting_data.append(make_record(
+                building_name, room, button.get("data-date"), query_date_str,
+                button.get("data-starttime"), button.get("data-endtime"), [f.text_content() for f in fields]))
+
+    return meeting_data
+
+
+def parse_selectolax(html_content, query_date_str):
+    from selectolax.lexbor import LexborHTMLParser
+    tree = LexborHTMLParser(html_content)
+
+    building_select = tree.css_first("select#searchBeanBuildingPK")
+    building_option = next(o for o in building_select.css("option") if "selected" in o.attributes)
+    building_name = building_option.text(deep=True).strip()
+
+    meeting_data = []
+    for booking_area in tree.css(".Booking_area"):
+        title = booking_area.css_first("div.Title")
+        if title is None:
+            continue
+        floor = title.css_first("div.Floor").text(deep=True).strip()
+        room = title.css_first("div.Room").text(deep=True).strip()
+
+        for button in booking_area.css("button.meetingRecordBtn"):
+            fields = [child for child in button.iter() if child.tag == "div"]
+            if len(fields) < 4:
+                continue
+            attrs = button.attributes
+            meeting_data.append(make_record(
+                building_name, room, attrs.get("data-date"), query_date_str,
+                attrs.get("data-starttime"), attrs.get("data-endtime"), [f.text(deep=True) for f in fields]))
+
+    return meeting_data
+
+
+BACKENDS = {
+    "html.parser": parse_bs4,
+    "lxml": parse_lxml,
+    "selectolax": parse_selectolax,
+}
+
+
+def available_backends():
+    """目前環境可用的後端（依賴套件有安裝者）"""
+    names = ["html.parser"]
+    for name, module in (("lxml", "lxml.html"), ("selectolax", "selectolax.lexbor")):
+        try:
+            __import__(module)
+            names.append(name)
+        except ImportError:
+            pass
+    return names
+
+
+def resolve_backend(name=None):
+    name = name or HTML_PARSER
+    if name == "auto":
+        return "lxml" if "lxml" in available_backends() else "html.parser"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML_PARSER '{name}', expected one of: auto, {', '.join(BACKENDS)}")
+    return name
+
+
+def parse_html_content(html_content, query_date_str, period, backend=None):
+    """解析預約頁面的所有會議紀錄；各後端在 benchmarks/fixtures 的頁面上輸出相同的紀錄"""
+    backend = resolve_backend(backend)
+    with tracing.span("parse_html_content", backend=backend, period=period, html_bytes=len(html_content)) as span:
+        records = BACKENDS[backend](html_content, query_date_str)
+        span.set(records=len(records))
+    return records
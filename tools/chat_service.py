@@ -0,0 +1,120 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+import uvicorn
+import threading
+import json
+import time
+import os
+from dotenv import load_dotenv
+
+try:
+    from tools.assistant import Assistant
+    from tools import tracing
+except ImportError:
+    # 直接以 python tools/chat_service.py 啟動時
+    from assistant import Assistant
+    import tracing
+
+# 載入環境變數
+load_dotenv()
+
+CHAT_SERVICE_HOST = os.getenv("CHAT_SERVICE_HOST", "127.0.0.1")
+CHAT_SERVICE_PORT = int(os.getenv("CHAT_SERVICE_PORT", "8890"))
+# 閒置超過此秒數的 session 會被清除
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "3600"))
+
+app = FastAPI()
+
+# 所有 session 共用同一個 LLM client、向量資料庫與排程快取
+assistant = Assistant()
+sessions = {}
+sessions_lock = threading.Lock()
+
+
+class Message(BaseModel):
+    message: str
+
+
+def purge_idle_sessions():
+    now = time.time()
+    with sessions_lock:
+        for session_id in [sid for sid, s in sessions.items()
+                           if now - s.last_active > CHAT_SESSION_TTL and not s.lock.locked()]:
+            del sessions[session_id]
+
+def get_session(session_id):
+    with sessions_lock:
+        session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    return session
+
+
+@app.post("/sessions")
+async def create_session():
+    purge_idle_sessions()
+    # 閒置超過 keep_alive 時 Ollama 已卸載模型；在使用者輸入大樓與日期的同時於背景重新載入
+    assistant.warm_up(background=True)
+    session = assistant.create_session()
+    with sessions_lock:
+        sessions[session.id] = session
+    return {**session.to_dict(), "model": assistant.model_name}
+
+@app.get("/sessions/{session_id}")
+async def session_status(session_id: str):
+    return get_session(session_id).to_dict()
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    with sessions_lock:
+        session = sessions.pop(session_id, None)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    return {"status": "success", "session_id": session_id}
+
+@app.post("/sessions/{session_id}/messages")
+async def post_message(session_id: str, body: Message):
+    """以 NDJSON 串流回傳事件（status / start / token / end / error），每行一個 JSON"""
+    session = get_session(session_id)
+    if session.lock.locked():
+        raise HTTPException(status_code=409, detail="Session is busy with another message")
+
+    def stream():
+        # 同步產生器由 Starlette 放到 threadpool 執行，不會阻塞其他 session
+        # 在產生器內取得鎖，連線在開始前中斷時不會留下未釋放的鎖
+        if not session.lock.acquire(blocking=False):
+            yield json.dumps({"type": "error", "text": "Session is busy with another message"}) + "\n"
+            return
+        try:
+            for event in tracing.iterate_in_context(assistant.reply(session, body.message)):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "text": str(e)}, ensure_ascii=False) + "\n"
+        finally:
+            session.last_active = time.time()
+            session.lock.release()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get("/status")
+async def service_status():
+    with sessions_lock:
+        total = len(sessions)
+        busy = sum(1 for s in sessions.values() if s.lock.locked())
+    return {
+        "model": assistant.model_name,
+        "rag_mode": assistant.rag_mode,
+        "sessions": total,
+        "busy_sessions": busy,
+        "cached_schedules": assistant.cached_schedules(),
+        "answer_cache": assistant.answer_cache.stats() if assistant.answer_cache else None,
+        "warmup": assistant.warmup_results,
+        "ttft": assistant.ttft_stats(),
+    }
+
+
+if __name__ == "__main__":
+    # 服務啟動時先載入所有模組、LLM client 與 Ollama 模型，第一個請求不必等待
+    assistant.preload()
+    uvicorn.run(app, host=CHAT_SERVICE_HOST, port=CHAT_SERVICE_PORT)
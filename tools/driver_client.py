@@ -0,0 +1,154 @@
+import os
+import time
+import asyncio
+import threading
+import weakref
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+try:
+    from tools import tracing
+except ImportError:
+    import tracing
+
+# 載入環境變數
+load_dotenv()
+
+DRIVER_SERVICE_URL = os.getenv("DRIVER_SERVICE_URL", "http://127.0.0.1:8888")
+DRIVER_CONNECT_TIMEOUT = float(os.getenv("DRIVER_CONNECT_TIMEOUT", "5"))
+# 向 driver_service 要求的 pool 等待上限（秒）：pool 忙碌時等這麼久就回 503，由 client 退避重試
+DRIVER_CHECKOUT_WAIT = float(os.getenv("DRIVER_CHECKOUT_WAIT", "30"))
+# 讀取逾時涵蓋 pool 等待加上登入、區間爬取與頁面渲染，必須大於 DRIVER_CHECKOUT_WAIT，否則 503 永遠等不到
+# 超過就當作 driver 卡住，不再無限等待
+DRIVER_READ_TIMEOUT = float(os.getenv("DRIVER_READ_TIMEOUT", "300"))
+DRIVER_MAX_RETRIES = int(os.getenv("DRIVER_MAX_RETRIES", "2"))
+# 同時開啟的連線數；批次查詢會以多個執行緒 / task 同時呼叫
+DRIVER_CLIENT_POOL = int(os.getenv("DRIVER_CLIENT_POOL", "8"))
+# driver_service 重啟中（502）或 driver pool 借不到 session（503）時值得重試
+RETRY_STATUS = {502, 503, 504}
+
+
+def _backoff(attempt):
+    return min(0.5 * 2 ** attempt, 8)
+
+
+def _with_checkout_wait(method, params, checkout_wait):
+    # 會借用 driver 的 POST 端點都接受 checkout_timeout；呼叫端自己指定時不覆蓋
+    if method != "POST" or not checkout_wait:
+        return params
+    params = dict(params or {})
+    params.setdefault("checkout_timeout", checkout_wait)
+    return params
+
+
+class DriverClient:
+    """
+    driver_service 的共用 HTTP client：連線池、每個請求的逾時，連線失敗與 502/503/504 以指數退避重試
+    讀取逾時不重試：driver 可能正卡在頁面上，重送只會再等一次
+    """
+
+    def __init__(self, base_url=DRIVER_SERVICE_URL, pool_size=DRIVER_CLIENT_POOL, connect_timeout=DRIVER_CONNECT_TIMEOUT,
+                 read_timeout=DRIVER_READ_TIMEOUT, max_retries=DRIVER_MAX_RETRIES, checkout_wait=DRIVER_CHECKOUT_WAIT):
+        self.base_url = base_url.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.checkout_wait = checkout_wait
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method, path, params=None, headers=None, timeout=None):
+        """timeout 為讀取逾時（秒），沒有指定時使用 DRIVER_READ_TIMEOUT；回傳已檢查狀態碼的 response"""
+        headers = tracing.inject(headers)
+        params = _with_checkout_wait(method, params, self.checkout_wait)
+        timeout = (self.connect_timeout, timeout or self.read_timeout)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, f"{self.base_url}{path}", params=params, headers=headers,
+                                                timeout=timeout)
+                if response.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response
+            except requests.ConnectionError:
+                if attempt == self.max_retries:
+                    raise
+            time.sleep(_backoff(attempt))
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs).json()
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs).json()
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncDriverClient:
+    """DriverClient 的非同步版本（httpx），MCP server 可在同一個 event loop 同時處理多個查詢"""
+
+    def __init__(self, base_url=DRIVER_SERVICE_URL, pool_size=DRIVER_CLIENT_POOL, connect_timeout=DRIVER_CONNECT_TIMEOUT,
+                 read_timeout=DRIVER_READ_TIMEOUT, max_retries=DRIVER_MAX_RETRIES, checkout_wait=DRIVER_CHECKOUT_WAIT):
+        self.base_url = base_url.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.checkout_wait = checkout_wait
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size))
+
+    async def request(self, method, path, params=None, headers=None, timeout=None):
+        headers = tracing.inject(headers)
+        params = _with_checkout_wait(method, params, self.checkout_wait)
+        timeout = httpx.Timeout(timeout or self.read_timeout, connect=self.connect_timeout)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.client.request(method, path, params=params, headers=headers, timeout=timeout)
+                if response.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError):
+                if attempt == self.max_retries:
+                    raise
+            await asyncio.sleep(_backoff(attempt))
+
+    async def get(self, path, **kwargs):
+        return (await self.request("GET", path, **kwargs)).json()
+
+    async def post(self, path, **kwargs):
+        return (await self.request("POST", path, **kwargs)).json()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_clients = {}
+# httpx.AsyncClient 綁定建立時的 event loop，每個 loop 各自一份
+_async_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url=DRIVER_SERVICE_URL):
+    """同一行程共用的 client（依 base_url 區分）"""
+    with _clients_lock:
+        client = _clients.get(base_url)
+        if client is None:
+            client = _clients[base_url] = DriverClient(base_url)
+        return client
+
+
+def get_async_client(base_url=DRIVER_SERVICE_URL):
+    """目前 event loop 共用的非同步 client"""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(base_url)
+        if client is None:
+            client = clients[base_url] = AsyncDriverClient(base_url)
+        return client
@@ -1,130 +1,575 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from selenium import webdriver
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import Select, WebDriverWait
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, WebDriverException
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import uvicorn
-from datetime import datetime
+from datetime import datetime, timedelta
 import threading
 import time
 import os
 from dotenv import load_dotenv
 
+try:
+    from tools.mcp_search import parse_html_content, process_and_save_data, building_map
+    from tools.prefetcher import Prefetcher, PREFETCH_ENABLED
+    from tools import tracing
+except ImportError:
+    # 直接以 python tools/driver_service.py 啟動時
+    from mcp_search import parse_html_content, process_and_save_data, building_map
+    from prefetcher import Prefetcher, PREFETCH_ENABLED
+    import tracing
+
 # 載入環境變數
 load_dotenv()
 
 app = FastAPI()
 
-# 全域變數儲存 driver 實例
-driver_instance = None
-driver_lock = threading.Lock()
-
 BOOKING_URL = os.getenv("BOOKING_URL", "https://booking.cathayholdings.com/frontend/mrm101w/index?")
 USERNAME = os.getenv("BOOKING_USERNAME")
 PASSWORD = os.getenv("BOOKING_PASSWORD")
 
+# Driver pool 設定
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "2"))
+CHECKOUT_TIMEOUT = float(os.getenv("DRIVER_CHECKOUT_TIMEOUT", "120"))
+LEASE_TIMEOUT = float(os.getenv("DRIVER_LEASE_TIMEOUT", "60"))
+
+# 頁面等待設定（秒）
+LOGIN_TIMEOUT = float(os.getenv("LOGIN_TIMEOUT", "30"))
+ELEMENT_TIMEOUT = float(os.getenv("ELEMENT_TIMEOUT", "10"))
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", "5"))
+
+# 批次查詢是否嘗試使用網站的起訖日期區間（頁面紀錄需帶有 data-date 才會採用）
+SCRAPE_RANGE_MODE = os.getenv("SCRAPE_RANGE_MODE", "0") == "1"
+
 def create_driver():
     options = webdriver.ChromeOptions()
     options.add_experimental_option("detach", True)
     driver = webdriver.Chrome(options=options)
-    driver.implicitly_wait(5)
+    # 不使用 implicit wait，所有等待都用明確條件，頁面好了就立刻往下走
+    driver.implicitly_wait(0)
     return driver
 
+def wait_for(driver, by, value, timeout=ELEMENT_TIMEOUT):
+    return WebDriverWait(driver, timeout).until(EC.presence_of_element_located((by, value)))
+
 def login_driver(driver, username, password):
     driver.get(BOOKING_URL)
-    driver.find_element(By.NAME, 'username').send_keys(username)
+    wait_for(driver, By.NAME, 'username').send_keys(username)
     driver.find_element(By.ID, 'KEY').send_keys(password)
     driver.find_element(By.ID, 'btnLogin').click()
-    driver.implicitly_wait(100)
+    # 登入完成的判斷：查詢頁面的大樓選單出現
+    wait_for(driver, By.ID, 'searchBeanBuildingPK', timeout=LOGIN_TIMEOUT)
 
-@app.post("/initialize_driver")
-async def initialize_driver():
-    global driver_instance
-    with driver_lock:
-        if driver_instance is None:
+def is_logged_in(driver):
+    # 網站登出後會導回登入頁：看得到登入按鈕、或查詢頁的大樓選單不見了都視為已登出
+    return (not driver.find_elements(By.ID, 'btnLogin')
+            and bool(driver.find_elements(By.ID, 'searchBeanBuildingPK')))
+
+def booking_fingerprint(driver):
+    # 會議室區塊內容的簡易指紋，用來判斷時段切換後是否已重新渲染
+    return driver.execute_script("""
+        var areas = document.querySelectorAll('.Booking_area');
+        var parts = [];
+        for (var i = 0; i < areas.length; i++) { parts.push(areas[i].innerHTML.length); }
+        return parts.join(',');
+    """)
+
+def wait_for_render(driver, old_area, old_fingerprint, timeout=RENDER_TIMEOUT):
+    """等待 .Booking_area 依新時段重新渲染；逾時則退回等待 document ready"""
+    def rendered(d):
+        if old_area is not None:
             try:
-                driver_instance = create_driver()
-                login_driver(driver_instance, USERNAME, PASSWORD)
-                return {"status": "success", "message": "Driver initialized and logged in"}
+                old_area.is_enabled()
+                changed = booking_fingerprint(d) != old_fingerprint
+            except StaleElementReferenceException:
+                changed = True
+            if not changed:
+                return False
+        return (d.execute_script("return document.readyState") == "complete"
+                and len(d.find_elements(By.CSS_SELECTOR, '.Booking_area')) > 0)
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1,
+                      ignored_exceptions=(StaleElementReferenceException,)).until(rendered)
+        return "rendered"
+    except TimeoutException:
+        # 內容沒有變化（例如查詢結果相同）時無法偵測重新渲染，至少確保頁面已載入完成
+        WebDriverWait(driver, ELEMENT_TIMEOUT).until(
+            lambda d: d.execute_script("return document.readyState") == "complete")
+        return "fallback"
+
+def apply_query(driver, start_date, end_date, building_code, period):
+    """在頁面上設定日期、大樓與時段，回傳各步驟耗時（毫秒）"""
+    timings = {}
+    t0 = time.perf_counter()
+
+    # 設定日期
+    start_input = wait_for(driver, By.ID, 'startDate')
+    end_input = driver.find_element(By.ID, 'endDate')
+
+    for elem, value in zip([start_input, end_input], [start_date, end_date]):
+        driver.execute_script("""
+            arguments[0].value = arguments[1];
+            arguments[0].dispatchEvent(new Event('change', { bubbles: true }));
+        """, elem, value)
+    t1 = time.perf_counter()
+    timings["set_dates_ms"] = round((t1 - t0) * 1000, 1)
+
+    # 選擇建築物
+    dropdown = wait_for(driver, By.ID, 'searchBeanBuildingPK')
+    select = Select(dropdown)
+    select.select_by_value(building_code)
+    t2 = time.perf_counter()
+    timings["select_building_ms"] = round((t2 - t1) * 1000, 1)
+
+    # 記下目前的會議室區塊，切換時段後用來判斷是否已重新渲染
+    areas = driver.find_elements(By.CSS_SELECTOR, '.Booking_area')
+    old_area = areas[0] if areas else None
+    old_fingerprint = booking_fingerprint(driver) if old_area is not None else None
+
+    # 點選早上或下午
+    wait_for(driver, By.XPATH, f'//button[@name="selectedTimePeriod" and @value="{period}"]').click()
+    t3 = time.perf_counter()
+    timings["click_period_ms"] = round((t3 - t2) * 1000, 1)
+
+    timings["wait_mode"] = wait_for_render(driver, old_area, old_fingerprint)
+    t4 = time.perf_counter()
+    timings["wait_render_ms"] = round((t4 - t3) * 1000, 1)
+    timings["total_ms"] = round((t4 - t0) * 1000, 1)
+    tracing.record("apply_query", timings["total_ms"], building=building_code, date=start_date, period=period,
+                   **{k: v for k, v in timings.items() if k != "total_ms"})
+    return timings
+
+class DriverSlot:
+    """Pool 中的一個已登入 Chrome session"""
+
+    def __init__(self, slot_id):
+        self.slot_id = slot_id
+        self.driver = None
+        self.status = "not_initialized"  # not_initialized / active / dead
+        self.busy = False
+        self.client_lease = False
+        self.leased_at = None
+        self.last_used = None
+        self.last_error = None
+        self.logins = 0
+        self.close_on_checkin = False
+
+    def to_dict(self):
+        return {
+            "slot_id": self.slot_id,
+            "status": self.status,
+            "state": ("leased" if self.client_lease else "busy") if self.busy else "idle",
+            "busy_for": round(time.monotonic() - self.leased_at, 1) if self.busy and self.leased_at else None,
+            "last_used": self.last_used,
+            "logins": self.logins,
+            "last_error": self.last_error,
+        }
+
+
+class DriverPool:
+    """多個已登入 driver 的 checkout / checkin 管理，不同查詢可以平行執行"""
+
+    def __init__(self, size, username, password):
+        self.slots = [DriverSlot(i) for i in range(size)]
+        self.username = username
+        self.password = password
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def _reclaim_expired_leases(self):
+        """
+        用戶端呼叫 set_date_and_building 後沒有回來取 page source，逾時收回
+        回傳下一個租用到期的時間，等待中的 checkout 最晚在那時醒來再檢查一次
+        """
+        now = time.monotonic()
+        next_expiry = None
+        for slot in self.slots:
+            if not slot.client_lease:
+                continue
+            expires = slot.leased_at + LEASE_TIMEOUT
+            if now >= expires:
+                print(f"⚠️ Driver slot {slot.slot_id} 租用逾時，已收回")
+                slot.busy = False
+                slot.client_lease = False
+                slot.leased_at = None
+            elif next_expiry is None or expires < next_expiry:
+                next_expiry = expires
+        return next_expiry
+
+    def _pick_idle_slot(self):
+        idle = [s for s in self.slots if not s.busy]
+        if not idle:
+            return None
+        # 優先使用已登入的 session，避免不必要的重新登入
+        active = [s for s in idle if s.status == "active"]
+        return active[0] if active else idle[0]
+
+    def _ensure_alive(self, slot):
+        if slot.driver is not None and slot.status != "dead":
+            try:
+                # 檢查 driver 是否還活著，且網站 session 沒有被登出
+                if is_logged_in(slot.driver):
+                    slot.status = "active"
+                    return
+                slot.last_error = "logged out"
+                print(f"⚠️ Driver slot {slot.slot_id} 已被登出，重新登入")
             except Exception as e:
-                return {"status": "error", "message": str(e)}
-        else:
-            return {"status": "success", "message": "Driver already initialized"}
+                slot.last_error = str(e)
+            slot.status = "dead"
+        if slot.driver is not None:
+            try:
+                slot.driver.quit()
+            except:
+                pass
+            slot.driver = None
 
-@app.get("/driver_status")
-async def driver_status():
-    global driver_instance
-    with driver_lock:
-        if driver_instance is None:
-            return {"status": "not_initialized"}
         try:
-            # 檢查 driver 是否還活著
-            driver_instance.current_url
-            return {"status": "active"}
-        except:
-            driver_instance = None
-            return {"status": "inactive"}
+            slot.driver = create_driver()
+            login_driver(slot.driver, self.username, self.password)
+            slot.logins += 1
+            slot.status = "active"
+            slot.last_error = None
+        except Exception as e:
+            slot.status = "dead"
+            slot.last_error = str(e)
+            if slot.driver is not None:
+                try:
+                    slot.driver.quit()
+                except:
+                    pass
+                slot.driver = None
+            raise
 
-@app.get("/get_page_source")
-async def get_page_source():
-    global driver_instance
-    with driver_lock:
-        if driver_instance is None:
-            raise HTTPException(status_code=400, detail="Driver not initialized")
+    def checkout(self, timeout=CHECKOUT_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    next_expiry = self._reclaim_expired_leases()
+                    slot = self._pick_idle_slot()
+                    if slot is not None:
+                        break
+                    now = time.monotonic()
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise TimeoutError("No driver available in pool")
+                    # 租用到期不會有人 notify，等待時間不超過最早到期的租用
+                    if next_expiry is not None:
+                        remaining = min(remaining, max(next_expiry - now, 0.01))
+                    self._cond.wait(remaining)
+                slot.busy = True
+                slot.leased_at = time.monotonic()
+            finally:
+                self.waiting -= 1
+
+        # 建立 / 重新登入可能要數秒，不佔用 pool 的鎖
         try:
-            return {"html": driver_instance.page_source}
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            self._ensure_alive(slot)
+        except Exception:
+            self.checkin(slot)
+            raise
+        return slot
 
-@app.post("/set_date_and_building")
-async def set_date_and_building(start_date: str, end_date: str, building_code: str, period: str):
-    global driver_instance
-    with driver_lock:
-        if driver_instance is None:
-            raise HTTPException(status_code=400, detail="Driver not initialized")
-        
+    def checkin(self, slot):
+        with self._cond:
+            slot.busy = False
+            slot.client_lease = False
+            slot.leased_at = None
+            slot.last_used = datetime.now().isoformat(timespec="seconds")
+            if slot.close_on_checkin:
+                self._quit_slot(slot)
+            self._cond.notify()
+
+    def invalidate(self, slot, error):
+        """頁面操作失敗（等待逾時、session 被登出、瀏覽器當掉）時標記為 dead，下次 checkout 重新建立並登入"""
+        with self._cond:
+            slot.status = "dead"
+            slot.last_error = str(error)
+
+    def lease(self, slot):
+        """將 checkout 的 slot 轉為跨請求租用，等待用戶端以 slot_id 取回"""
+        with self._cond:
+            slot.client_lease = True
+            slot.leased_at = time.monotonic()
+
+    def take_lease(self, slot_id):
+        with self._cond:
+            if slot_id < 0 or slot_id >= len(self.slots):
+                raise KeyError(slot_id)
+            slot = self.slots[slot_id]
+            if not slot.client_lease:
+                raise KeyError(slot_id)
+            slot.client_lease = False
+            return slot
+
+    @contextmanager
+    def session(self, timeout=CHECKOUT_TIMEOUT):
+        slot = self.checkout(timeout)
         try:
-            # 設定日期
-            start_input = driver_instance.find_element(By.ID, 'startDate')
-            end_input = driver_instance.find_element(By.ID, 'endDate')
-            
-            for elem, value in zip([start_input, end_input], [start_date, end_date]):
-                driver_instance.execute_script("""
-                    arguments[0].value = arguments[1];
-                    arguments[0].dispatchEvent(new Event('change', { bubbles: true }));
-                """, elem, value)
-            
-            # 選擇建築物
-            from selenium.webdriver.support.ui import Select
-            dropdown = driver_instance.find_element(By.ID, 'searchBeanBuildingPK')
-            select = Select(dropdown)
-            select.select_by_value(building_code)
-            
-            # 點選早上或下午
-            driver_instance.find_element(By.XPATH, f'//button[@name="selectedTimePeriod" and @value="{period}"]').click()
-            
-            time.sleep(2)  # 等待頁面載入
-            return {"status": "success"}
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+            yield slot
+        except WebDriverException as e:
+            self.invalidate(slot, e)
+            raise
+        finally:
+            self.checkin(slot)
 
-@app.post("/close_driver")
-async def close_driver():
-    global driver_instance
-    with driver_lock:
-        if driver_instance:
+    def initialize(self):
+        """將所有尚未登入的閒置 slot 建立並登入"""
+        with self._cond:
+            targets = [s for s in self.slots if not s.busy and s.status != "active"]
+            for slot in targets:
+                slot.busy = True
+                slot.leased_at = time.monotonic()
+
+        def _init(slot):
+            try:
+                self._ensure_alive(slot)
+                return None
+            except Exception as e:
+                return f"slot {slot.slot_id}: {e}"
+            finally:
+                self.checkin(slot)
+
+        if not targets:
+            return []
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            return [err for err in executor.map(_init, targets) if err]
+
+    def _quit_slot(self, slot):
+        if slot.driver:
             try:
-                driver_instance.quit()
+                slot.driver.quit()
             except:
                 pass
-            driver_instance = None
-        return {"status": "success", "message": "Driver closed"}
+        slot.driver = None
+        slot.status = "not_initialized"
+        slot.close_on_checkin = False
 
-if __name__ == "__main__":
-    # 啟動時自動初始化 driver
+    def close(self):
+        with self._cond:
+            for slot in self.slots:
+                if slot.busy:
+                    # 使用中的 session 等歸還時再關閉
+                    slot.close_on_checkin = True
+                else:
+                    self._quit_slot(slot)
+
+    def status(self):
+        with self._cond:
+            slots = [s.to_dict() for s in self.slots]
+            waiting = self.waiting
+        if any(s["status"] == "active" for s in slots):
+            status = "active"
+        elif all(s["status"] == "not_initialized" for s in slots):
+            status = "not_initialized"
+        else:
+            status = "inactive"
+        return {"status": status, "pool_size": len(slots), "queue_depth": waiting, "slots": slots}
+
+
+pool = DriverPool(DRIVER_POOL_SIZE, USERNAME, PASSWORD)
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """每個 endpoint 一個 span；呼叫端帶 X-Trace-Parent 時接在對方的 trace 之下"""
+    if not tracing.enabled():
+        return await call_next(request)
+    # query string 整包當成一個屬性，避免 name / parent 等參數名稱與 span() 的引數衝突
+    with tracing.span(f"driver_service {request.url.path}", parent=request.headers.get(tracing.TRACE_HEADER),
+                      method=request.method, params=dict(request.query_params)) as span:
+        response = await call_next(request)
+        span.set(status_code=response.status_code)
+        return response
+
+# 注意：endpoint 使用一般 def，讓 FastAPI 在 threadpool 執行 Selenium 的阻塞呼叫，
+# 否則所有請求都會卡在同一個 event loop 上無法平行
+
+@app.post("/initialize_driver")
+def initialize_driver():
+    errors = pool.initialize()
+    if errors and pool.status()["status"] != "active":
+        return {"status": "error", "message": "; ".join(errors)}
+    return {"status": "success", "message": "Driver pool initialized and logged in", "errors": errors}
+
+@app.get("/driver_status")
+def driver_status():
+    return pool.status()
+
+@app.get("/get_page_source")
+def get_page_source(slot_id: int = None):
+    if slot_id is None:
+        # 舊用戶端沒有帶 slot_id：只有一個 slot 時不會拿錯，多個 slot 時無法判斷是哪個用戶端的頁面
+        if len(pool.slots) > 1:
+            raise HTTPException(status_code=400, detail="slot_id is required when DRIVER_POOL_SIZE > 1")
+        slot_id = 0
+    try:
+        slot = pool.take_lease(slot_id)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Driver slot {slot_id} is not leased")
     try:
-        driver_instance = create_driver()
-        login_driver(driver_instance, USERNAME, PASSWORD)
-        print("✅ Driver 已自動初始化並登入完成")
+        return {"html": slot.driver.page_source, "slot_id": slot_id}
     except Exception as e:
-        print(f"❌ Driver 初始化失敗：{e}")
-    
-    uvicorn.run(app, host="127.0.0.1", port=8888)
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        pool.checkin(slot)
+
+@app.post("/set_date_and_building")
+def set_date_and_building(start_date: str, end_date: str, building_code: str, period: str,
+                          checkout_timeout: float = None):
+    try:
+        slot = pool.checkout(_checkout_timeout(checkout_timeout))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    try:
+        timings = apply_query(slot.driver, start_date, end_date, building_code, period)
+    except Exception as e:
+        if isinstance(e, WebDriverException):
+            pool.invalidate(slot, e)
+        pool.checkin(slot)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    # slot 保持租出狀態，直到用戶端以 slot_id 呼叫 /get_page_source 取回頁面
+    pool.lease(slot)
+    return {"status": "success", "slot_id": slot.slot_id, "timings": timings}
+
+def _checkout_timeout(requested):
+    """用戶端可要求較短的等待時間，讓 pool 忙碌時在它的讀取逾時之前就收到 503 並重試；不可超過 DRIVER_CHECKOUT_TIMEOUT"""
+    if requested is None or requested <= 0:
+        return CHECKOUT_TIMEOUT
+    return min(requested, CHECKOUT_TIMEOUT)
+
+@app.post("/scrape")
+def scrape(date: str, building_code: str, periods: str = "MORNING,AFTERNOON", checkout_timeout: float = None):
+    """一次完成設定、取頁面與解析，只回傳會議紀錄而不是整頁 HTML"""
+    query_date_str = date.replace("/", "")
+    meeting_data = []
+    html_bytes = 0
+    timings = {}
+    t0 = time.perf_counter()
+    try:
+        with pool.session(_checkout_timeout(checkout_timeout)) as slot:
+            t1 = time.perf_counter()
+            timings["checkout_ms"] = round((t1 - t0) * 1000, 1)
+            for period in [p.strip() for p in periods.split(",") if p.strip()]:
+                step = apply_query(slot.driver, date, date, building_code, period)
+                t2 = time.perf_counter()
+                html = slot.driver.page_source
+                t3 = time.perf_counter()
+                tracing.record("page_source", (t3 - t2) * 1000, period=period, html_bytes=len(html))
+                html_bytes += len(html)
+                meeting_data.extend(parse_html_content(html, query_date_str, period))
+                t4 = time.perf_counter()
+                step["page_source_ms"] = round((t3 - t2) * 1000, 1)
+                step["parse_ms"] = round((t4 - t3) * 1000, 1)
+                timings[period] = step
+            slot_id = slot.slot_id
+        timings["total_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    except TimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "status": "success",
+        "date": query_date_str,
+        "building_code": building_code,
+        "slot_id": slot_id,
+        "html_bytes": html_bytes,
+        "timings": timings,
+        "meetings": meeting_data,
+    }
+
+def crawl_range(start_date, end_date, building_code, period_list, checkout_timeout=CHECKOUT_TIMEOUT):
+    """在一個 pooled session 上查詢日期區間，回傳 ({日期: 紀錄}, 模式, 耗時)"""
+    start = datetime.strptime(start_date, "%Y/%m/%d")
+    end = datetime.strptime(end_date, "%Y/%m/%d")
+    if end < start:
+        raise ValueError("end_date is before start_date")
+    dates = [(start + timedelta(days=i)).strftime("%Y/%m/%d") for i in range((end - start).days + 1)]
+
+    days = {d.replace("/", ""): [] for d in dates}
+    mode = "per_day"
+    timings = {}
+    t0 = time.perf_counter()
+    with pool.session(checkout_timeout) as slot:
+        if SCRAPE_RANGE_MODE and len(dates) > 1:
+            # 先用網站本身的起訖日期查一次；每筆紀錄都帶日期時才能可靠地拆成每日資料
+            records = []
+            for period in period_list:
+                timings[f"range_{period}"] = apply_query(slot.driver, start_date, end_date, building_code, period)
+                records.extend(parse_html_content(slot.driver.page_source, None, period))
+            # 空結果無法分辨「整段都沒有預約」與「區間頁面沒有正確渲染」，改為逐日查詢確認
+            if records and all(r["date"] in days for r in records):
+                for r in records:
+                    days[r["date"]].append(r)
+                mode = "site_range"
+
+        if mode == "per_day":
+            for d in dates:
+                for period in period_list:
+                    timings[f"{d.replace('/', '')}_{period}"] = apply_query(slot.driver, d, d, building_code, period)
+                    days[d.replace("/", "")].extend(parse_html_content(slot.driver.page_source, d.replace("/", ""), period))
+    timings["total_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return days, mode, timings
+
+@app.post("/scrape_range")
+def scrape_range(start_date: str, end_date: str, building_code: str, periods: str = "MORNING,AFTERNOON",
+                 checkout_timeout: float = None):
+    """查詢一段日期區間，結果依日期拆開回傳"""
+    period_list = [p.strip() for p in periods.split(",") if p.strip()]
+    try:
+        days, mode, timings = crawl_range(start_date, end_date, building_code, period_list,
+                                          _checkout_timeout(checkout_timeout))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "status": "success",
+        "building_code": building_code,
+        "range_mode": mode,
+        "timings": timings,
+        "days": days,
+    }
+
+def prefetch_refresh(building_code, start_date, end_date):
+    days, _, _ = crawl_range(start_date, end_date, building_code, ["MORNING", "AFTERNOON"])
+    for query_date_str, meeting_data in days.items():
+        process_and_save_data(meeting_data, query_date_str, building_code=building_code)
+    return days
+
+prefetcher = Prefetcher(prefetch_refresh, list(building_map.values()))
+
+@app.get("/prefetch_status")
+def prefetch_status():
+    return prefetcher.status()
+
+@app.post("/close_driver")
+def close_driver():
+    pool.close()
+    return {"status": "success", "message": "Driver closed"}
+
+if __name__ == "__main__":
+    # 啟動時自動初始化 driver pool
+    errors = pool.initialize()
+    if pool.status()["status"] == "active":
+        print(f"✅ Driver pool 已自動初始化並登入完成（{DRIVER_POOL_SIZE} 個 session）")
+    for err in errors:
+        print(f"❌ Driver 初始化失敗：{err}")
+
+    if PREFETCH_ENABLED:
+        prefetcher.start()
+        print("✅ 背景預抓排程已啟動")
+
+    uvicorn.run(app, host="127.0.0.1", port=8888)
@@ -0,0 +1,195 @@
+import os
+import sqlite3
+import struct
+import threading
+import hashlib
+import time
+from contextlib import closing
+from langchain_core.embeddings import Embeddings
+from dotenv import load_dotenv
+
+# 載入環境變數
+load_dotenv()
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+EMBEDDING_CACHE_DB = os.getenv("EMBEDDING_CACHE_DB", os.path.join(SCRIPT_DIR, "..", "chroma_db", "embedding_cache.sqlite3"))
+# 快取大小上限（MB），超過時淘汰最久未使用的向量
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "256"))
+# 命中時的存取時間先記在記憶體，累積到這個筆數或間隔（秒）再一次寫入，讀取不必搶寫入鎖
+ACCESS_FLUSH_BATCH = 512
+ACCESS_FLUSH_INTERVAL = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (model, text_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings (last_access);
+"""
+
+
+def _pack(vector):
+    return struct.pack(f"<{len(vector)}f", *vector)
+
+def _unpack(blob):
+    return list(struct.unpack(f"<{len(blob) // 4}f", blob))
+
+
+class CachedEmbeddings(Embeddings):
+    """包裝 embedding 模型的磁碟快取，以 (模型名稱, 文字雜湊) 為鍵，多個行程可共用"""
+
+    def __init__(self, embeddings, model_name, path=EMBEDDING_CACHE_DB, max_bytes=int(EMBEDDING_CACHE_MAX_MB * 1024 * 1024)):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stats_lock = threading.Lock()
+        self._pending_access = {}
+        self._access_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            # WAL 讓預熱寫入與互動查詢的讀取可以同時進行
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def text_hash(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, hashes):
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        with closing(self._connect()) as conn:
+            # SQLite 參數數量有上限，分批查詢
+            for i in range(0, len(unique), 500):
+                chunk = unique[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                    [self.model_name, *chunk]).fetchall()
+                found.update({h: _unpack(blob) for h, blob in rows})
+        if found:
+            self._touch(found)
+        return found
+
+    def _touch(self, hashes):
+        """記下命中的存取時間（LRU 淘汰依據），定期批次寫入"""
+        now = time.time()
+        with self._access_lock:
+            for h in hashes:
+                self._pending_access[h] = now
+            due = (len(self._pending_access) >= ACCESS_FLUSH_BATCH
+                   or time.monotonic() - self._last_flush >= ACCESS_FLUSH_INTERVAL)
+        if due:
+            self.flush_access()
+
+    def flush_access(self, conn=None):
+        """
+        寫入累積的存取時間；沒有傳入連線時不等待寫入鎖，資料庫正忙就留到下次
+        只是淘汰順序的依據，行程結束前沒寫入的部分遺失也無妨
+        """
+        with self._access_lock:
+            pending, self._pending_access = self._pending_access, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        rows = [(ts, self.model_name, h) for h, ts in pending.items()]
+        sql = "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?"
+        try:
+            if conn is not None:
+                conn.executemany(sql, rows)
+            else:
+                with closing(sqlite3.connect(self.path, timeout=0)) as own, own:
+                    own.executemany(sql, rows)
+        except sqlite3.OperationalError:
+            with self._access_lock:
+                for h, ts in pending.items():
+                    self._pending_access[h] = max(ts, self._pending_access.get(h, 0))
+
+    def _store(self, items):
+        now = time.time()
+        rows = [(self.model_name, h, _pack(v), len(v) * 4, now) for h, v in items.items()]
+        with closing(self._connect()) as conn, conn:
+            conn.executemany("INSERT OR REPLACE INTO embeddings (model, text_hash, vector, size, last_access) "
+                             "VALUES (?, ?, ?, ?, ?)", rows)
+            # 已經持有寫入鎖，順便寫入累積的存取時間，淘汰時才會依最新的順序
+            self.flush_access(conn)
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # 淘汰到上限的 90%，避免每次寫入都觸發淘汰
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for model, text_hash, size in conn.execute(
+                "SELECT model, text_hash, size FROM embeddings ORDER BY last_access"):
+            victims.append((model, text_hash))
+            freed += size
+            if freed >= target:
+                break
+        conn.executemany("DELETE FROM embeddings WHERE model = ? AND text_hash = ?", victims)
+        with self._stats_lock:
+            self.evictions += len(victims)
+
+    def embed_documents(self, texts):
+        hashes = [self.text_hash(t) for t in texts]
+        cached = self._lookup(hashes)
+
+        missing = {}
+        for h, text in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = text
+        with self._stats_lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            # 回傳與快取相同精度的向量，命中與否結果一致
+            computed = {h: _unpack(_pack(v)) for h, v in zip(missing.keys(), vectors)}
+            self._store(computed)
+            cached.update(computed)
+        return [cached[h] for h in hashes]
+
+    def embed_query(self, text):
+        # 查詢向量可能使用不同的前綴指令，與文件向量分開快取
+        h = self.text_hash("query\x00" + text)
+        cached = self._lookup([h])
+        if h in cached:
+            with self._stats_lock:
+                self.hits += 1
+            return cached[h]
+        with self._stats_lock:
+            self.misses += 1
+        vector = _unpack(_pack(self.embeddings.embed_query(text)))
+        self._store({h: vector})
+        return vector
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings WHERE model = ?", (self.model_name,)).fetchone()
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": size,
+            }
@@ -0,0 +1,29 @@
+import importlib
+import threading
+
+# 背景預載與主執行緒可能同時需要同一組模組；依序匯入，避免拿到還沒初始化完成的模組
+_import_lock = threading.RLock()
+
+
+class LazyModule:
+    """
+    第一次存取屬性時才匯入的模組代理
+    package 傳入呼叫端的 __package__，讓 tools 內的模組以 tools.x 或直接執行時的 x 匯入
+    """
+
+    def __init__(self, name, package=None):
+        self._name = f"{package}.{name}" if package else name
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            with _import_lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        return f"<LazyModule {self._name} ({'loaded' if self._module is not None else 'not loaded'})>"
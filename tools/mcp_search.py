@@ -1,13 +1,30 @@
 import requests
-from datetime import datetime, timedelta
+import httpx
+import asyncio
+from datetime import datetime
 import os
-import re
 import pandas as pd
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
 from mcp.server.fastmcp import FastMCP
 
+try:
+    from tools.schedule_store import get_store
+    from tools.availability import derive_schedule
+    from tools.booking_parser import parse_html_content
+    from tools.driver_client import DRIVER_SERVICE_URL, get_client, get_async_client
+    from tools import tracing
+except ImportError:
+    from schedule_store import get_store
+    from availability import derive_schedule
+    from booking_parser import parse_html_content
+    from driver_client import DRIVER_SERVICE_URL, get_client, get_async_client
+    import tracing
+
 mcp = FastMCP("search_meeting_rooms", log_level="ERROR")
-DRIVER_SERVICE_URL = "http://127.0.0.1:8888"
+# 查詢 driver 狀態應該立即回應，不需要等到爬取的逾時
+STATUS_TIMEOUT = 10
+# 是否另外輸出 CSV 檔（預設只寫入 schedule store）
+SCHEDULE_CSV_EXPORT = os.getenv("SCHEDULE_CSV_EXPORT", "0") == "1"
 
 # 建築代碼對應中文
 building_map = {
@@ -89,51 +106,13 @@ meeting_rooms = {
 }
 
 
-def parse_html_content(html_content, query_date_str, period):
-    soup = BeautifulSoup(html_content, "html.parser")
-
-    building_select = soup.find("select", {"id": "searchBeanBuildingPK"})
-    building_option = building_select.find("option", selected=True)
-    building_name = building_option.text.strip()
-
-    meeting_data = []
-    for booking_area in soup.select(".Booking_area"):
-        title = booking_area.find("div", class_="Title")
-        if not title:
-            continue
-        floor = title.find("div", class_="Floor").text.strip()
-        room = title.find("div", class_="Room").text.strip()
-
-        for button in booking_area.select("button.meetingRecordBtn"):
-            start_time = button.get("data-starttime")
-            end_time = button.get("data-endtime")
-            fields = button.find_all("div", recursive=False)
-            if len(fields) < 4:
-                continue
-
-            topic = fields[0].text.strip()
-            host_org = fields[1].text.strip()
-            department = fields[2].text.strip()
-            person_name = re.sub(r"\s*\d{7,}", "", fields[3].text.strip())
-            host = f"{host_org} {department} {person_name}"
-
-            meeting_data.append({
-                "building": building_name,
-                "room": room,
-                "date": query_date_str,
-                "start_time": start_time,
-                "end_time": end_time,
-                "topic": topic,
-                "host": host
-            })
-
-    return meeting_data
-
-
-def save_to_csv(meeting_data, query_date_str, output_dir, timestamp=None):
+def save_to_csv(meeting_data, query_date_str, output_dir, timestamp=None, building_code=None):
     if timestamp is None:
         timestamp = datetime.now().strftime("%H%M%S")
     filename = f"{query_date_str}_query_{timestamp}.csv"
+    if building_code:
+        # 批次查詢同一時間會寫入多棟大樓，檔名需區分
+        filename = f"{query_date_str}_query_{timestamp}_{building_code}.csv"
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, filename)
     df = pd.DataFrame(meeting_data)
@@ -142,106 +121,165 @@ def save_to_csv(meeting_data, query_date_str, output_dir, timestamp=None):
     return output_path
 
 
-def process_and_save_data(meeting_data, query_date_str):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    if meeting_data:
-        save_to_csv(meeting_data, query_date_str, output_dir=os.path.join(script_dir, "..", "rag-file"), timestamp=datetime.now().strftime('%H%M%S'))
-    else:
-        print(f"⚠️ 沒有找到任何會議資料，無法儲存 CSV 檔案")
+def process_and_save_data(meeting_data, query_date_str, building_code=None):
+    """寫入 schedule store（當天沒有預約也會記錄），回傳 snapshot id"""
+    if building_code is None:
+        # 舊呼叫方式沒有帶大樓代碼，從資料中的大樓名稱推回
+        building_name = meeting_data[0]["building"] if meeting_data else ""
+        building_code = next((code for name, code in building_map.items() if building_name.startswith(name)), None)
+    if building_code is None:
+        print(f"⚠️ 沒有找到任何會議資料，無法判斷大樓")
+        return None
+
+    with tracing.span("schedule_store.save_snapshot", building=building_code, date=query_date_str, meetings=len(meeting_data)):
+        snapshot_id = get_store().save_snapshot(building_code, query_date_str, meeting_data)
+    print(f"✅ 已將 {len(meeting_data)} 筆資料存入 schedule store（{building_code} {query_date_str}）")
+
+    if SCHEDULE_CSV_EXPORT and meeting_data:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        save_to_csv(meeting_data, query_date_str, output_dir=os.path.join(script_dir, "..", "rag-file"),
+                    timestamp=datetime.now().strftime('%H%M%S'), building_code=building_code)
+    return snapshot_id
 
 
 def ensure_driver_ready():
+    client = get_client(DRIVER_SERVICE_URL)
+    try:
+        status = client.get("/driver_status", timeout=STATUS_TIMEOUT).get("status")
+    except (requests.RequestException, ValueError):
+        status = None
+    if status != "active":
+        client.post("/initialize_driver")
+
+
+async def ensure_driver_ready_async():
+    client = get_async_client(DRIVER_SERVICE_URL)
     try:
-        response = requests.get(f"{DRIVER_SERVICE_URL}/driver_status")
-        if response.json()["status"] != "active":
-            requests.post(f"{DRIVER_SERVICE_URL}/initialize_driver")
-    except:
-        requests.post(f"{DRIVER_SERVICE_URL}/initialize_driver")
+        status = (await client.get("/driver_status", timeout=STATUS_TIMEOUT)).get("status")
+    except (httpx.HTTPError, ValueError):
+        status = None
+    if status != "active":
+        await client.post("/initialize_driver")
+
+
+def _scrape_params(start_date, building_code):
+    # 早上與下午在 driver_service 端一次查完並解析，只傳回會議紀錄
+    return {"date": start_date, "building_code": building_code, "periods": "MORNING,AFTERNOON"}
+
+
+def _range_params(start_date, end_date, building_code):
+    return {"start_date": start_date, "end_date": end_date, "building_code": building_code,
+            "periods": "MORNING,AFTERNOON"}
 
 
-@mcp.tool()
 def search_meeting_rooms(start_date, building_code):
-    end_date = start_date
+    with tracing.span("search_meeting_rooms", building=building_code, date=start_date) as span:
+        ensure_driver_ready()
+
+        query_date_str = start_date.replace("/", "")
+        print(f"正在查詢 {start_date} 的會議室資料...")
+
+        result = get_client(DRIVER_SERVICE_URL).post("/scrape", params=_scrape_params(start_date, building_code))
+        meeting_data = result["meetings"]
+        span.set(meetings=len(meeting_data), html_bytes=result.get("html_bytes"))
+
+        return process_and_save_data(meeting_data, query_date_str, building_code=building_code)
+
+
+@mcp.tool(name="search_meeting_rooms")
+async def search_meeting_rooms_async(start_date, building_code):
+    """查詢某大樓某天的會議室預約並存入 schedule store；以非同步 HTTP 呼叫 driver_service，不會阻塞 MCP server"""
+    with tracing.span("search_meeting_rooms", building=building_code, date=start_date) as span:
+        await ensure_driver_ready_async()
+
+        query_date_str = start_date.replace("/", "")
+        result = await get_async_client(DRIVER_SERVICE_URL).post("/scrape", params=_scrape_params(start_date, building_code))
+        meeting_data = result["meetings"]
+        span.set(meetings=len(meeting_data), html_bytes=result.get("html_bytes"))
+
+        # SQLite 寫入是同步的，放到執行緒執行
+        return await asyncio.to_thread(process_and_save_data, meeting_data, query_date_str, building_code)
+
+
+def _split_codes(building_codes):
+    if isinstance(building_codes, str):
+        building_codes = [c.strip() for c in building_codes.split(",") if c.strip()]
+    return building_codes
+
+
+def search_meeting_rooms_batch(start_date, end_date, building_codes):
+    """批次查詢多天、多棟大樓，每個 (日期, 大樓) 各存一份資料，供上班前預熱使用"""
+    building_codes = _split_codes(building_codes)
     ensure_driver_ready()
+    client = get_client(DRIVER_SERVICE_URL)
+
+    try:
+        workers = client.get("/driver_status", timeout=STATUS_TIMEOUT).get("pool_size", 1)
+    except (requests.RequestException, ValueError):
+        workers = 1
 
-    meeting_data = []
-    query_date_str = start_date.replace("/", "")
+    parent = tracing.current()
 
-    for period in ["MORNING", "AFTERNOON"]:
-        print(f"正在查詢 {period} 的會議室資料...")
+    def crawl(building_code):
+        print(f"正在查詢 {building_code} {start_date} ~ {end_date} 的會議室資料...")
+        # 執行緒池不會繼承呼叫端的 context，以 header 明確接上父 span
+        result = client.post("/scrape_range", params=_range_params(start_date, end_date, building_code),
+                             headers=parent.header())
+        return building_code, result["days"]
 
-        requests.post(f"{DRIVER_SERVICE_URL}/set_date_and_building",
-                      params={"start_date": start_date, "end_date": end_date,
-                              "building_code": building_code, "period": period})
+    # 不同大樓分散到 driver pool 的各個 session 平行查詢
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(building_codes)))) as executor:
+        for building_code, days in executor.map(crawl, building_codes):
+            for query_date_str, meeting_data in days.items():
+                results[(query_date_str, building_code)] = meeting_data
+                process_and_save_data(meeting_data, query_date_str, building_code=building_code)
 
-        response = requests.get(f"{DRIVER_SERVICE_URL}/get_page_source")
-        html = response.json()["html"]
-        partial_data = parse_html_content(html, query_date_str, period)
-        meeting_data.extend(partial_data)
+    return {f"{d}_{b}": len(records) for (d, b), records in results.items()}
 
-    process_and_save_data(meeting_data, query_date_str)
+
+@mcp.tool(name="search_meeting_rooms_batch")
+async def search_meeting_rooms_batch_async(start_date, end_date, building_codes):
+    """批次查詢多天、多棟大樓，每個 (日期, 大樓) 各存一份資料，供上班前預熱使用"""
+    building_codes = _split_codes(building_codes)
+    await ensure_driver_ready_async()
+    client = get_async_client(DRIVER_SERVICE_URL)
+
+    try:
+        workers = (await client.get("/driver_status", timeout=STATUS_TIMEOUT)).get("pool_size", 1)
+    except (httpx.HTTPError, ValueError):
+        workers = 1
+    # 同時送出的查詢不超過 driver pool 大小，其餘在這裡排隊而不是佔住 driver_service 的 worker
+    slots = asyncio.Semaphore(max(1, workers))
+
+    async def crawl(building_code):
+        async with slots:
+            result = await client.post("/scrape_range", params=_range_params(start_date, end_date, building_code))
+        return building_code, result["days"]
+
+    results = {}
+    for building_code, days in await asyncio.gather(*(crawl(code) for code in building_codes)):
+        for query_date_str, meeting_data in days.items():
+            results[(query_date_str, building_code)] = meeting_data
+            await asyncio.to_thread(process_and_save_data, meeting_data, query_date_str, building_code)
+
+    return {f"{d}_{b}": len(records) for (d, b), records in results.items()}
 
 
 def compress_schedule_data(csv_path: str, building_code: str) -> dict:
-    df = pd.read_csv(csv_path)
-    df = df.sort_values(by=["room", "start_time"])
-    all_slots = generate_all_slots()
-
-    occupied = {}
-    available = {}
-
-    for _, row in df.iterrows():
-        room = row["room"]
-        reserved = convert_to_slots(row["start_time"], row["end_time"], all_slots)
-        occupied.setdefault(room, []).extend(reserved)
-
-    for room in occupied:
-        reserved = set(occupied[room])
-        available[room] = [f"{s}-{e}" for s, e in all_slots if (s, e) not in reserved]
-
-    # 補上未出現的會議室（全日可用）
-    if building_code in meeting_rooms:
-        for floor, rooms in meeting_rooms[building_code].items():
-            for room in rooms:
-                if room not in occupied:
-                    occupied[room] = []
-                    available[room] = [f"{s}-{e}" for s, e in all_slots]
+    # 向量化計算所有會議室（含未出現、全日可用者）的空閒時段
+    schedule = derive_schedule(csv_path, building_code=building_code,
+                               rooms_catalog=meeting_rooms.get(building_code))
+    df = schedule.df
 
     return {
         "date": str(df.iloc[0]["date"]) if not df.empty else "",
         "building": str(df.iloc[0]["building"]) if not df.empty else "",
-        "reserved_meetings": df.to_dict(orient="records"),
-        "available_slots": [{"room": r, "available_time": t} for r, times in available.items() for t in times]
+        "reserved_meetings": schedule.reserved_records(),
+        "available_slots": [{"room": room, "available_time": t}
+                            for room, times in zip(schedule.rooms["room"], schedule.available_slot_labels())
+                            for t in times]
     }
 
-
-def generate_all_slots(start="08:00", end="18:00", step=30):
-    fmt = "%H:%M"
-    start_time = datetime.strptime(start, fmt)
-    end_time = datetime.strptime(end, fmt)
-    result = []
-    while start_time < end_time:
-        next_time = start_time + timedelta(minutes=step)
-        result.append((start_time.strftime(fmt), next_time.strftime(fmt)))
-        start_time = next_time
-    return result
-
-
-def time_overlap(slot_start, slot_end, reserve_start, reserve_end):
-    return slot_start < reserve_end and reserve_start < slot_end
-
-def convert_to_slots(start, end, all_slots):
-    fmt = "%H:%M"
-    reserve_start = datetime.strptime(start, fmt)
-    reserve_end = datetime.strptime(end, fmt)
-    
-    result = []
-    for s_start, s_end in all_slots:
-        slot_start = datetime.strptime(s_start, fmt)
-        slot_end = datetime.strptime(s_end, fmt)
-        if time_overlap(slot_start, slot_end, reserve_start, reserve_end):
-            result.append((s_start, s_end))
-    return result
-
 if __name__ == "__main__":
     mcp.run(transport="stdio")
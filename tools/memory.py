@@ -1,11 +1,75 @@
 # tools/memory.py
+import os
+import re
+from collections import deque
+
+try:
+    from tools import tracing
+except ImportError:
+    import tracing
+
+# 保留的對話訊息上限（不含固定的 system 訊息），超過時淘汰最舊的訊息
+MEMORY_MAX_MESSAGES = int(os.getenv("MEMORY_MAX_MESSAGES", "40"))
+# 組 prompt 時對話歷史可用的 token 預算
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "2000"))
+
+CJK_CHAR = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+def estimate_tokens(text):
+    """粗估 token 數：中日韓字元約一字一 token，其餘約四個字元一 token"""
+    text = str(text)
+    cjk = len(CJK_CHAR.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4 + 1
+
+
+def make_llm_summarizer(llm):
+    """以 LLM 把被淘汰的對話併入摘要；llm 需提供 invoke(messages) 並回傳有 content 的物件"""
+    def summarize(previous_summary, evicted):
+        dialogue = "\n".join(f"{m['role']}: {m['content']}" for m in evicted)
+        prompt = (f"先前的對話摘要：{previous_summary or '（無）'}\n\n新的對話：\n{dialogue}\n\n"
+                  "請將以上內容整合成一段簡短的摘要，保留大樓、日期、會議室與使用者需求等重點。")
+        with tracing.span("llm.invoke", purpose="summary", messages=len(evicted), prompt_tokens=estimate_tokens(prompt)) as span:
+            summary = llm.invoke([{"role": "user", "content": prompt}]).content.strip()
+            span.set(output_tokens=estimate_tokens(summary))
+        return summary
+    return summarize
+
+
 class SimpleMemory:
-    def __init__(self):
-        self.history = []
+    """
+    對話記憶：system 訊息固定保留；一般訊息放在有上限的環狀佇列，淘汰的訊息可交給 summarizer 併入滾動摘要
+    summarizer(previous_summary, evicted_messages) -> 新摘要
+    """
+
+    def __init__(self, max_messages=MEMORY_MAX_MESSAGES, token_budget=MEMORY_TOKEN_BUDGET,
+                 summarizer=None, token_counter=estimate_tokens):
+        self.max_messages = max(2, max_messages)
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.count_tokens = token_counter
+        self.pinned = []
+        self.history = deque()
         self.context = {}
+        self.summary = ""
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.pinned) + len(self.history)
 
     def append(self, role, content):
-        self.history.append({"role": role, "content": content})
+        message = {"role": role, "content": content, "tokens": self.count_tokens(content)}
+        if role == "system":
+            self.pinned.append(message)
+            return
+        self.history.append(message)
+        if len(self.history) > self.max_messages:
+            # 一次淘汰約四分之一，摘要不必每則訊息都重算
+            drop = len(self.history) - self.max_messages + self.max_messages // 4
+            evicted = [self.history.popleft() for _ in range(min(drop, len(self.history) - 1))]
+            self.evicted += len(evicted)
+            if self.summarizer:
+                self.summary = self.summarizer(self.summary, [_public(m) for m in evicted])
 
     def update_context(self, key, content):
         self.context[key] = content
@@ -14,17 +78,44 @@ class SimpleMemory:
         """清除上下文，只保留對話歷史"""
         self.context.clear()
 
-    def get_recent_messages(self, n=3):
-        """獲取最近n輪對話"""
-        return self.history[-n*2:] if len(self.history) >= n*2 else self.history
+    def _prefix(self):
+        prefix = [_public(m) for m in self.pinned]
+        if self.summary:
+            prefix.append({"role": "system", "content": f"[先前對話摘要]\n{self.summary}"})
+        return prefix
+
+    def get_recent_messages(self, n=3, token_budget=None):
+        """
+        獲取最近n輪對話，並以 token 預算從最舊的一則開始捨去（最新一則一定保留）
+        固定的 system 訊息與摘要放在最前面，不受預算影響
+        """
+        budget = self.token_budget if token_budget is None else token_budget
+        recent = []
+        used = 0
+        for i in range(len(self.history) - 1, max(len(self.history) - n * 2, 0) - 1, -1):
+            message = self.history[i]
+            if recent and used + message["tokens"] > budget:
+                break
+            used += message["tokens"]
+            recent.append(_public(message))
+        recent.reverse()
+        return self._prefix() + recent
 
     def messages(self):
-        messages = []
+        messages = [_public(m) for m in self.pinned]
         for key, content in self.context.items():
             messages.append({"role": "system", "content": f"[{key}]\n{content}"})
-        messages.extend(self.history)
+        if self.summary:
+            messages.append({"role": "system", "content": f"[先前對話摘要]\n{self.summary}"})
+        messages.extend(_public(m) for m in self.history)
         return messages
 
     def clear(self):
+        self.pinned.clear()
         self.history.clear()
         self.context.clear()
+        self.summary = ""
+
+
+def _public(message):
+    return {"role": message["role"], "content": message["content"]}
@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import time
+import requests
+from dotenv import load_dotenv
+
+try:
+    from tools import tracing
+except ImportError:
+    import tracing
+
+# 載入環境變數
+load_dotenv()
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+MODEL_NAME = os.getenv("MODEL_NAME", "gemma3:12b")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text:latest")
+# 模型最後一次使用後留在記憶體的時間（Ollama 的 keep_alive）：30m、1h、秒數；-1 永久保留，0 用完即卸載
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# 啟動與建立 session 時在背景預先載入對話與 embedding 模型
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1") == "1"
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "300"))
+# Ollama 回報的 load_duration 超過此值（ms）視為冷啟動：模型是從磁碟載入，而不是已在記憶體
+COLD_LOAD_MS = 200
+
+
+def keep_alive_value(value=OLLAMA_KEEP_ALIVE):
+    """純數字轉成秒數（Ollama 不接受 "3600" 這種字串），30m、1h 等原樣送出"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _tagged(model):
+    # /api/ps 列出的名稱一定帶 tag
+    return model if ":" in model else f"{model}:latest"
+
+
+def loaded_models(base_url=OLLAMA_HOST, timeout=5):
+    """目前載入在記憶體中的模型名稱"""
+    response = requests.get(f"{base_url.rstrip('/')}/api/ps", timeout=timeout)
+    response.raise_for_status()
+    return {m.get("name") or m.get("model") for m in response.json().get("models", [])}
+
+
+def load_model(model, embedding=False, base_url=OLLAMA_HOST, keep_alive=OLLAMA_KEEP_ALIVE, timeout=WARMUP_TIMEOUT):
+    """
+    把模型載入記憶體並設定 keep_alive；/api/generate 不帶 prompt 時 Ollama 只載入模型、不生成
+    embedding 模型沒有只載入的寫法，送一段很短的文字
+    """
+    if embedding:
+        path, payload = "/api/embed", {"model": model, "input": "warm-up"}
+    else:
+        path, payload = "/api/generate", {"model": model, "stream": False}
+    payload["keep_alive"] = keep_alive_value(keep_alive)
+    kind = "embedding" if embedding else "chat"
+    with tracing.span("model_warmup", model=model, kind=kind) as span:
+        t0 = time.perf_counter()
+        response = requests.post(f"{base_url.rstrip('/')}{path}", json=payload, timeout=timeout)
+        response.raise_for_status()
+        total_ms = (time.perf_counter() - t0) * 1000
+        load_duration = response.json().get("load_duration")
+        load_ms = load_duration / 1e6 if load_duration is not None else None
+        span.set(load_ms=load_ms)
+    return {"model": model, "kind": kind, "load_ms": load_ms, "total_ms": total_ms}
+
+
+def unload_model(model, embedding=False, base_url=OLLAMA_HOST, timeout=30):
+    """keep_alive=0：請求結束後立即卸載"""
+    if embedding:
+        path, payload = "/api/embed", {"model": model, "input": "unload", "keep_alive": 0}
+    else:
+        path, payload = "/api/generate", {"model": model, "stream": False, "keep_alive": 0}
+    requests.post(f"{base_url.rstrip('/')}{path}", json=payload, timeout=timeout).raise_for_status()
+
+
+def warm_up(chat_model=MODEL_NAME, embedding_model=EMBEDDING_MODEL, base_url=OLLAMA_HOST,
+            keep_alive=OLLAMA_KEEP_ALIVE, only_missing=True):
+    """
+    依序載入 embedding 與對話模型（embedding 較小，且載入排程時最先用到）
+    only_missing 時跳過已在記憶體中的模型；回傳每個模型的 status：loaded / warmed / error
+    """
+    try:
+        loaded = loaded_models(base_url) if only_missing else set()
+    except requests.RequestException:
+        loaded = set()
+    results = []
+    for model, embedding in ((embedding_model, True), (chat_model, False)):
+        kind = "embedding" if embedding else "chat"
+        if _tagged(model) in loaded:
+            results.append({"model": model, "kind": kind, "status": "loaded"})
+            continue
+        try:
+            result = load_model(model, embedding, base_url, keep_alive)
+            results.append({**result, "status": "warmed"})
+        except requests.RequestException as e:
+            results.append({"model": model, "kind": kind, "status": "error", "error": str(e)})
+    return results
+
+
+def measure_ttft(model, base_url=OLLAMA_HOST, keep_alive=OLLAMA_KEEP_ALIVE, prompt="請用一句話自我介紹。",
+                 timeout=WARMUP_TIMEOUT):
+    """串流生成到第一個非空 token 的時間（ms）與 Ollama 回報的模型載入時間"""
+    payload = {"model": model, "prompt": prompt, "stream": True, "keep_alive": keep_alive_value(keep_alive),
+               "options": {"num_predict": 16}}
+    t0 = time.perf_counter()
+    ttft = None
+    load_ms = None
+    with requests.post(f"{base_url.rstrip('/')}/api/generate", json=payload, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if ttft is None and chunk.get("response"):
+                ttft = (time.perf_counter() - t0) * 1000
+            if chunk.get("done"):
+                if chunk.get("load_duration") is not None:
+                    load_ms = chunk["load_duration"] / 1e6
+                break
+    return {"ttft_ms": ttft, "total_ms": (time.perf_counter() - t0) * 1000, "load_ms": load_ms}
+
+
+def measure_embed(model, base_url=OLLAMA_HOST, keep_alive=OLLAMA_KEEP_ALIVE, timeout=WARMUP_TIMEOUT):
+    t0 = time.perf_counter()
+    response = requests.post(f"{base_url.rstrip('/')}/api/embed",
+                             json={"model": model, "input": "query: 第1會議室下午有空嗎",
+                                   "keep_alive": keep_alive_value(keep_alive)}, timeout=timeout)
+    response.raise_for_status()
+    load_duration = response.json().get("load_duration")
+    return {"ttft_ms": (time.perf_counter() - t0) * 1000, "load_ms": load_duration / 1e6 if load_duration is not None else None}
+
+
+def report(chat_model=MODEL_NAME, embedding_model=EMBEDDING_MODEL, base_url=OLLAMA_HOST, keep_alive=OLLAMA_KEEP_ALIVE):
+    """先卸載模型量冷啟動，再量一次已載入（warm）時的首字延遲"""
+    print(f"{'model':<28}{'state':<7}{'first token ms':>16}{'load ms':>11}")
+    for model, embedding in ((chat_model, False), (embedding_model, True)):
+        unload_model(model, embedding, base_url)
+        for state in ("cold", "warm"):
+            if embedding:
+                result = measure_embed(model, base_url, keep_alive)
+            else:
+                result = measure_ttft(model, base_url, keep_alive)
+            load = f"{result['load_ms']:.0f}" if result["load_ms"] is not None else "-"
+            ttft = f"{result['ttft_ms']:.0f}" if result["ttft_ms"] is not None else "-"
+            print(f"{model:<28}{state:<7}{ttft:>16}{load:>11}")
+
+
+if __name__ == "__main__":
+    # python tools/model_warmup.py warm | status | report
+    command = sys.argv[1] if len(sys.argv) > 1 else "warm"
+    if command == "status":
+        for name in sorted(loaded_models()):
+            print(f"✅ {name}")
+    elif command == "report":
+        report()
+    else:
+        for result in warm_up(only_missing=False):
+            if result["status"] == "error":
+                print(f"❌ {result['model']}: {result['error']}")
+            else:
+                print(f"🔥 {result['model']} ({result['kind']}) 載入 {result['total_ms']:.0f} ms，keep_alive={OLLAMA_KEEP_ALIVE}")
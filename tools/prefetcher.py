@@ -0,0 +1,194 @@
+import os
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+# 載入環境變數
+load_dotenv()
+
+# 背景預抓設定
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "0") == "1"
+PREFETCH_DAYS_AHEAD = int(os.getenv("PREFETCH_DAYS_AHEAD", "6"))
+PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL", "900"))
+PREFETCH_JITTER = float(os.getenv("PREFETCH_JITTER", "0.1"))
+PREFETCH_MAX_BACKOFF = float(os.getenv("PREFETCH_MAX_BACKOFF", "3600"))
+# 獨立行程模式的狀態查詢埠（GET /prefetch_status）
+PREFETCH_STATUS_HOST = os.getenv("PREFETCH_STATUS_HOST", "127.0.0.1")
+PREFETCH_STATUS_PORT = int(os.getenv("PREFETCH_STATUS_PORT", "8889"))
+
+
+class Prefetcher:
+    """定期刷新今天到今天+N 天、每棟大樓的會議室資料，讓使用者查詢時不必現場爬取"""
+
+    def __init__(self, refresh_fn, building_codes, days_ahead=PREFETCH_DAYS_AHEAD,
+                 interval=PREFETCH_INTERVAL, jitter=PREFETCH_JITTER, max_backoff=PREFETCH_MAX_BACKOFF):
+        # refresh_fn(building_code, start_date, end_date) -> {日期: 紀錄}，日期格式 YYYY/MM/DD
+        self.refresh_fn = refresh_fn
+        self.building_codes = list(building_codes)
+        self.days_ahead = days_ahead
+        self.interval = interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+
+        self.keys = {}  # (日期, 大樓) → 最後刷新資訊
+        # 第一次刷新也錯開 0 ~ interval * jitter 秒，啟動時不會所有大樓同時爬取
+        now = time.monotonic()
+        self.buildings = {
+            code: {"next_run": now + random.uniform(0, self.interval * self.jitter), "failures": 0,
+                   "last_error": None, "running": False}
+            for code in self.building_codes
+        }
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _jittered(self, seconds):
+        # 加上隨機抖動，避免所有大樓在同一時間一起刷新
+        return seconds * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def refresh_building(self, building_code):
+        today = datetime.now()
+        start_date = today.strftime("%Y/%m/%d")
+        end_date = (today + timedelta(days=self.days_ahead)).strftime("%Y/%m/%d")
+        state = self.buildings[building_code]
+
+        with self._lock:
+            state["running"] = True
+        t0 = time.perf_counter()
+        try:
+            days = self.refresh_fn(building_code, start_date, end_date)
+        except Exception as e:
+            # 失敗時指數退避，上限 max_backoff
+            with self._lock:
+                state["running"] = False
+                state["failures"] += 1
+                state["last_error"] = str(e)
+                backoff = min(self.interval * 2 ** (state["failures"] - 1), self.max_backoff)
+                state["next_run"] = time.monotonic() + self._jittered(backoff)
+            print(f"⚠️ 預抓 {building_code} 失敗（第 {state['failures']} 次）：{e}")
+            return False
+
+        elapsed = round(time.perf_counter() - t0, 2)
+        refreshed_at = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            state["running"] = False
+            state["failures"] = 0
+            state["last_error"] = None
+            state["next_run"] = time.monotonic() + self._jittered(self.interval)
+            for query_date_str, records in days.items():
+                self.keys[(query_date_str, building_code)] = {
+                    "last_refresh": refreshed_at,
+                    "meetings": len(records),
+                    "elapsed_s": elapsed,
+                }
+        return True
+
+    def run_once(self):
+        """刷新所有已到期的大樓，回傳刷新的數量"""
+        now = time.monotonic()
+        with self._lock:
+            due = [code for code, state in self.buildings.items() if state["next_run"] <= now]
+        # 依序刷新，只佔用 driver pool 的一個 session，保留其他 session 給互動查詢
+        for building_code in due:
+            if self._stop.is_set():
+                break
+            self.refresh_building(building_code)
+        return len(due)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_once()
+            with self._lock:
+                next_run = min(state["next_run"] for state in self.buildings.values())
+            self._stop.wait(max(1.0, next_run - time.monotonic()))
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="prefetcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def status(self):
+        now = time.monotonic()
+        with self._lock:
+            buildings = {
+                code: {
+                    "failures": state["failures"],
+                    "last_error": state["last_error"],
+                    "running": state["running"],
+                    "next_run_in_s": round(max(0.0, state["next_run"] - now), 1),
+                }
+                for code, state in self.buildings.items()
+            }
+            keys = {f"{d}_{b}": info.copy() for (d, b), info in sorted(self.keys.items())}
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "days_ahead": self.days_ahead,
+            "interval_s": self.interval,
+            "buildings": buildings,
+            "keys": keys,
+        }
+
+
+def serve_status(prefetcher, host=PREFETCH_STATUS_HOST, port=PREFETCH_STATUS_PORT):
+    """獨立行程模式沒有 driver_service 的 /prefetch_status，另外以小型 HTTP server 提供同樣的內容"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/prefetch_status":
+                self.send_error(404)
+                return
+            body = json.dumps(prefetcher.status(), ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="prefetch-status", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    # 獨立行程模式：透過 driver_service 的 HTTP API 刷新
+    try:
+        from tools.mcp_search import DRIVER_SERVICE_URL, building_map, ensure_driver_ready, process_and_save_data
+        from tools.driver_client import get_client
+    except ImportError:
+        from mcp_search import DRIVER_SERVICE_URL, building_map, ensure_driver_ready, process_and_save_data
+        from driver_client import get_client
+
+    def http_refresh(building_code, start_date, end_date):
+        ensure_driver_ready()
+        days = get_client(DRIVER_SERVICE_URL).post("/scrape_range", params={
+            "start_date": start_date, "end_date": end_date,
+            "building_code": building_code, "periods": "MORNING,AFTERNOON"})["days"]
+        for query_date_str, meeting_data in days.items():
+            process_and_save_data(meeting_data, query_date_str, building_code=building_code)
+        return days
+
+    prefetcher = Prefetcher(http_refresh, list(building_map.values()))
+    print(f"✅ 背景預抓排程已啟動（今天起 {PREFETCH_DAYS_AHEAD} 天，每 {PREFETCH_INTERVAL:.0f} 秒）")
+    prefetcher.start()
+    serve_status(prefetcher)
+    print(f"✅ 預抓狀態：http://{PREFETCH_STATUS_HOST}:{PREFETCH_STATUS_PORT}/prefetch_status")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        prefetcher.stop()
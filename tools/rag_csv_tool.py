@@ -1,19 +1,43 @@
 import os
+import hashlib
+import threading
 import pandas as pd
-from datetime import datetime, timedelta
 from langchain_community.embeddings import OllamaEmbeddings
-from langchain_community.vectorstores import Chroma
 from langchain.chains import RetrievalQA
+from langchain.chains.question_answering import load_qa_chain as load_documents_chain
 from langchain_community.chat_models import ChatOllama
 from langchain.schema import Document
 from dotenv import load_dotenv
 
+try:
+    from tools.embedding_cache import CachedEmbeddings
+    from tools.batched_embeddings import BatchedOllamaEmbeddings
+    from tools.availability import derive_schedule
+    from tools.availability_engine import AVAILABILITY_KEYWORDS, RESERVATION_KEYWORDS
+    from tools.vector_partitions import CollectionManager
+    from tools.model_warmup import OLLAMA_HOST, keep_alive_value
+    from tools import tracing
+except ImportError:
+    from embedding_cache import CachedEmbeddings
+    from batched_embeddings import BatchedOllamaEmbeddings
+    from availability import derive_schedule
+    from availability_engine import AVAILABILITY_KEYWORDS, RESERVATION_KEYWORDS
+    from vector_partitions import CollectionManager
+    from model_warmup import OLLAMA_HOST, keep_alive_value
+    import tracing
+
 # 載入環境變數
 load_dotenv()
 
 CHROMA_DIR = "chroma_db"
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text:latest")
 LLM_MODEL = os.getenv("MODEL_NAME", "gemma3:12b")
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "1") == "1"
+# batched：/api/embed 批次 + 平行；ollama：langchain 原本逐筆送出的 OllamaEmbeddings
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "batched")
+# 不同後端產生的向量不能混用（/api/embed 會正規化），快取與文件雜湊都要區分
+EMBEDDER_ID = f"{EMBEDDING_MODEL}@{EMBEDDING_BACKEND}"
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "5"))
 
 # 會議室完整資訊
 meeting_rooms = {
@@ -44,75 +68,199 @@ meeting_rooms = {
 
 building_map = {"仁愛大樓": "4", "松仁大樓": "6", "瑞湖大樓": "12", "信義安和大樓": "15", "台中忠明大樓": "19"}
 
-def generate_all_slots(start="08:00", end="18:00", step=30):
-    fmt = "%H:%M"
-    start_time = datetime.strptime(start, fmt)
-    end_time = datetime.strptime(end, fmt)
-    result = []
-    while start_time < end_time:
-        next_time = start_time + timedelta(minutes=step)
-        result.append((start_time.strftime(fmt), next_time.strftime(fmt)))
-        start_time = next_time
-    return result
-
-def convert_to_slots(start, end, all_slots):
-    fmt = "%H:%M"
-    reserve_start = datetime.strptime(start, fmt)
-    reserve_end = datetime.strptime(end, fmt)
-    result = []
-    for s_start, s_end in all_slots:
-        slot_start = datetime.strptime(s_start, fmt)
-        slot_end = datetime.strptime(s_end, fmt)
-        if slot_start < reserve_end and reserve_start < slot_end:
-            result.append((s_start, s_end))
-    return result
-
-def build_vectorstore_from_csv(csv_path: str):
-    df = pd.read_csv(csv_path)
-    building_code = building_map.get(df.iloc[0]['building']) if not df.empty else None
-    date = str(df.iloc[0]['date']) if not df.empty else ""
-    
-    documents = []
-    all_slots = generate_all_slots()
-    
-    # 處理已預約會議
-    occupied_rooms = set()
-    for _, row in df.iterrows():
-        room = row['room']
-        occupied_rooms.add(room)
-        
-        # 會議預約資訊
-        meeting_info = f"會議室: {row['building']} {room}\n日期: {date}\n時間: {row['start_time']}-{row['end_time']}\n主題: {row['topic']}\n主辦: {row['host']}\n狀態: 已預約"
-        documents.append(Document(page_content=meeting_info, metadata={"type": "reserved", "room": room, "date": date}))
-    
-    # 處理空閒會議室和時段
-    if building_code and building_code in meeting_rooms:
-        room_availability = {}
-        
-        # 計算每間會議室的佔用時段
-        for _, row in df.iterrows():
-            room = row['room']
-            reserved_slots = convert_to_slots(row['start_time'], row['end_time'], all_slots)
-            room_availability.setdefault(room, []).extend(reserved_slots)
-        
-        # 為所有會議室生成可用時段資訊
-        for floor, rooms in meeting_rooms[building_code].items():
-            for room_name, capacity in rooms.items():
-                reserved_slots = set(room_availability.get(room_name, []))
-                available_slots = [f"{s}-{e}" for s, e in all_slots if (s, e) not in reserved_slots]
-                
-                # 會議室基本資訊
-                room_info = f"會議室: {list(building_map.keys())[list(building_map.values()).index(building_code)]} {room_name}\n樓層: {floor}\n容納人數: {capacity}人\n日期: {date}\n可用時段: {', '.join(available_slots) if available_slots else '無'}\n狀態: {'部分可用' if available_slots else '全日預約'}"
-                documents.append(Document(page_content=room_info, metadata={"type": "availability", "room": room_name, "capacity": capacity, "date": date}))
-    
-    embeddings = OllamaEmbeddings(model=EMBEDDING_MODEL)
-    vectorstore = Chroma.from_documents(documents, embeddings, persist_directory=CHROMA_DIR)
-    vectorstore.persist()
-    return vectorstore
-
-def load_qa_chain():
-    vectorstore = Chroma(persist_directory=CHROMA_DIR, embedding_function=OllamaEmbeddings(model=EMBEDDING_MODEL))
-    retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-    llm = ChatOllama(model=LLM_MODEL)
+_embeddings = None
+_collections = None
+_vectorstore_lock = threading.Lock()
+# Chroma 的寫入（同步文件）一次只允許一個執行緒，查詢不受影響
+_sync_lock = threading.Lock()
+
+def get_embeddings():
+    """共用的 embedding 函式；預設包上磁碟快取，重複的文件不再送往 Ollama"""
+    global _embeddings
+    if _embeddings is None:
+        if EMBEDDING_BACKEND == "batched":
+            _embeddings = BatchedOllamaEmbeddings(model=EMBEDDING_MODEL, keep_alive=keep_alive_value())
+        else:
+            _embeddings = OllamaEmbeddings(model=EMBEDDING_MODEL)
+        if EMBEDDING_CACHE:
+            _embeddings = CachedEmbeddings(_embeddings, EMBEDDER_ID)
+    return _embeddings
+
+def get_collections():
+    """共用的分區管理器；同一行程內的所有查詢與更新都使用同一個 Chroma client"""
+    global _collections
+    with _vectorstore_lock:
+        if _collections is None:
+            _collections = CollectionManager(CHROMA_DIR, get_embeddings())
+        return _collections
+
+def get_vectorstore(building_code=None, date=None, create=True):
+    """
+    (大樓, 日期) 所屬分區的 Chroma handle；沒有指定時回傳分區前的單一 collection
+    create=False 時分區不存在回傳 None
+    """
+    if building_code and date:
+        return get_collections().get(building_code, date, create=create)
+    return get_collections().legacy()
+
+def building_name(building_code):
+    return next((name for name, code in building_map.items() if code == building_code), None)
+
+def build_vectorstore_from_csv(source, building_code=None, date=None):
+    with tracing.span("build_vectorstore_from_csv", building=building_code, date=date) as span:
+        return _build_vectorstore(source, building_code, date, span)
+
+def _build_vectorstore(source, building_code, date, span):
+    # source 可以是 CSV 路徑、schedule store 載入的 DataFrame，或已計算好的 derive_schedule 結果
+    schedule = source if hasattr(source, "availability_texts") else None
+    if schedule is None:
+        df = source if isinstance(source, pd.DataFrame) else pd.read_csv(source, dtype=str)
+        if building_code is None:
+            building_code = building_map.get(df.iloc[0]['building']) if not df.empty else None
+        schedule = derive_schedule(df, building_code=building_code, date=date,
+                                   rooms_catalog=meeting_rooms.get(building_code),
+                                   building_name=building_name(building_code))
+    building_code = building_code or schedule.building_code
+    df = schedule.df
+    building = building_code or (df.iloc[0]['building'] if not df.empty else "")
+
+    # 已預約會議（文字與 ID 整欄一次組好）
+    documents_by_date = {}
+    reserved_texts = schedule.reserved_texts()
+    for text, row in zip(reserved_texts, df[["building", "date", "room", "start_time", "end_time"]].itertuples(index=False)):
+        doc_id = document_id("reserved", building_code or row.building, row.date, row.room, row.start_time, row.end_time)
+        documents_by_date.setdefault(row.date, []).append(
+            Document(page_content=text, metadata={"type": "reserved", "room": row.room, "date": row.date, "id": doc_id}))
+
+    # 目錄內所有會議室的空閒時段（沒有預約的會議室也會產生）
+    rooms = schedule.rooms
+    for index, text in schedule.availability_texts():
+        room_name, room_date, capacity = rooms.at[index, "room"], rooms.at[index, "date"], int(rooms.at[index, "capacity"])
+        doc_id = document_id("availability", building_code, room_date, room_name)
+        documents_by_date.setdefault(room_date, []).append(
+            Document(page_content=text, metadata={"type": "availability", "room": room_name, "capacity": capacity, "date": room_date, "id": doc_id}))
+
+    # 沒有任何文件的日期仍要同步，清掉舊快照留下的文件（分區不存在時就不必建立）
+    collections = get_collections()
+    totals = {"added": 0, "deleted": 0, "unchanged": 0}
+    with _sync_lock:
+        for sync_date in sorted(d for d in set(documents_by_date) | {schedule.date or date or ""} if d):
+            documents = documents_by_date.get(sync_date, [])
+            vectorstore = collections.get(building, sync_date, create=bool(documents))
+            if vectorstore is not None:
+                for key, count in sync_documents(vectorstore, documents, building, sync_date).items():
+                    totals[key] += count
+                collections.touch(building, sync_date)
+        dropped = collections.maybe_sweep()
+    span.set(dates=len(documents_by_date), documents=totals["added"] + totals["unchanged"], **totals)
+    if dropped:
+        print(f"🗑️ 已刪除 {len(dropped)} 個超過 {collections.retention_days} 天的向量分區")
+    return collections
+
+def document_id(*parts):
+    """以 (類型, 大樓, 日期, 會議室, 起訖時間) 產生穩定的文件 ID"""
+    return hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+def sync_documents(vectorstore, documents, building, date):
+    """只嵌入新增或內容變動的文件，並刪除被新快照取代的舊文件"""
+    wanted = {}
+    for doc in documents:
+        doc_id = doc.metadata.pop("id")
+        if doc_id in wanted:
+            # 上午、下午頁面都會列出跨中午的會議，重複的只保留一筆
+            continue
+        doc.metadata["building"] = building
+        doc.metadata["doc_hash"] = hashlib.sha1(f"{EMBEDDER_ID}\n{doc.page_content}".encode("utf-8")).hexdigest()
+        wanted[doc_id] = doc
+
+    existing = vectorstore.get(where={"date": date}, include=["metadatas"])
+    current = {}
+    stale_ids = []
+    for doc_id, metadata in zip(existing["ids"], existing["metadatas"]):
+        metadata = metadata or {}
+        if metadata.get("building") == building:
+            current[doc_id] = metadata.get("doc_hash")
+        elif "doc_hash" not in metadata:
+            # 舊版本沒有穩定 ID 的重複文件，一併清除
+            stale_ids.append(doc_id)
+
+    to_add = [doc_id for doc_id, doc in wanted.items() if current.get(doc_id) != doc.metadata["doc_hash"]]
+    stale_ids += [doc_id for doc_id in current if doc_id not in wanted]
+    # 內容變動的文件先刪除再重新加入
+    delete_ids = stale_ids + [doc_id for doc_id in to_add if doc_id in current]
+
+    if delete_ids:
+        vectorstore.delete(ids=delete_ids)
+    if to_add:
+        # 嵌入（新增文件時才呼叫 embedding）與寫入
+        with tracing.span("embed_documents", date=date, documents=len(to_add)):
+            vectorstore.add_documents([wanted[doc_id] for doc_id in to_add], ids=to_add)
+    print(f"🧮 向量資料庫更新：新增/更新 {len(to_add)} 筆、刪除 {len(stale_ids)} 筆、未變動 {len(wanted) - len(to_add)} 筆")
+    return {"added": len(to_add), "deleted": len(stale_ids), "unchanged": len(wanted) - len(to_add)}
+
+def infer_doc_type(question):
+    """問預約內容 → reserved；問空閒 → availability；看不出來或兩者都有時不限定"""
+    lowered = question.lower()
+    asks_reserved = any(k in question for k in RESERVATION_KEYWORDS)
+    asks_available = any(k in lowered for k in AVAILABILITY_KEYWORDS)
+    if asks_reserved != asks_available:
+        return "reserved" if asks_reserved else "availability"
+    return None
+
+def retrieval_filter(building_code=None, date=None, doc_type=None):
+    """Chroma 的 metadata 條件；多個條件以 $and 組合"""
+    conditions = [{key: value} for key, value in (("building", building_code), ("date", date), ("type", doc_type)) if value]
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+def partition_filter(building_code=None, date=None, doc_type=None):
+    """
+    分區內仍需要的條件：分區已限定大樓與日期，只剩文件類型
+    （月分區還要限定日期；沒有指定大樓 / 日期時查詢舊的單一 collection，條件照舊）
+    """
+    if not (building_code and date):
+        return retrieval_filter(building_code, date, doc_type)
+    return retrieval_filter(date=date if get_collections().granularity == "month" else None, doc_type=doc_type)
+
+def retrieve(query, building_code=None, date=None, k=RAG_TOP_K):
+    """只在指定大樓 / 日期的分區中檢索；問題看得出要找預約或空閒時再限定文件類型"""
+    with tracing.span("retrieve", building=building_code, date=date, k=k) as span:
+        vectorstore = get_vectorstore(building_code, date, create=False)
+        if vectorstore is None:
+            span.set(partition=False, documents=0)
+            return []
+        doc_type = infer_doc_type(query)
+        documents = vectorstore.similarity_search(query, k=k, filter=partition_filter(building_code, date, doc_type))
+        fallback = not documents and bool(doc_type)
+        if fallback:
+            # 類型判斷錯誤時退回只限定大樓與日期
+            documents = vectorstore.similarity_search(query, k=k, filter=partition_filter(building_code, date))
+        span.set(doc_type=doc_type, fallback=fallback, documents=len(documents))
+        return documents
+
+def load_retriever(k=RAG_TOP_K, building_code=None, date=None):
+    search_kwargs = {"k": k}
+    where = partition_filter(building_code, date)
+    if where:
+        search_kwargs["filter"] = where
+    return get_vectorstore(building_code, date).as_retriever(search_kwargs=search_kwargs)
+
+def build_rag_prompt(query, documents):
+    """把檢索到的文件原文放進單一 prompt，取代 RetrievalQA 先生成一次摘要的做法"""
+    context = "\n\n".join(doc.page_content for doc in documents) or "（沒有檢索到相關資料）"
+    return f"使用者問題：{query}\n\n檢索到的相關資訊：\n{context}\n\n請根據以上資訊精確回答使用者的問題。"
+
+def load_combine_documents_chain():
+    """
+    RetrievalQA 內部的 stuff 文件組合鏈，不綁定 retriever / vectorstore；
+    檢索由呼叫端依 (大樓, 日期) 分區處理，因此不會開啟分區前的舊 collection
+    """
+    llm = ChatOllama(model=LLM_MODEL, base_url=OLLAMA_HOST, keep_alive=keep_alive_value())
+    return load_documents_chain(llm, chain_type="stuff")
+
+def load_qa_chain(building_code=None, date=None):
+    retriever = load_retriever(building_code=building_code, date=date)
+    llm = ChatOllama(model=LLM_MODEL, base_url=OLLAMA_HOST, keep_alive=keep_alive_value())
     qa_chain = RetrievalQA.from_chain_type(llm=llm, retriever=retriever, return_source_documents=True)
     return qa_chain
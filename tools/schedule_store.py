@@ -0,0 +1,210 @@
+import os
+import json
+import hashlib
+import sqlite3
+import sys
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+# 載入環境變數
+load_dotenv()
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEDULE_DB = os.getenv("SCHEDULE_DB", os.path.join(SCRIPT_DIR, "..", "rag-file", "schedule.sqlite3"))
+# 每個 (大樓, 日期) 保留的快照數
+KEEP_SNAPSHOTS = int(os.getenv("SCHEDULE_KEEP_SNAPSHOTS", "3"))
+# compact 時刪除多少天以前的資料
+RETENTION_DAYS = int(os.getenv("SCHEDULE_RETENTION_DAYS", "90"))
+
+MEETING_COLUMNS = ["building", "room", "date", "start_time", "end_time", "topic", "host"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    building_code TEXT NOT NULL,
+    date TEXT NOT NULL,
+    crawled_at TEXT NOT NULL,
+    meeting_count INTEGER NOT NULL,
+    source TEXT,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_key ON snapshots (building_code, date);
+CREATE TABLE IF NOT EXISTS meetings (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    building TEXT, room TEXT, date TEXT, start_time TEXT, end_time TEXT, topic TEXT, host TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_meetings_snapshot ON meetings (snapshot_id);
+CREATE TABLE IF NOT EXISTS latest (
+    building_code TEXT NOT NULL,
+    date TEXT NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    PRIMARY KEY (building_code, date)
+);
+"""
+
+
+def content_hash(meeting_data):
+    """會議紀錄內容的雜湊；不受紀錄順序與欄位型別（CSV 匯入全是字串）影響"""
+    rows = sorted(json.dumps(["" if m.get(c) is None else str(m.get(c)) for c in MEETING_COLUMNS], ensure_ascii=False)
+                  for m in meeting_data)
+    return hashlib.sha1("\n".join(rows).encode("utf-8")).hexdigest()
+
+
+class ScheduleStore:
+    """以 (大樓代碼, 日期) 為鍵的會議室資料快照庫，取代 rag-file 目錄掃描"""
+
+    def __init__(self, path=SCHEDULE_DB, keep_snapshots=KEEP_SNAPSHOTS):
+        self.path = path
+        self.keep_snapshots = keep_snapshots
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            # WAL 讓預抓寫入時互動查詢仍可同時讀取
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            # 舊版資料庫沒有 content_hash 欄位；既有快照的值為 NULL，下次爬取時照常寫入新快照
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(snapshots)")}
+            if "content_hash" not in columns:
+                conn.execute("ALTER TABLE snapshots ADD COLUMN content_hash TEXT")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def save_snapshot(self, building_code, date_str, meeting_data, crawled_at=None, source="crawl"):
+        """
+        寫入一次爬取結果（可為空，代表當天沒有預約），回傳 snapshot id
+        內容與目前 latest 相同時只更新它的 crawled_at 並沿用同一個 id，
+        開著的 session 不需重新載入，以 snapshot id 為鍵的回答快取也不會失效
+        """
+        crawled_at = crawled_at or datetime.now().isoformat(timespec="seconds")
+        digest = content_hash(meeting_data)
+        with closing(self._connect()) as conn, conn:
+            latest = conn.execute(
+                "SELECT s.id, s.crawled_at, s.content_hash FROM latest l JOIN snapshots s ON s.id = l.snapshot_id "
+                "WHERE l.building_code = ? AND l.date = ?", (building_code, date_str)).fetchone()
+            if latest and latest["content_hash"] == digest and latest["crawled_at"] <= crawled_at:
+                conn.execute("UPDATE snapshots SET crawled_at = ? WHERE id = ?", (crawled_at, latest["id"]))
+                return latest["id"]
+            cursor = conn.execute(
+                "INSERT INTO snapshots (building_code, date, crawled_at, meeting_count, source, content_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (building_code, date_str, crawled_at, len(meeting_data), source, digest))
+            snapshot_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO meetings (snapshot_id, building, room, date, start_time, end_time, topic, host) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(snapshot_id, *[m.get(c) for c in MEETING_COLUMNS]) for m in meeting_data])
+            # 只有比現有 latest 更新的快照才取代（匯入舊 CSV 時不覆蓋較新的爬取結果）
+            conn.execute(
+                "INSERT INTO latest (building_code, date, snapshot_id) VALUES (?, ?, ?) "
+                "ON CONFLICT (building_code, date) DO UPDATE SET snapshot_id = excluded.snapshot_id "
+                "WHERE COALESCE((SELECT crawled_at FROM snapshots WHERE id = latest.snapshot_id), '') <= ?",
+                (building_code, date_str, snapshot_id, crawled_at))
+            self._prune_key(conn, building_code, date_str)
+        return snapshot_id
+
+    def _prune_key(self, conn, building_code, date_str):
+        stale = conn.execute(
+            "SELECT id FROM snapshots WHERE building_code = ? AND date = ? "
+            "AND id != (SELECT snapshot_id FROM latest WHERE building_code = ? AND date = ?) "
+            "ORDER BY crawled_at DESC, id DESC LIMIT -1 OFFSET ?",
+            (building_code, date_str, building_code, date_str, max(0, self.keep_snapshots - 1))).fetchall()
+        if stale:
+            conn.executemany("DELETE FROM snapshots WHERE id = ?", [(row["id"],) for row in stale])
+
+    def latest_snapshot(self, building_code, date_str):
+        """取得某大樓某天最新的快照資訊，沒有資料時回傳 None"""
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT s.* FROM latest l JOIN snapshots s ON s.id = l.snapshot_id "
+                "WHERE l.building_code = ? AND l.date = ?",
+                (building_code, date_str)).fetchone()
+        return dict(row) if row else None
+
+    def load_meetings(self, snapshot_id):
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(MEETING_COLUMNS)} FROM meetings WHERE snapshot_id = ? ORDER BY rowid",
+                (snapshot_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def load_frame(self, snapshot_id):
+        import pandas as pd
+        return pd.DataFrame(self.load_meetings(snapshot_id), columns=MEETING_COLUMNS)
+
+    def compact(self, retention_days=RETENTION_DAYS):
+        """刪除過期日期的資料與多餘的舊快照，並回收空間"""
+        cutoff = (datetime.now() - timedelta(days=retention_days)).strftime("%Y%m%d")
+        with closing(self._connect()) as conn:
+            with conn:
+                expired = conn.execute("DELETE FROM snapshots WHERE date < ?", (cutoff,)).rowcount
+                conn.execute("DELETE FROM latest WHERE date < ?", (cutoff,))
+                for row in conn.execute("SELECT building_code, date FROM latest").fetchall():
+                    self._prune_key(conn, row["building_code"], row["date"])
+            conn.execute("VACUUM")
+        return expired
+
+    def import_csv_dir(self, directory, building_map):
+        """一次性匯入 rag-file 舊有的 {日期}_query_{時間}.csv 檔案"""
+        import pandas as pd
+        imported = 0
+        with closing(self._connect()) as conn:
+            done = {row["source"] for row in conn.execute("SELECT source FROM snapshots WHERE source IS NOT NULL")}
+        for filename in sorted(os.listdir(directory)):
+            if "_query_" not in filename or not filename.endswith(".csv") or filename in done:
+                continue
+            path = os.path.join(directory, filename)
+            df = pd.read_csv(path, dtype=str).fillna("")
+            if df.empty:
+                continue
+            # 舊檔名不含大樓，依 building 欄位的中文名稱對應代碼
+            building_name = df.iloc[0]["building"]
+            building_code = next((code for name, code in building_map.items() if building_name.startswith(name)), None)
+            if building_code is None:
+                print(f"⚠️ 無法辨識 {filename} 的大樓：{building_name}")
+                continue
+            date_str = filename.split("_query_")[0]
+            crawled_at = datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec="seconds")
+            self.save_snapshot(building_code, date_str, df.to_dict(orient="records"), crawled_at=crawled_at, source=filename)
+            imported += 1
+        return imported
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            return {
+                "keys": conn.execute("SELECT COUNT(*) FROM latest").fetchone()[0],
+                "snapshots": conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0],
+                "meetings": conn.execute("SELECT COUNT(*) FROM meetings").fetchone()[0],
+            }
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+def get_store():
+    """共用的預設 store（第一次使用時才建立資料庫檔案）"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ScheduleStore()
+        return _default_store
+
+
+if __name__ == "__main__":
+    # python tools/schedule_store.py import [目錄] | compact | stats
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    store = get_store()
+    if command == "import":
+        try:
+            from tools.mcp_search import building_map
+        except ImportError:
+            from mcp_search import building_map
+        directory = sys.argv[2] if len(sys.argv) > 2 else os.path.join(SCRIPT_DIR, "..", "rag-file")
+        print(f"✅ 已匯入 {store.import_csv_dir(directory, building_map)} 個 CSV 檔案")
+    elif command == "compact":
+        print(f"✅ 已刪除 {store.compact()} 個過期快照")
+    print(store.stats())
@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import contextvars
+from collections import defaultdict
+from dotenv import load_dotenv
+
+# 載入環境變數
+load_dotenv()
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# 關閉時 span() 只回傳共用的空物件，不計時也不寫檔
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "0") == "1"
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(SCRIPT_DIR, "..", "rag-file", "traces.jsonl"))
+# driver_service 等其他行程以此 header 接續同一個 trace
+TRACE_HEADER = "X-Trace-Parent"
+
+# 目前所在的 span（同一執行緒 / 同一個 context 內的巢狀 span 會自動串成父子關係）
+_current = contextvars.ContextVar("trace_span", default=None)
+_write_lock = threading.Lock()
+
+
+def enabled():
+    return TRACE_ENABLED
+
+
+def configure(enabled=None, path=None):
+    """執行期間開關追蹤或改寫輸出檔（benchmark 使用）"""
+    global TRACE_ENABLED, TRACE_FILE
+    if enabled is not None:
+        TRACE_ENABLED = enabled
+    if path is not None:
+        TRACE_FILE = path
+
+
+def _export(record):
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _write_lock:
+        os.makedirs(os.path.dirname(os.path.abspath(TRACE_FILE)), exist_ok=True)
+        # 每個 span 一次 append 一行，多個行程寫入同一個檔案也不會交錯
+        with open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class Span:
+    """一段計時區間；結束時連同屬性寫成 JSONL 的一行"""
+
+    def __init__(self, name, attrs, parent=None):
+        self.name = name
+        self.attrs = attrs
+        if parent is None:
+            parent = _current.get()
+        if isinstance(parent, str):
+            # 從 header 接續的 "trace_id-span_id"
+            self.trace_id, _, self.parent_id = parent.partition("-")
+        elif parent is not None:
+            self.trace_id, self.parent_id = parent.trace_id, parent.span_id
+        else:
+            self.trace_id, self.parent_id = uuid.uuid4().hex[:16], None
+        self.span_id = uuid.uuid4().hex[:8]
+        self._previous = None
+
+    def __bool__(self):
+        return True
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def header(self):
+        return {TRACE_HEADER: f"{self.trace_id}-{self.span_id}"}
+
+    def __enter__(self):
+        self._previous = _current.get()
+        _current.set(self)
+        self._wall = time.time()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = (time.perf_counter() - self._start) * 1000
+        # 以 set 還原而不用 token.reset：產生器內的 span 可能在不同的 context 結束
+        _current.set(self._previous)
+        record = {
+            "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "name": self.name, "start": round(self._wall, 6), "duration_ms": round(duration, 3),
+            "status": "ok", "pid": os.getpid(), "attrs": self.attrs,
+        }
+        if exc_type is GeneratorExit:
+            record["status"] = "cancelled"
+        elif exc_type is not None:
+            record["status"] = "error"
+            record["error"] = f"{exc_type.__name__}: {exc}"
+        try:
+            _export(record)
+        except OSError:
+            pass
+        return False
+
+
+class _NullSpan:
+    """追蹤關閉時使用；if span: 可判斷是否需要計算較昂貴的屬性"""
+
+    def __bool__(self):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def header(self):
+        return {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def span(name, parent=None, **attrs):
+    """with span("retrieve", k=5) as s: ... s.set(documents=3)"""
+    if not TRACE_ENABLED:
+        return NULL_SPAN
+    return Span(name, attrs, parent)
+
+
+def record(name, duration_ms, **attrs):
+    """補記一段已經計時完成的區間（例如原本就回傳各步驟耗時的函式）"""
+    if not TRACE_ENABLED:
+        return
+    s = Span(name, attrs)
+    _export({
+        "trace_id": s.trace_id, "span_id": s.span_id, "parent_id": s.parent_id,
+        "name": name, "start": round(time.time() - duration_ms / 1000, 6), "duration_ms": round(duration_ms, 3),
+        "status": "ok", "pid": os.getpid(), "attrs": attrs,
+    })
+
+
+def current():
+    """目前的 span；沒有或追蹤關閉時回傳空物件"""
+    return (_current.get() or NULL_SPAN) if TRACE_ENABLED else NULL_SPAN
+
+
+def annotate(**attrs):
+    """在目前的 span 加上屬性"""
+    current().set(**attrs)
+
+
+def inject(headers=None):
+    """送往其他服務的 HTTP header，讓對方的 span 接在目前的 span 之下"""
+    headers = dict(headers or {})
+    headers.update(current().header())
+    return headers
+
+
+def iterate_in_context(iterable):
+    """
+    Starlette 以 threadpool 逐次呼叫 next()，每次都在新的 context 中執行；
+    固定在同一個 context 內迭代，產生器裡的巢狀 span 才能維持父子關係
+    """
+    if not TRACE_ENABLED:
+        yield from iterable
+        return
+    context = contextvars.copy_context()
+    iterator = iter(iterable)
+    while True:
+        try:
+            item = context.run(next, iterator)
+        except StopIteration:
+            return
+        yield item
+
+
+def load_spans(path=None):
+    spans = []
+    with open(path or TRACE_FILE, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    spans.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return spans
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = (len(values) - 1) * q / 100
+    low = int(index)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (index - low)
+
+
+def summarize(spans):
+    """各階段（span 名稱）的次數、p50、p95、最大值與錯誤數"""
+    durations = defaultdict(list)
+    errors = defaultdict(int)
+    for s in spans:
+        durations[s["name"]].append(s["duration_ms"])
+        if s.get("status") == "error":
+            errors[s["name"]] += 1
+    return {name: {"count": len(values), "p50_ms": round(percentile(values, 50), 1),
+                   "p95_ms": round(percentile(values, 95), 1), "max_ms": round(max(values), 1),
+                   "errors": errors[name]}
+            for name, values in sorted(durations.items(), key=lambda kv: -percentile(kv[1], 50))}
+
+
+def print_summary(spans):
+    print(f"{'stage':<36}{'count':>7}{'p50 ms':>11}{'p95 ms':>11}{'max ms':>11}{'errors':>8}")
+    for name, row in summarize(spans).items():
+        print(f"{name:<36}{row['count']:>7}{row['p50_ms']:>11.1f}{row['p95_ms']:>11.1f}{row['max_ms']:>11.1f}{row['errors']:>8}")
+
+
+def print_trace(spans, trace_id=None):
+    """以樹狀列出單一 trace（預設為最後一個）的各個 span"""
+    if not spans:
+        return
+    trace_id = trace_id or max(spans, key=lambda s: s["start"])["trace_id"]
+    members = sorted((s for s in spans if s["trace_id"] == trace_id), key=lambda s: s["start"])
+    ids = {s["span_id"] for s in members}
+    children = defaultdict(list)
+    for s in members:
+        children[s["parent_id"] if s["parent_id"] in ids else None].append(s)
+
+    def walk(parent_id, depth):
+        for s in children[parent_id]:
+            attrs = " ".join(f"{k}={v}" for k, v in s["attrs"].items())
+            mark = "" if s["status"] == "ok" else f" [{s['status']}]"
+            print(f"{'  ' * depth}{s['name']:<{max(1, 40 - 2 * depth)}}{s['duration_ms']:>10.1f} ms{mark}  {attrs}")
+            walk(s["span_id"], depth + 1)
+
+    print(f"trace {trace_id}")
+    walk(None, 0)
+
+
+if __name__ == "__main__":
+    # python tools/tracing.py summary [檔案] | trace [trace_id] [檔案]
+    command = sys.argv[1] if len(sys.argv) > 1 else "summary"
+    if command == "trace":
+        trace_id = sys.argv[2] if len(sys.argv) > 2 else None
+        print_trace(load_spans(sys.argv[3] if len(sys.argv) > 3 else None), trace_id)
+    else:
+        print_summary(load_spans(sys.argv[2] if len(sys.argv) > 2 else None))
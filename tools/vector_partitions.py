@@ -0,0 +1,183 @@
+import os
+import re
+import sys
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from langchain_community.vectorstores import Chroma
+from dotenv import load_dotenv
+
+# 載入環境變數
+load_dotenv()
+
+# 分區粒度：day（每棟大樓每天一個 collection）或 month（每棟大樓每月一個）
+VECTOR_PARTITION = os.getenv("VECTOR_PARTITION", "day")
+# 同時保持開啟的 collection handle 數
+VECTOR_MAX_OPEN = int(os.getenv("VECTOR_MAX_OPEN", "16"))
+# 超過保留天數的分區會被整個刪除
+VECTOR_RETENTION_DAYS = int(os.getenv("VECTOR_RETENTION_DAYS", "90"))
+# 寫入時順便檢查過期分區的最短間隔（秒）
+VECTOR_SWEEP_INTERVAL = float(os.getenv("VECTOR_SWEEP_INTERVAL", "3600"))
+
+PREFIX = "rooms"
+NAME_PATTERN = re.compile(rf"^{PREFIX}_(?P<building>[A-Za-z0-9]+)_(?P<period>\d{{6}}|\d{{8}})$")
+# 分區之前所有文件都放在 langchain 預設的 collection
+LEGACY_COLLECTION = "langchain"
+
+
+def building_key(building):
+    """collection 名稱只能用英數字；非代碼的大樓名稱改用雜湊"""
+    building = str(building)
+    return building if building.isalnum() and building.isascii() else "h" + hashlib.sha1(building.encode("utf-8")).hexdigest()[:8]
+
+
+class CollectionManager:
+    """
+    依 (大樓, 日期或月份) 分區的 Chroma collection：
+    第一次寫入時才建立、最近使用的 handle 保留在 LRU 中、超過保留期限的分區整個刪除
+    """
+
+    def __init__(self, persist_directory, embedding_function, granularity=VECTOR_PARTITION,
+                 max_open=VECTOR_MAX_OPEN, retention_days=VECTOR_RETENTION_DAYS, sweep_interval=VECTOR_SWEEP_INTERVAL):
+        import chromadb
+        if granularity not in ("day", "month"):
+            raise ValueError(f"Unknown VECTOR_PARTITION '{granularity}', expected day or month")
+        self.persist_directory = persist_directory
+        self.embedding_function = embedding_function
+        self.granularity = granularity
+        self.max_open = max(1, max_open)
+        self.retention_days = retention_days
+        self.sweep_interval = sweep_interval
+        # 所有分區共用同一個 client
+        self.client = chromadb.PersistentClient(path=persist_directory)
+        self._handles = OrderedDict()
+        self._known = None
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def period(self, date):
+        date = str(date).replace("/", "").replace("-", "")
+        return date[:6] if self.granularity == "month" else date[:8]
+
+    def collection_name(self, building, date):
+        return f"{PREFIX}_{building_key(building)}_{self.period(date)}"
+
+    def _known_names(self):
+        if self._known is None:
+            self._known = {c.name if hasattr(c, "name") else c for c in self.client.list_collections()}
+        return self._known
+
+    def get(self, building, date, create=True):
+        """取得分區的 handle；create=False 且分區不存在時回傳 None（查詢不會建立空的 collection）"""
+        name = self.collection_name(building, date)
+        with self._lock:
+            handle = self._handles.get(name)
+            if handle is not None:
+                self._handles.move_to_end(name)
+                return handle
+            if not create and name not in self._known_names():
+                return None
+            handle = Chroma(collection_name=name, embedding_function=self.embedding_function, client=self.client,
+                            collection_metadata={"building": str(building), "period": self.period(date)})
+            self._known_names().add(name)
+            self._handles[name] = handle
+            while len(self._handles) > self.max_open:
+                self._handles.popitem(last=False)
+            return handle
+
+    def touch(self, building, date):
+        """記錄分區最後一次同步的時間；查詢舊日期時重新寫入的分區不會馬上被當成過期刪除"""
+        name = self.collection_name(building, date)
+        self.client.get_collection(name).modify(
+            metadata={"building": str(building), "period": self.period(date), "synced_at": time.time()})
+
+    def legacy(self):
+        """分區前的單一 collection（僅供相容與清除）"""
+        return Chroma(collection_name=LEGACY_COLLECTION, embedding_function=self.embedding_function, client=self.client)
+
+    def partitions(self):
+        """目前所有分區：[(collection 名稱, 大樓鍵, 日期或月份)]"""
+        with self._lock:
+            self._known = None
+            names = sorted(self._known_names())
+        result = []
+        for name in names:
+            match = NAME_PATTERN.match(name)
+            if match:
+                result.append((name, match.group("building"), match.group("period")))
+        return result
+
+    def drop_expired(self, retention_days=None, today=None):
+        """
+        刪除日期早於保留期限、且保留期限內沒有再同步過的分區，回傳刪除的名稱
+        （使用者查詢過去的日期時會重新寫入該分區，要等它再閒置一個保留期限才刪除）
+        """
+        retention_days = self.retention_days if retention_days is None else retention_days
+        cutoff = (today or datetime.now()) - timedelta(days=retention_days)
+        cutoff_day, cutoff_month = cutoff.strftime("%Y%m%d"), cutoff.strftime("%Y%m")
+        dropped = []
+        for name, _, period in self.partitions():
+            # 月分區要等整個月份都過期才刪除
+            expired = period < cutoff_month if len(period) == 6 else period < cutoff_day
+            if not expired:
+                continue
+            synced_at = (self.client.get_collection(name).metadata or {}).get("synced_at", 0)
+            if synced_at >= cutoff.timestamp():
+                continue
+            with self._lock:
+                self._handles.pop(name, None)
+                self.client.delete_collection(name)
+                self._known_names().discard(name)
+            dropped.append(name)
+        self._last_sweep = time.time()
+        return dropped
+
+    def maybe_sweep(self):
+        """寫入時呼叫；距離上次檢查超過 sweep_interval 才真的掃描"""
+        if time.time() - self._last_sweep >= self.sweep_interval:
+            return self.drop_expired()
+        return []
+
+    def drop_legacy(self):
+        with self._lock:
+            if LEGACY_COLLECTION not in self._known_names():
+                return 0
+            count = self.client.get_collection(LEGACY_COLLECTION).count()
+            self.client.delete_collection(LEGACY_COLLECTION)
+            self._known_names().discard(LEGACY_COLLECTION)
+            return count
+
+    def stats(self):
+        partitions = self.partitions()
+        sizes = {name: self.client.get_collection(name).count() for name, _, _ in partitions}
+        with self._lock:
+            open_handles = list(self._handles)
+        return {
+            "granularity": self.granularity,
+            "partitions": len(partitions),
+            "documents": sum(sizes.values()),
+            "largest_partition": max(sizes.values()) if sizes else 0,
+            "open_handles": len(open_handles),
+            "max_open": self.max_open,
+            "retention_days": self.retention_days,
+            "legacy_collection": LEGACY_COLLECTION in self._known_names(),
+        }
+
+
+if __name__ == "__main__":
+    # python tools/vector_partitions.py stats | sweep [保留天數] | drop-legacy
+    try:
+        from tools.rag_csv_tool import get_collections
+    except ImportError:
+        from rag_csv_tool import get_collections
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    manager = get_collections()
+    if command == "sweep":
+        retention = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        dropped = manager.drop_expired(retention)
+        print(f"✅ 已刪除 {len(dropped)} 個過期分區")
+    elif command == "drop-legacy":
+        print(f"✅ 已刪除舊的單一 collection（{manager.drop_legacy()} 筆文件）")
+    print(manager.stats())